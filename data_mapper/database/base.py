@@ -1,5 +1,13 @@
+import threading
+
+from contextlib import contextmanager
 from enum import Enum
 
+# The connections and connection pools inherited from the parent process, in
+# a forked child process. Kept referenced, such that they are never closed or
+# finalized in the child, see Database.reset_after_fork().
+INHERITED_CONNECTIONS = []
+
 # =============================================================================
 # Database and Database Fields.
 
@@ -9,6 +17,13 @@ class Database:
     An abstract class that acts as an interface to any database system.
     """
     system = None
+    # A boolean flag that indicates whether the database allows a single
+    # writing process at a time only, see Mapper.parallel_load().
+    single_writer = False
+    # The executor of the async methods, created on the first async call.
+    executor = None
+    # The lock to guard the creation of the executors.
+    executor_lock = threading.Lock()
 
     def save(self, instance):
         """
@@ -22,6 +37,239 @@ class Database:
         """
         pass
 
+    def save_many(self, instances):
+        """
+        Writes the given model instances to the underlying database. Database
+        systems that support bulk writes should override this method.
+
+        Args:
+            instances (list of Model): The model instances to write to the
+                database.
+        Returns:
+            True if all instances were successfully written to the database;
+            False otherwise.
+        """
+        success = True
+        for instance in instances:
+            success = self.save(instance) and success
+        return success
+
+    def insert_rows(self, mapper, rows):
+        """
+        Inserts the given rows as new rows into the table of the model of the
+        given mapper.
+
+        Args:
+            mapper (Mapper): The mapper of the model.
+            rows (list of tuple): The values of the rows, in the order of the
+                database fields of the mapper and converted to the values to
+                pass to the database.
+        Returns:
+            The ids of the inserted rows, in the order of the given rows.
+        """
+        pass
+
+    def upsert_rows(self, mapper, rows, conflict_fields, update_fields=None):
+        """
+        Inserts the given rows as new rows into the table of the model of the
+        given mapper, and updates the existing rows with the same values in
+        the given conflict fields instead.
+
+        Args:
+            mapper (Mapper): The mapper of the model.
+            rows (list of tuple): The values of the rows, in the order of the
+                database fields of the mapper and converted to the values to
+                pass to the database.
+            conflict_fields (list of str): The names of the fields of a unique
+                index, which identify the existing rows.
+            update_fields (list of str, optional): The names of the fields to
+                update in existing rows. Defaults to all fields except for the
+                conflict fields.
+        Returns:
+            The ids of the rows, in the order of the given rows; the ids of
+            the updated rows are the ids of the existing rows. None for the
+            rows whose id is unknown.
+        """
+        pass
+
+    def select(self, mapper, where=None, max_num=None, batch_size=1000,
+               order_by=None):
+        """
+        Reads the rows of the table of the model of the given mapper, lazily.
+
+        Args:
+            mapper (Mapper): The mapper of the model.
+            where (Expression, optional): The filter expression the rows must
+                match.
+            max_num (int, optional): The maximal number of rows to read.
+            batch_size (int, optional): The number of rows to fetch from the
+                database at once.
+            order_by (str, optional): The name of the field to sort the rows
+                by, before their ids.
+        Returns:
+            An iterator over the rows, each row consisting of the id followed
+            by the values of the database fields of the mapper.
+        """
+        pass
+
+    def check_schema(self, mapper):
+        """
+        Checks that the table of the model of the given mapper matches its
+        database fields. Database systems with schemas should override this
+        method.
+
+        Args:
+            mapper (Mapper): The mapper of the model.
+        """
+        pass
+
+    def close(self):
+        """
+        Closes all connections to the underlying database. Database systems
+        that hold connections should override this method.
+        """
+        self.shutdown_executor()
+
+    # =========================================================================
+    # Async methods.
+
+    def get_executor(self):
+        """
+        Returns the executor that runs the blocking calls of the async
+        methods on dedicated driver threads. Creates the executor on the
+        first call.
+
+        Returns:
+            The DatabaseExecutor.
+        """
+        executor = self.executor
+        if executor is None:
+            # Import the executor on the first async call only, asyncio is
+            # expensive to import.
+            from data_mapper.database.executor import DatabaseExecutor
+            with self.executor_lock:
+                executor = self.executor
+                if executor is None:
+                    executor = DatabaseExecutor(
+                        self,
+                        self.get_num_driver_threads()
+                    )
+                    self.executor = executor
+        return executor
+
+    def get_num_driver_threads(self):
+        """
+        Returns the number of driver threads of the executor. Database
+        systems with more than a single connection should override this
+        method.
+
+        Returns:
+            The number of driver threads.
+        """
+        return 1
+
+    def shutdown_executor(self):
+        """
+        Shuts the executor down, if there is any. A new executor is created on
+        the next async call.
+        """
+        with self.executor_lock:
+            executor = self.executor
+            self.executor = None
+        if executor is not None:
+            executor.shutdown()
+
+    def reset_after_fork(self):
+        """
+        Drops the state inherited from the parent process, in a child process
+        created by os.fork(). The connections of the parent must not be used
+        or closed in the child, as they share their sockets and files with
+        the parent; they are moved to INHERITED_CONNECTIONS instead, and new
+        connections are established on the next request. Database systems
+        that hold connections should override this method.
+        """
+        # The driver threads of the parent do not exist in the child.
+        self.executor = None
+        self.executor_lock = threading.Lock()
+
+    def interrupt(self, thread_id):
+        """
+        Aborts the statement that is executed by the given thread, if there is
+        any. Called on cancelling an async call, on the interrupt thread of
+        the executor, so it may block. Database systems that can abort
+        statements should override this method; the statement runs to
+        completion otherwise.
+
+        Args:
+            thread_id (int): The ident of the thread executing the statement.
+        """
+        pass
+
+    async def run_async(self, function, *args, **kwargs):
+        """
+        Calls the given blocking function on a driver thread of the executor
+        and waits for the result, without blocking the event loop.
+
+        Args:
+            function (function): The function to call.
+            *args: The positional arguments of the function.
+            **kwargs: The keyword arguments of the function.
+        Returns:
+            The result of the function.
+        """
+        return await self.get_executor().run(function, *args, **kwargs)
+
+    async def asave(self, instance):
+        """
+        The async variant of save().
+        """
+        return await self.run_async(self.save, instance)
+
+    async def asave_many(self, instances):
+        """
+        The async variant of save_many().
+        """
+        return await self.run_async(self.save_many, list(instances))
+
+    async def aselect(self, mapper, where=None, max_num=None, batch_size=1000,
+                      order_by=None):
+        """
+        The async variant of select(). Reads all rows at once.
+
+        Returns:
+            The list of the rows, each row consisting of the id followed by the
+            values of the database fields of the mapper.
+        """
+        def select_all():
+            return list(self.select(mapper, where, max_num, batch_size,
+                                    order_by))
+        return await self.run_async(select_all)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Returns a context manager that runs all writes inside the context in a
+        single transaction. Transactions can be nested, only the outermost
+        transaction is committed. Database systems that support transactions
+        should override this method.
+
+        Yields:
+            A database specific handle to execute statements with.
+        """
+        yield None
+
+    def on_commit(self, callback):
+        """
+        Registers the given function to be called after the running
+        transaction was committed. Database systems without transactions
+        call the function right away; database systems that support
+        transactions should override this method.
+
+        Args:
+            callback (function): The function to call, without arguments.
+        """
+        callback()
+
     def exists_table(self, model):
         """
         Returns True, if there exists a table for the given model class in the
@@ -35,7 +283,7 @@ class Database:
         """
         pass
 
-    def create_table(self, model, database_fields):
+    def create_table(self, model, database_fields, database_indexes=None):
         """
         Creates a table for the given model and the given fields in the
         underlying database.
@@ -44,6 +292,8 @@ class Database:
             model (Model): The model to process.
             database_fields (dict of str:DatabaseField): The database fields to
                 process.
+            database_indexes (list of DatabaseIndex, optional): The indexes to
+                create on the table.
         Returns:
             True if the table was successfully created; False otherwise.
         """
@@ -59,7 +309,10 @@ class DatabaseProfile:
     instance.
     """
     def __init__(self, name, system=None, host=None, port=None, user=None,
-                 password=None, db=None):
+                 password=None, db=None, pool_min_size=None,
+                 pool_max_size=None, pool_timeout=None,
+                 pool_max_lifetime=None, pool_max_idle=None,
+                 max_packet_size=None):
         """
         Creates a new database profile.
 
@@ -71,6 +324,17 @@ class DatabaseProfile:
             user (str): The username to use on authentication.
             password (str): The password to use on authentication.
             db (str): The name of the database.
+            pool_min_size (int): The number of connections to establish on
+                warming up the connection pool.
+            pool_max_size (int): The maximal number of connections in the
+                connection pool.
+            pool_timeout (float): The maximal number of seconds to wait for a
+                free connection.
+            pool_max_lifetime (float): The maximal number of seconds a
+                connection is used.
+            pool_max_idle (float): The maximal number of seconds a connection
+                may be idle before it is recycled.
+            max_packet_size (int): The maximal size of a statement, in bytes.
         """
         self.name = name
         self.system = system
@@ -79,6 +343,25 @@ class DatabaseProfile:
         self.user = user
         self.password = password
         self.db = db
+        self.pool_min_size = pool_min_size
+        self.pool_max_size = pool_max_size
+        self.pool_timeout = pool_timeout
+        self.pool_max_lifetime = pool_max_lifetime
+        self.pool_max_idle = pool_max_idle
+        self.max_packet_size = max_packet_size
+
+    def get_key(self):
+        """
+        Returns a hashable key that identifies the settings of this profile.
+        Profiles with equal keys refer to the same database.
+
+        Returns:
+            The key of this profile.
+        """
+        return (self.name, self.system, self.host, self.port, self.user,
+                self.password, self.db, self.pool_min_size,
+                self.pool_max_size, self.pool_timeout, self.pool_max_lifetime,
+                self.pool_max_idle, self.max_packet_size)
 
     def __str__(self):
         return "DatabaseProfile(%s)" % self.__dict__
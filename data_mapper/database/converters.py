@@ -0,0 +1,57 @@
+import datetime
+import json
+
+# The functions to convert values of model instances to values that can be
+# passed to the database drivers, and back.
+
+
+def convert_list(value):
+    """
+    Converts the given list to a JSON string.
+    """
+    return None if value is None else json.dumps(value)
+
+
+def convert_time(value):
+    """
+    Converts the given time or datetime object to an ISO 8601 string.
+    """
+    return None if value is None else value.isoformat()
+
+
+def parse_bool(value):
+    """
+    Converts the given int to a boolean value.
+    """
+    return None if value is None else bool(value)
+
+
+def parse_list(value):
+    """
+    Converts the given JSON string to a list.
+    """
+    return None if value is None else json.loads(value)
+
+
+def parse_time(value):
+    """
+    Converts the given ISO 8601 string to a time object.
+    """
+    return None if value is None else datetime.time.fromisoformat(value)
+
+
+def parse_datetime(value):
+    """
+    Converts the given ISO 8601 string to a datetime object.
+    """
+    return None if value is None else datetime.datetime.fromisoformat(value)
+
+
+def parse_time_delta(value):
+    """
+    Converts the given timedelta, as returned for TIME columns by MySQL
+    drivers, to a time object.
+    """
+    if value is None or isinstance(value, datetime.time):
+        return value
+    return (datetime.datetime.min + value).time()
@@ -0,0 +1,217 @@
+import asyncio
+import queue
+import threading
+
+from concurrent.futures import Future
+
+from data_mapper.exceptions import DataMapperError
+
+
+class DatabaseExecutor:
+    """
+    Runs blocking calls to a database on dedicated driver threads, such that
+    they can be awaited from asyncio code without blocking the event loop.
+    The calls are queued in FIFO order, so that concurrent awaits are served
+    in the order of their submission. Cancelling the awaiting task removes a
+    queued call from the queue and interrupts a running call, see
+    Database.interrupt(). Interrupts may block, e.g. to connect to the
+    database, and run on a separate thread of the executor, such that they
+    are not queued behind the running calls.
+    """
+    def __init__(self, database, num_threads=1):
+        """
+        Creates a new executor. The driver threads are started on the first
+        submitted call.
+
+        Args:
+            database (Database): The database to interrupt on cancellations.
+            num_threads (int, optional): The number of driver threads. A
+                database with a single connection must use a single thread.
+        """
+        if num_threads < 1:
+            raise ValueError("The number of threads must be positive.")
+        self.database = database
+        self.num_threads = num_threads
+        # The queued calls, as (future, function, args, kwargs) tuples.
+        self.queue = queue.Queue()
+        self.threads = []
+        # The calls to interrupt, as (future, thread ident) tuples, and the
+        # thread that interrupts them, started on the first interrupt.
+        self.interrupts = queue.Queue()
+        self.interrupt_thread = None
+        # The idents of the driver threads running a call, per future of the
+        # call.
+        self.running = {}
+        # A boolean flag that indicates whether this executor is shut down.
+        self.is_shutdown = False
+        # The lock to guard the threads and the running calls.
+        self.lock = threading.Lock()
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Queues a call of the given function with the given arguments.
+
+        Args:
+            function (function): The function to call on a driver thread.
+            *args: The positional arguments of the function.
+            **kwargs: The keyword arguments of the function.
+        Returns:
+            The concurrent.futures.Future of the call.
+        """
+        future = Future()
+        with self.lock:
+            if self.is_shutdown:
+                raise ExecutorShutdownError(
+                    code=1,
+                    msg="The executor of the database is shut down."
+                )
+            if len(self.threads) == 0:
+                self.start()
+            self.queue.put((future, function, args, kwargs))
+        return future
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Calls the given function with the given arguments on a driver thread
+        and waits for the result, without blocking the event loop.
+
+        Args:
+            function (function): The function to call on a driver thread.
+            *args: The positional arguments of the function.
+            **kwargs: The keyword arguments of the function.
+        Returns:
+            The result of the function.
+        """
+        future = self.submit(function, *args, **kwargs)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # A queued call was cancelled along with the task. Abort the
+            # statement of a running call.
+            self.interrupt(future)
+            raise
+
+    def interrupt(self, future):
+        """
+        Interrupts the call of the given future, if it is running. The call
+        is interrupted on the interrupt thread, without waiting for it.
+
+        Args:
+            future (Future): The future of the call, returned by submit().
+        """
+        with self.lock:
+            thread_id = self.running.get(future)
+            if thread_id is None or self.is_shutdown:
+                return
+            if self.interrupt_thread is None:
+                self.interrupt_thread = threading.Thread(
+                    target=self.work_interrupts,
+                    name="DatabaseExecutor-interrupt",
+                    daemon=True
+                )
+                self.interrupt_thread.start()
+            self.interrupts.put((future, thread_id))
+
+    def shutdown(self, wait=True):
+        """
+        Stops the driver threads after the queued calls were processed. No
+        calls can be submitted afterwards.
+
+        Args:
+            wait (bool, optional): A boolean flag that indicates whether to
+                wait for the driver threads to finish.
+        """
+        with self.lock:
+            if self.is_shutdown:
+                return
+            self.is_shutdown = True
+            threads = list(self.threads)
+            for _ in threads:
+                self.queue.put(None)
+            if self.interrupt_thread is not None:
+                self.interrupts.put(None)
+                threads.append(self.interrupt_thread)
+        if wait:
+            current_thread = threading.current_thread()
+            for thread in threads:
+                # A driver thread can not wait for itself.
+                if thread is not current_thread:
+                    thread.join()
+
+    # =========================================================================
+    # Utility methods.
+
+    def start(self):
+        """
+        Starts the driver threads. Must be called with the lock held.
+        """
+        for i in range(self.num_threads):
+            thread = threading.Thread(
+                target=self.work,
+                name="DatabaseExecutor-%d" % i,
+                daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def work(self):
+        """
+        Processes the queued calls until the executor is shut down.
+        """
+        thread_id = threading.get_ident()
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            future, function, args, kwargs = job
+            # Skip the calls that were cancelled while being queued.
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self.lock:
+                self.running[future] = thread_id
+            try:
+                result = function(*args, **kwargs)
+            except BaseException as error:
+                self.finish(future)
+                future.set_exception(error)
+            else:
+                self.finish(future)
+                future.set_result(result)
+
+    def work_interrupts(self):
+        """
+        Interrupts the queued calls until the executor is shut down. Calls
+        that finished in the meantime are skipped.
+        """
+        while True:
+            job = self.interrupts.get()
+            if job is None:
+                return
+            future, thread_id = job
+            with self.lock:
+                if self.running.get(future) != thread_id:
+                    continue
+            try:
+                self.database.interrupt(thread_id)
+            except Exception:
+                # The call runs to completion, as if the database could not
+                # abort statements.
+                pass
+
+    def finish(self, future):
+        """
+        Marks the call of the given future as finished, such that it can not
+        be interrupted anymore.
+        """
+        with self.lock:
+            del self.running[future]
+
+# =============================================================================
+# Errors.
+
+
+class ExecutorShutdownError(DataMapperError):
+    """
+    An error to raise on submitting a call to an executor that is shut down.
+    """
+    prefix = "An error occurred on submitting a database call: "
@@ -1,3 +1,6 @@
+import hashlib
+
+
 class DatabaseField:
     """
     The base class for all database fields.
@@ -251,3 +254,76 @@ class DatabaseDateTimeField(DatabaseField):
         self.name = name
         self.default_value = default_value
         self.mandatory = mandatory
+
+# =============================================================================
+# Indexes.
+
+
+class DatabaseIndex:
+    """
+    A definition of an index over one or more database fields.
+    """
+    def __init__(self, fields, unique=False, name=None):
+        """
+        Creates a definition of an index.
+
+        Args:
+            fields (list of str): The names of the indexed fields, in the
+                order of the index.
+            unique (bool, optional): A boolean flag that indicates whether
+                the combination of the values must be unique.
+            name (str, optional): The name of the index. Defaults to a name
+                derived from the table and the field names.
+        """
+        self.fields = [fields] if isinstance(fields, str) else list(fields)
+        self.unique = unique
+        self.name = name
+
+    def get_name(self, table_name):
+        """
+        Returns the name of this index on the given table.
+
+        Args:
+            table_name (str): The name of the table.
+        Returns:
+            The name of this index.
+        """
+        if self.name is not None:
+            return self.name
+        return "idx_%s_%s" % (table_name, "_".join(self.fields))
+
+    def __str__(self):
+        return "DatabaseIndex(%s)" % self.__dict__
+
+    def __repr__(self):
+        return self.__str__()
+
+# =============================================================================
+# Fingerprints.
+
+
+def compute_fingerprint(db_fields, db_indexes=None):
+    """
+    Computes a fingerprint of the given database fields and indexes. The
+    fingerprint changes whenever a field or an index is added, removed or
+    changed in any of its attributes, and is stable across processes.
+
+    >>> fingerprint = compute_fingerprint({"a": DatabaseIntField("a")})
+    >>> fingerprint == compute_fingerprint({"a": DatabaseIntField("a")})
+    True
+    >>> fingerprint == compute_fingerprint({"a": DatabaseIntField(width=3)})
+    False
+
+    Args:
+        db_fields (dict of str:DatabaseField): The database fields.
+        db_indexes (list of DatabaseIndex, optional): The indexes.
+    Returns:
+        The fingerprint, as a hex string.
+    """
+    parts = []
+    for name, db_field in db_fields.items():
+        parts.append((name, type(db_field).__name__,
+                      sorted(vars(db_field).items())))
+    for db_index in db_indexes or []:
+        parts.append(("index", sorted(vars(db_index).items())))
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
@@ -0,0 +1,313 @@
+import os
+import threading
+import time
+import weakref
+
+from data_mapper.exceptions import DataMapperError
+
+# The generators with blocks of ids, to reset in forked child processes.
+HILO_GENERATORS = weakref.WeakSet()
+# The time-ordered generators, to hand out node ids to forked child processes.
+TIME_ORDERED_GENERATORS = weakref.WeakSet()
+
+# The start of the timestamps of the TimeOrderedIdGenerator: 2020-01-01 UTC,
+# in milliseconds since the Unix epoch.
+DEFAULT_EPOCH = 1577836800000
+# The number of bits of the parts of a time-ordered id. The remaining 41 bits
+# hold the timestamp, which lasts for about 69 years after the epoch.
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+
+
+class IdGenerator:
+    """
+    An abstract class that generates the ids of new rows on the client side,
+    such that the ids need not be read from the database on inserts. A
+    generator is configured per mapper, see MapperRegistry.register(); rows
+    of mappers without a generator get the ids following the largest id in
+    the table, see SQLDatabase.allocate_ids().
+    """
+
+    def generate(self, database, table_name, num):
+        """
+        Generates ids for new rows of the given table. Called inside of the
+        transaction that inserts the rows.
+
+        Args:
+            database (SQLDatabase): The database of the table.
+            table_name (str): The name of the table.
+            num (int): The number of ids to generate.
+        Returns:
+            The list of the generated ids.
+        """
+        raise NotImplementedError()
+
+    def create_storage(self, database):
+        """
+        Creates the tables the generator keeps its state in, if it does not
+        exist yet. Called along with the creation of the tables of the
+        models, see Mapper.create_db_table(). Generators that keep state in
+        the database should override this method.
+
+        Args:
+            database (SQLDatabase): The database to create the tables in.
+        """
+        pass
+
+
+class HiLoIdGenerator(IdGenerator):
+    """
+    Generates ids from blocks of consecutive ids, with the hi/lo algorithm.
+    The blocks are reserved by incrementing a sequence per table in the
+    database, see SQLDatabase.next_sequence_value(), and handed out from
+    memory; a single round trip serves <block_size>-many ids. Ids are unique
+    across threads and processes, but not gapless: the unused ids of a block
+    are lost when the process ends. The generator must be used from the
+    first row of a table on, since the blocks start at id 1.
+    """
+    def __init__(self, block_size=100):
+        """
+        Creates a new hi/lo generator.
+
+        Args:
+            block_size (int, optional): The number of ids per block.
+        """
+        if block_size < 1:
+            raise ValueError("The block size must be positive.")
+        self.block_size = block_size
+        # The current blocks, per (profile key, table name), as lists of the
+        # next id to hand out and the end of the block (exclusive).
+        self.blocks = {}
+        # The lock to guard the handout of the ids.
+        self.lock = threading.Lock()
+        HILO_GENERATORS.add(self)
+
+    def generate(self, database, table_name, num):
+        key = (database.db_profile.get_key(), table_name)
+        ids = []
+        with self.lock:
+            block = self.blocks.get(key)
+            if block is not None:
+                take = min(num, block[1] - block[0])
+                ids.extend(range(block[0], block[0] + take))
+                block[0] += take
+        missing = num - len(ids)
+        if missing > 0:
+            # Reserve all missing blocks in a single round trip. The lock is
+            # not held meanwhile, the thread may have to wait for the
+            # transactions of other threads, which may need ids themselves.
+            block = self.reserve_blocks(
+                database,
+                key,
+                table_name,
+                -(-missing // self.block_size)
+            )
+            with self.lock:
+                ids.extend(range(block[0], block[0] + missing))
+                block[0] += missing
+                self.blocks[key] = block
+        return ids
+
+    def create_storage(self, database):
+        database.create_sequence_table()
+
+    def reserve_blocks(self, database, key, table_name, num_blocks):
+        """
+        Reserves the given number of consecutive blocks of the given table.
+        Inside of a running transaction, the reservation is part of it; the
+        blocks are discarded if the transaction is rolled back, since the
+        sequence is reset then.
+
+        Returns:
+            The reserved ids, as a list of the first id and the end
+            (exclusive).
+        """
+        with database.transaction():
+            hi = database.next_sequence_value(table_name, num_blocks)
+            block = [hi * self.block_size + 1,
+                     (hi + num_blocks) * self.block_size + 1]
+            database.on_rollback(lambda: self.discard(key, block))
+        return block
+
+    def discard(self, key, block):
+        """
+        Discards the given block, if it is the current block of the given key.
+        """
+        with self.lock:
+            if self.blocks.get(key) is block:
+                del self.blocks[key]
+
+    def reset_after_fork(self):
+        """
+        Drops the blocks in a child process created by os.fork(), as the
+        parent keeps handing out their ids.
+        """
+        self.blocks = {}
+        self.lock = threading.Lock()
+
+
+class TimeOrderedIdGenerator(IdGenerator):
+    """
+    Generates 64-bit ids without any coordination: the milliseconds since
+    the epoch (41 bits), followed by the id of the node (10 bits) and a
+    counter per millisecond (12 bits). The ids are roughly ordered by their
+    creation time and unique as long as each process that generates ids of
+    the same table uses its own node id, e.g. per shard. Up to 4096 ids are
+    generated per millisecond; the generator waits for the next millisecond
+    if they are used up, or if the clock was set back. Child processes
+    created by os.fork(), like the workers of Mapper.parallel_load(), take
+    the node ids of the given range of child node ids, in the order of their
+    creation; each id is handed out once. A child that gets no node id,
+    because the range is not given or used up, raises an IdGeneratorError
+    on generating ids. The node ids of all processes, including the ranges
+    of child node ids, must be disjoint.
+    """
+    def __init__(self, node_id=0, epoch=DEFAULT_EPOCH, child_node_ids=None):
+        """
+        Creates a new time-ordered generator.
+
+        Args:
+            node_id (int, optional): The id of the node, between 0 and 1023.
+            epoch (int, optional): The start of the timestamps, in
+                milliseconds since the Unix epoch.
+            child_node_ids (iterable of int, optional): The node ids to hand
+                out to child processes created by os.fork(), e.g.
+                range(100, 164). Must not contain the node id.
+        """
+        child_node_ids = list(child_node_ids or [])
+        for node in [node_id] + child_node_ids:
+            if not 0 <= node < (1 << NODE_BITS):
+                raise ValueError("The node ids must be between 0 and %d." %
+                                 ((1 << NODE_BITS) - 1))
+        if node_id in child_node_ids:
+            raise ValueError("The child node ids must not contain the node "
+                             "id.")
+        if len(set(child_node_ids)) < len(child_node_ids):
+            raise ValueError("The child node ids must be unique.")
+        # The id of the node, None in a child process without a node id.
+        self.node_id = node_id
+        # The node ids to hand out to forked child processes, in order.
+        self.child_node_ids = child_node_ids
+        self.epoch = epoch
+        # The timestamp of the last generated id and the counter of the ids
+        # generated in its millisecond.
+        self.last_timestamp = -1
+        self.sequence = 0
+        # The lock to guard the timestamp and the counter.
+        self.lock = threading.Lock()
+        # The number of child processes forked so far.
+        self.num_forks = 0
+        TIME_ORDERED_GENERATORS.add(self)
+
+    def generate(self, database, table_name, num):
+        if self.node_id is None:
+            raise IdGeneratorError(
+                code=1,
+                msg="The forked process has no node id, the child node ids "
+                    "of its parent are not given or used up."
+            )
+        ids = []
+        with self.lock:
+            for _ in range(num):
+                ids.append(self.next_id())
+        return ids
+
+    def next_id(self):
+        """
+        Generates the next id. Must be called with the lock held.
+        """
+        timestamp = self.get_timestamp()
+        if timestamp == self.last_timestamp:
+            self.sequence = (self.sequence + 1) & ((1 << SEQUENCE_BITS) - 1)
+            if self.sequence == 0:
+                # The ids of this millisecond are used up.
+                timestamp = self.wait_for_next_timestamp()
+        elif timestamp < self.last_timestamp:
+            # The clock was set back, wait until it caught up.
+            timestamp = self.wait_for_next_timestamp()
+            self.sequence = 0
+        else:
+            self.sequence = 0
+        self.last_timestamp = timestamp
+        return ((timestamp << (NODE_BITS + SEQUENCE_BITS))
+                | (self.node_id << SEQUENCE_BITS)
+                | self.sequence)
+
+    def wait_for_next_timestamp(self):
+        """
+        Waits until the clock passed the timestamp of the last id.
+
+        Returns:
+            The new timestamp.
+        """
+        timestamp = self.get_timestamp()
+        while timestamp <= self.last_timestamp:
+            time.sleep(0.0001)
+            timestamp = self.get_timestamp()
+        return timestamp
+
+    def get_timestamp(self):
+        """
+        Returns the milliseconds since the epoch.
+        """
+        return time.time_ns() // 1000000 - self.epoch
+
+    def prepare_fork(self):
+        """
+        Counts the child process about to be created by os.fork(). Called in
+        the parent process.
+        """
+        self.num_forks += 1
+
+    def reset_after_fork(self):
+        """
+        Switches to the next child node id of the parent in a child process
+        created by os.fork(), such that the child and the parent never
+        generate the same ids, even in the same millisecond. The child can
+        not hand out node ids to its own children.
+        """
+        index = self.num_forks - 1
+        if self.node_id is not None and index < len(self.child_node_ids):
+            self.node_id = self.child_node_ids[index]
+        else:
+            self.node_id = None
+        self.child_node_ids = []
+        self.num_forks = 0
+        self.last_timestamp = -1
+        self.sequence = 0
+        self.lock = threading.Lock()
+
+
+def prepare_fork():
+    """
+    Prepares the time-ordered generators for a call of os.fork().
+    """
+    for generator in list(TIME_ORDERED_GENERATORS):
+        generator.prepare_fork()
+
+
+def reset_after_fork():
+    """
+    Resets the generators in a child process created by os.fork().
+    """
+    for generator in list(HILO_GENERATORS):
+        generator.reset_after_fork()
+    for generator in list(TIME_ORDERED_GENERATORS):
+        generator.reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(
+        before=prepare_fork,
+        after_in_child=reset_after_fork
+    )
+
+# =============================================================================
+# Errors.
+
+
+class IdGeneratorError(DataMapperError):
+    """
+    An error to raise if a generator can not generate ids.
+    """
+    prefix = "An error occurred on generating ids: "
@@ -1,61 +1,693 @@
-# import pymysql
+import datetime
+import threading
 
-from data_mapper.database.base import Database
 from data_mapper.database.base import DatabaseSystem
+from data_mapper.database.base import INHERITED_CONNECTIONS
+from data_mapper.database.converters import convert_list
+from data_mapper.database.converters import parse_bool
+from data_mapper.database.converters import parse_list
+from data_mapper.database.converters import parse_time_delta
+from data_mapper.database.fields import DatabaseStringField
+from data_mapper.database.fields import DatabaseBooleanField
+from data_mapper.database.fields import DatabaseIntField
+from data_mapper.database.fields import DatabaseFloatField
+from data_mapper.database.fields import DatabaseDoubleField
+from data_mapper.database.fields import DatabaseListField
+from data_mapper.database.fields import DatabaseBinaryField
+from data_mapper.database.fields import DatabaseTimeField
+from data_mapper.database.fields import DatabaseDateTimeField
+from data_mapper.database.pool import ConnectionPool
+from data_mapper.database.pool import DEFAULT_MAX_SIZE
+from data_mapper.database.sql import SQLDatabase
 
+# TODO: Create database if it not exist.
 
-# cursor.execute("SELECT name FROM teams")
-# for x in cursor:
+# The host to connect to, if there is no host given in the profile.
+DEFAULT_HOST = "localhost"
+# The port to connect to, if there is no port given in the profile.
+DEFAULT_PORT = 3306
 
+# The MySQL column types, per database field class.
+COLUMN_TYPES = {
+    DatabaseStringField: "LONGTEXT",
+    DatabaseBooleanField: "TINYINT(1)",
+    DatabaseIntField: "INT",
+    DatabaseFloatField: "FLOAT",
+    DatabaseDoubleField: "DOUBLE",
+    DatabaseListField: "LONGTEXT",
+    DatabaseBinaryField: "LONGBLOB",
+    DatabaseTimeField: "TIME(6)",
+    DatabaseDateTimeField: "DATETIME(6)"
+}
+# The integer column types, with their number of bits, by size.
+INT_TYPES = [
+    ("TINYINT", 8),
+    ("SMALLINT", 16),
+    ("MEDIUMINT", 24),
+    ("INT", 32),
+    ("BIGINT", 64)
+]
+# The maximal number of characters of a VARCHAR column, in utf8mb4.
+MAX_VARCHAR_LENGTH = 16383
+# The maximal number of characters of a MEDIUMTEXT column, in utf8mb4.
+MAX_MEDIUMTEXT_LENGTH = 16777215 // 4
+# The length of the indexed prefix of TEXT and BLOB columns.
+INDEX_PREFIX_LENGTH = 191
+# The suffixes of the column types without DEFAULT values.
+NO_DEFAULT_TYPES = ("TEXT", "BLOB")
 
-# TODO: Default port if port is not given in profile.
-# TODO: Default host.
-# TODO: Create database if it not exist.
-# TODO: On save an instance, validate the values of each field.
-# TODO: On save an instance, check if table exists and create if it not exists.
-# TODO: On save an instance, check if field specifications matches the table.
+# The maximal size of a statement, in bytes, if the profile gives no limit.
+# Matches the default max_allowed_packet of MySQL 5.7.
+DEFAULT_MAX_PACKET_SIZE = 4 * 1024 * 1024
+# The number of bytes to reserve in each packet for the protocol overhead.
+PACKET_OVERHEAD = 1024
+# The characters that are escaped in string literals, each growing by one byte.
+ESCAPED_CHARS = ("\\", "'", '"', "\n", "\r", "\0", "\x1a")
+ESCAPED_BYTES = tuple(char.encode("ascii") for char in ESCAPED_CHARS)
+
+# The alias of the inserted rows in INSERT ... ON DUPLICATE KEY UPDATE
+# statements.
+UPSERT_ALIAS = "new"
+
+# The settings of the connection pool, per attribute of the profile, with the
+# functions to parse the values read from a profile config file.
+POOL_SETTINGS = {
+    "pool_min_size": ("min_size", int),
+    "pool_max_size": ("max_size", int),
+    "pool_timeout": ("timeout", float),
+    "pool_max_lifetime": ("max_lifetime", float),
+    "pool_max_idle": ("max_idle", float)
+}
 
-class MySQLDatabase(Database):
+
+class MySQLDatabase(SQLDatabase):
     """
-    A class that acts as an interface to an instance of a MYQSL database.
+    A class that acts as an interface to an instance of a MYQSL database. The
+    connections are taken from a bounded connection pool, configured by the
+    pool settings of the profile, so that all threads of a process share a
+    limited number of connections.
     """
     system = DatabaseSystem.MYSQL
+    placeholder = "%s"
+    identifier_quote = "`"
+
+    def __init__(self, db_profile, driver=None):
+        """
+        Creates a new MySQL database. The connection pool is not created
+        until a connection is needed for the first time.
+
+        Args:
+            db_profile (DatabaseProfile): The profile of the database.
+            driver (module, optional): The DB-API 2.0 compliant module to
+                connect with. Defaults to pymysql.
+        """
+        super().__init__(db_profile)
+        self.driver = driver
+        self.pool = None
+        # The lock to guard the creation of the connection pool.
+        self.pool_lock = threading.Lock()
+        # The connections taken from the pool, per ident of the thread that
+        # took the connection. Used to abort statements, see interrupt().
+        self.active_connections = {}
+        # The pools the connections were taken from, per id of the
+        # connection. The pool may be replaced while a connection is in use,
+        # e.g. if the database is closed.
+        self.connection_pools = {}
+
+    def get_driver(self):
+        """
+        Returns the DB-API 2.0 compliant module to connect with. pymysql is
+        imported on the first call, if no other module was given.
+
+        Returns:
+            The driver module.
+        """
+        if self.driver is None:
+            import pymysql
+            self.driver = pymysql
+        return self.driver
+
+    def connect(self):
+        profile = self.db_profile
+        return self.get_driver().connect(
+            host=profile.host or DEFAULT_HOST,
+            port=int(profile.port or DEFAULT_PORT),
+            user=profile.user,
+            password=profile.password,
+            database=profile.db,
+            charset="utf8mb4",
+            autocommit=False
+        )
+
+    def get_pool(self):
+        """
+        Returns the connection pool. Creates the pool on the first call and
+        establishes the minimal number of connections.
+
+        Returns:
+            The ConnectionPool.
+        """
+        pool = self.pool
+        if pool is None:
+            with self.pool_lock:
+                pool = self.pool
+                if pool is None:
+                    pool = ConnectionPool(
+                        self.connect,
+                        **get_pool_settings(self.db_profile)
+                    )
+                    self.pool = pool
+            # Warm up the pool outside of the lock, other threads can take
+            # the connections established so far in the meantime.
+            pool.fill()
+        return pool
+
+    def acquire(self):
+        pool = self.get_pool()
+        conn = pool.checkout()
+        self.connection_pools[id(conn)] = pool
+        self.active_connections[threading.get_ident()] = conn
+        return conn
+
+    def release(self, conn, discard=False):
+        self.active_connections.pop(threading.get_ident(), None)
+        # Return the connection to the pool it was taken from, which closes
+        # the connection if the pool is closed. Never create a new pool here.
+        pool = self.connection_pools.pop(id(conn))
+        pool.checkin(conn, discard)
+
+    def get_num_driver_threads(self):
+        # Use a driver thread per connection of the pool. The size is read
+        # from the profile, the pool is created on a driver thread, as it
+        # establishes connections.
+        settings = get_pool_settings(self.db_profile)
+        return settings.get("max_size", DEFAULT_MAX_SIZE)
+
+    def interrupt(self, thread_id):
+        conn = self.active_connections.get(thread_id)
+        if conn is None:
+            return
+        # Kill the running statement from a separate connection, the
+        # connection of the statement is blocked until it completes. The
+        # separate connection is not taken from the pool, which may be
+        # exhausted.
+        killer = self.connect()
+        try:
+            cursor = killer.cursor()
+            cursor.execute("KILL QUERY %d" % conn.thread_id())
+            cursor.close()
+        finally:
+            killer.close()
+
+    def is_disconnect(self, error):
+        driver = self.get_driver()
+        return isinstance(error, (driver.OperationalError,
+                                  driver.InterfaceError))
 
-    def __init__(self, db_profile):
-        self.db_profile = db_profile
-        # self.conn = pymysql.connect(
-        #    host=db_profile.host,
-        #    port=db_profile.port,
-        #    user=db_profile.user,
-        #    password=db_profile.password,
-        #    database=db_profile.name
-        # )
-        # self.cursor = self.conn.cursor()
-
-    def create_table(self, model, database_fields):
-        statement = self.get_create_table_statement(model.__name__, None)
-        print(statement)
+    def close(self):
+        super().close()
+        with self.pool_lock:
+            pool = self.pool
+            self.pool = None
+        if pool is not None:
+            pool.close()
+
+    def reset_after_fork(self):
+        super().reset_after_fork()
+        # The pooled connections share their sockets with the parent. Closing
+        # them would end the sessions of the parent.
+        if self.pool is not None:
+            INHERITED_CONNECTIONS.append(self.pool)
+            self.pool = None
+        self.pool_lock = threading.Lock()
+        self.active_connections = {}
+        self.connection_pools = {}
+
+    def begin(self, cursor):
+        cursor.execute("START TRANSACTION")
 
     def exists_table(self, model):
-        pass
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "SELECT 1 FROM information_schema.tables WHERE "
+                    "table_schema = DATABASE() AND table_name = %s",
+                    (model.__name__,)
+                )
+                return cursor.fetchone() is not None
+            finally:
+                cursor.close()
+
+    def insert_rows(self, mapper, rows):
+        """
+        Inserts the given rows with multi-row INSERT statements, inside one
+        transaction. The rows are packed into as few statements as possible,
+        such that the estimated size of each statement fits into the packet
+        size limit of the profile: small rows are packed by thousands into a
+        statement, while rows with large values get a statement on their
+        own. A single row that exceeds the limit is still sent, on its own.
+
+        Args:
+            mapper (Mapper): The mapper of the model.
+            rows (list of tuple): The values of the rows, in the order of the
+                database fields of the mapper and converted to the values to
+                pass to the database.
+        Returns:
+            The ids of the inserted rows, in the order of the given rows.
+        """
+        rows = list(rows)
+        if len(rows) == 0:
+            return range(0)
+
+        self.check_schema(mapper)
+        return self.write_rows(mapper, rows, mapper.get_statement("insert"))
+
+    def upsert_rows(self, mapper, rows, conflict_fields, update_fields=None):
+        """
+        Inserts the given rows with multi-row INSERT ... ON DUPLICATE KEY
+        UPDATE statements, inside one transaction, packed like in
+        insert_rows(). Requires MySQL 8.0.19 or later, see
+        get_upsert_clause(). MySQL detects the existing rows by any unique
+        index of the table, not only by the index of the conflict fields; the
+        ids of rows that conflicted with another index are None.
+        """
+        rows = list(rows)
+        if len(rows) == 0:
+            return []
+
+        self.check_schema(mapper)
+        with self.transaction() as cursor:
+            ids = self.write_rows(
+                mapper,
+                rows,
+                mapper.get_upsert_statement(conflict_fields, update_fields)
+            )
+            return self.read_upserted_ids(cursor, mapper, rows, ids,
+                                          conflict_fields)
 
-    def save(self, instance):
-        pass
+    def write_rows(self, mapper, rows, statement):
+        """
+        Writes the given rows with the given INSERT statement, inside one
+        transaction, packed into multi-row statements, see insert_rows().
 
-    def get_create_table_statement(self, table_name, db_fields):
-        # [IF NOT EXISTS]
-        return "CREATE TABLE %s" % table_name
+        Args:
+            mapper (Mapper): The mapper of the model.
+            rows (list of tuple): The values of the rows, converted.
+            statement (Statement): The compiled INSERT statement for a single
+                row.
+        Returns:
+            The ids of the rows, in the order of the given rows.
+        """
+        # Split the INSERT statement into the part before the VALUES, the
+        # placeholders of a single row and the clauses after the VALUES.
+        prefix, _, values = statement.sql.partition(" VALUES ")
+        prefix += " VALUES "
+        end = values.index(")") + 1
+        row_sql, suffix = values[:end], values[end:]
+        max_size = (self.get_max_packet_size() - len(prefix) - len(suffix)
+                    - PACKET_OVERHEAD)
 
-    def get_create_table_statement_entry(self, db_field):
+        with self.transaction() as cursor:
+            ids = self.generate_ids(cursor, mapper, len(rows))
+            chunks = split_rows(
+                [row + (id,) for row, id in zip(rows, ids)],
+                max_size
+            )
+            for chunk in chunks:
+                cursor.execute(
+                    prefix + ", ".join([row_sql] * len(chunk)) + suffix,
+                    [value for row in chunk for value in row]
+                )
+        return ids
+
+    def fetch(self, statement, params, batch_size):
+        """
+        Executes the given query and yields its rows. Outside of a
+        transaction, the rows are streamed with an unbuffered cursor
+        (SSCursor): the default cursor of pymysql reads the whole result into
+        memory on execute(), so fetchmany() would only slice a materialized
+        list. The connection is kept checked out until all rows are read. A
+        connection whose result is not read completely, e.g. because the
+        iteration is stopped early, is discarded, instead of transferring all
+        remaining rows. Inside of a transaction, a buffered cursor is used,
+        as an unread result blocks all other statements on the connection of
+        the transaction.
+
+        Args:
+            statement (str): The query to execute.
+            params (sequence): The parameters of the query.
+            batch_size (int): The number of rows to fetch at once.
+        Yields:
+            The rows of the query.
+        """
+        if self.transaction_state.conn is not None:
+            yield from super().fetch(statement, params, batch_size)
+            return
+
+        conn = self.acquire()
+        is_unread = False
+        discard = False
+        try:
+            cursor = conn.cursor(self.get_driver().cursors.SSCursor)
+            cursor.execute(statement, params)
+            is_unread = True
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if len(rows) == 0:
+                    break
+                yield from rows
+            is_unread = False
+            cursor.close()
+        except BaseException as error:
+            discard = is_unread or self.is_disconnect(error)
+            raise
+        finally:
+            self.release(conn, discard)
+
+    def get_max_packet_size(self):
+        """
+        Returns the maximal size of a statement, in bytes, as given by the
+        max_packet_size of the profile. Should match the max_allowed_packet
+        setting of the server.
+        """
+        max_packet_size = getattr(self.db_profile, "max_packet_size", None)
+        if max_packet_size is None:
+            return DEFAULT_MAX_PACKET_SIZE
+        return int(max_packet_size)
+
+    def get_table_columns(self, table_name):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "SELECT column_name FROM information_schema.columns "
+                    "WHERE table_schema = DATABASE() AND table_name = %s",
+                    (table_name,)
+                )
+                columns = {row[0] for row in cursor.fetchall()}
+            finally:
+                cursor.close()
+        return columns or None
+
+    def allocate_ids(self, cursor, table_name, num):
+        # Lock the end of the id index, such that concurrent transactions can
+        # not allocate the same ids.
+        cursor.execute("SELECT MAX(%s) FROM %s FOR UPDATE" % (
+            self.quote(self.id_column),
+            self.quote(table_name)
+        ))
+        max_id = cursor.fetchone()[0] or 0
+        return range(max_id + 1, max_id + 1 + num)
+
+    def get_upsert_clause(self, conflict_columns, update_columns):
+        # MySQL detects the conflicts by the unique indexes itself.
+        if len(update_columns) == 0:
+            # Keep the existing rows as they are.
+            id_column = self.quote(self.id_column)
+            return "ON DUPLICATE KEY UPDATE %s = %s" % (id_column, id_column)
+        # Refer to the inserted values by an alias of the inserted rows, which
+        # requires MySQL 8.0.19. The former VALUES() function is deprecated.
+        alias = self.quote(UPSERT_ALIAS)
+        return "AS %s ON DUPLICATE KEY UPDATE " % alias + ", ".join(
+            "%s = %s.%s" % (self.quote(column), alias, self.quote(column))
+            for column in update_columns
+        )
+
+    def get_converter(self, db_field):
+        if isinstance(db_field, DatabaseListField):
+            return convert_list
+        return None
+
+    def get_result_converter(self, db_field):
+        if isinstance(db_field, DatabaseBooleanField):
+            return parse_bool
+        if isinstance(db_field, DatabaseListField):
+            return parse_list
+        if isinstance(db_field, DatabaseTimeField):
+            return parse_time_delta
+        return None
+
+    def get_create_table_statements(self, table_name, db_fields, db_indexes):
+        # Create the indexes together with the table, MySQL does not support
+        # CREATE INDEX IF NOT EXISTS.
+        return [self.get_create_table_statement(
+            table_name,
+            db_fields,
+            db_indexes
+        )]
+
+    def get_create_table_statement(self, table_name, db_fields,
+                                   db_indexes=None):
+        entries = ["%s BIGINT NOT NULL PRIMARY KEY" %
+                   self.quote(self.id_column)]
+        for name, db_field in db_fields.items():
+            entries.append(self.get_create_table_statement_entry(
+                name,
+                db_field
+            ))
+        for db_index in db_indexes or []:
+            entries.append(self.get_index_entry(
+                table_name,
+                db_fields,
+                db_index
+            ))
+        return "CREATE TABLE IF NOT EXISTS %s (%s) ENGINE=InnoDB " \
+               "DEFAULT CHARSET=utf8mb4" % (
+                   self.quote(table_name),
+                   ", ".join(entries)
+               )
+
+    def get_create_table_statement_entry(self, name, db_field):
         """
         Returns the entry for the given field in the CREATE TABLE statement.
 
         Args:
+            name (str): The name of the field.
             db_field (DatabaseField): The database field to process.
         Returns:
             The entry for the given field in the CREATE TABLE statement.
         """
-        pass
+        column_type = get_column_type(db_field)
+        entry = "%s %s" % (self.quote(name), column_type)
+        if getattr(db_field, "unsigned", False):
+            entry += " UNSIGNED"
+        if db_field.mandatory:
+            entry += " NOT NULL"
+        default_value = db_field.default_value
+        if (default_value is not None
+                and not column_type.endswith(NO_DEFAULT_TYPES)):
+            entry += " DEFAULT " + render_literal(default_value)
+        return entry
+
+    def get_index_entry(self, table_name, db_fields, db_index):
+        """
+        Returns the entry for the given index in the CREATE TABLE statement.
+        TEXT and BLOB columns are indexed by a prefix of their values.
+
+        Args:
+            table_name (str): The name of the table.
+            db_fields (dict of str:DatabaseField): The database fields.
+            db_index (DatabaseIndex): The index to process.
+        Returns:
+            The entry for the given index in the CREATE TABLE statement.
+        """
+        columns = []
+        for name in db_index.fields:
+            column = self.quote(name)
+            db_field = db_fields.get(name)
+            if db_field is not None:
+                if get_column_type(db_field).endswith(NO_DEFAULT_TYPES):
+                    column += "(%d)" % INDEX_PREFIX_LENGTH
+            columns.append(column)
+        return "%sINDEX %s (%s)" % (
+            "UNIQUE " if db_index.unique else "",
+            self.quote(db_index.get_name(table_name)),
+            ", ".join(columns)
+        )
+
+
+def get_column_type(db_field):
+    """
+    Returns the MySQL column type for the given database field, without the
+    UNSIGNED attribute.
+
+    >>> get_column_type(DatabaseStringField("name", max_length=30))
+    'VARCHAR(30)'
+    >>> get_column_type(DatabaseIntField(min_value=0, max_value=100))
+    'TINYINT'
+    >>> get_column_type(DatabaseDoubleField(min_value=0, max_value=1000,
+    ...                                     precision=2))
+    'DOUBLE(6,2)'
+
+    Args:
+        db_field (DatabaseField): The database field to process.
+    Returns:
+        The column type.
+    """
+    if isinstance(db_field, DatabaseStringField):
+        max_length = db_field.max_length
+        if max_length is None:
+            return COLUMN_TYPES[DatabaseStringField]
+        if max_length <= MAX_VARCHAR_LENGTH:
+            return "VARCHAR(%d)" % max_length
+        if max_length <= MAX_MEDIUMTEXT_LENGTH:
+            return "MEDIUMTEXT"
+        return "LONGTEXT"
+
+    if isinstance(db_field, DatabaseIntField):
+        column_type = get_int_type(db_field)
+        if db_field.width is not None:
+            column_type += "(%d)" % db_field.width
+        return column_type
+
+    if isinstance(db_field, (DatabaseFloatField, DatabaseDoubleField)):
+        column_type = COLUMN_TYPES[type(db_field)]
+        # The total number of digits is only known for bounded values, the
+        # precision of unbounded values is kept by rounding on writes.
+        precision = db_field.precision
+        min_value = db_field.min_value
+        max_value = db_field.max_value
+        if precision is not None and None not in (min_value, max_value):
+            num_digits = len(str(int(max(abs(min_value), abs(max_value)))))
+            column_type += "(%d,%d)" % (num_digits + precision, precision)
+        return column_type
+
+    return COLUMN_TYPES.get(type(db_field), "LONGTEXT")
+
+
+def get_int_type(db_field):
+    """
+    Returns the smallest integer column type that holds all values between
+    the bounds of the given int field, or INT if the field is not bounded.
+
+    Args:
+        db_field (DatabaseIntField): The database field to process.
+    Returns:
+        The integer column type.
+    """
+    min_value = db_field.min_value
+    max_value = db_field.max_value
+    if db_field.choices:
+        min_value = min(db_field.choices)
+        max_value = max(db_field.choices)
+    if db_field.unsigned and min_value is None:
+        min_value = 0
+    if min_value is None or max_value is None:
+        # Unbounded values that exceed the range of INT need a BIGINT.
+        for bound in (min_value, max_value):
+            if bound is not None and not -2 ** 31 <= bound < 2 ** 31:
+                return "BIGINT"
+        return "INT"
+
+    for column_type, num_bits in INT_TYPES:
+        if db_field.unsigned:
+            low, high = 0, 2 ** num_bits - 1
+        else:
+            low, high = -2 ** (num_bits - 1), 2 ** (num_bits - 1) - 1
+        if low <= min_value and max_value <= high:
+            return column_type
+    return "BIGINT"
+
+
+def render_literal(value):
+    """
+    Renders the given value as a literal, to be used as DEFAULT value.
+
+    >>> render_literal("it's")
+    "'it''s'"
+
+    Args:
+        value (object): The value to render.
+    Returns:
+        The literal.
+    """
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat(sep=" ")
+    elif isinstance(value, (datetime.date, datetime.time)):
+        value = value.isoformat()
+    elif not isinstance(value, str):
+        value = convert_list(value)
+    return "'%s'" % value.replace("\\", "\\\\").replace("'", "''")
+
+
+def estimate_size(value):
+    """
+    Estimates the number of bytes of the given value, rendered as a literal
+    into a statement by the driver.
+
+    Args:
+        value (object): The value to process, converted to the value to pass
+            to the driver.
+    Returns:
+        The estimated size of the literal, in bytes.
+    """
+    if value is None:
+        return 4
+    if isinstance(value, str):
+        size = len(value) if value.isascii() else len(value.encode("utf-8"))
+        return size + 2 + sum(value.count(char) for char in ESCAPED_CHARS)
+    if isinstance(value, (bytes, bytearray)):
+        # Binary values are rendered as _binary'...'.
+        return len(value) + 9 + sum(value.count(char)
+                                    for char in ESCAPED_BYTES)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return 28
+    return len(str(value))
+
+
+def split_rows(rows, max_size):
+    """
+    Splits the given rows into chunks, such that the estimated size of the
+    values of each chunk, rendered as a multi-row VALUES list, does not
+    exceed the given size. A row that exceeds the size on its own forms a
+    chunk of its own.
+
+    >>> split_rows([("a", 1), ("b", 2), ("c", 3)], 20)
+    [[('a', 1), ('b', 2)], [('c', 3)]]
+
+    Args:
+        rows (list of tuple): The rows to split.
+        max_size (int): The maximal size of a chunk, in bytes.
+    Returns:
+        The list of chunks, each a list of rows.
+    """
+    chunks = []
+    chunk = []
+    chunk_size = 0
+    for row in rows:
+        # The values, their separators and the parentheses of the row.
+        row_size = sum(map(estimate_size, row)) + 2 * len(row) + 2
+        if len(chunk) > 0 and chunk_size + row_size > max_size:
+            chunks.append(chunk)
+            chunk = []
+            chunk_size = 0
+        chunk.append(row)
+        chunk_size += row_size
+    if len(chunk) > 0:
+        chunks.append(chunk)
+    return chunks
+
+
+def get_pool_settings(db_profile):
+    """
+    Returns the settings of the connection pool given by the given profile.
+
+    Args:
+        db_profile (DatabaseProfile): The profile to process.
+    Returns:
+        The keyword arguments to create the ConnectionPool with.
+    """
+    settings = {}
+    for attribute, (name, parse) in POOL_SETTINGS.items():
+        value = getattr(db_profile, attribute, None)
+        if value is not None:
+            settings[name] = parse(value)
+    return settings
 
 # CREATE TABLE MyGuests (
 # id INT(6) UNSIGNED AUTO_INCREMENT PRIMARY KEY,
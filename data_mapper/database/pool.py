@@ -0,0 +1,310 @@
+import threading
+import time
+
+from collections import deque
+from contextlib import contextmanager
+
+from data_mapper.exceptions import DataMapperError
+
+# The maximal number of open connections of a pool, if no size is given.
+DEFAULT_MAX_SIZE = 10
+
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of DB-API 2.0 connections. Connections are
+    established on demand, up to the maximal size of the pool, and handed
+    out in LIFO order so that warm connections are reused first. Connections
+    that exceeded their maximal lifetime or were idle for too long are
+    closed and replaced on checkout.
+    """
+    def __init__(self, connect, min_size=0, max_size=DEFAULT_MAX_SIZE,
+                 timeout=30.0, max_lifetime=None, max_idle=None,
+                 clock=time.monotonic):
+        """
+        Creates a new connection pool. No connection is established until
+        fill() or checkout() is called.
+
+        Args:
+            connect (function): The function to establish a new connection,
+                without arguments.
+            min_size (int, optional): The number of connections to establish
+                on fill().
+            max_size (int, optional): The maximal number of open connections.
+            timeout (float, optional): The maximal number of seconds to wait
+                for a free connection on checkout.
+            max_lifetime (float, optional): The maximal number of seconds a
+                connection is used, measured from its establishment.
+            max_idle (float, optional): The maximal number of seconds a
+                connection may be idle before it is recycled.
+            clock (function, optional): The function that returns the current
+                time, in seconds.
+        """
+        if max_size < 1:
+            raise ValueError("The maximal size of the pool must be positive.")
+        if min_size < 0 or min_size > max_size:
+            raise ValueError("The minimal size of the pool must be in the "
+                             "range [0, %d]." % max_size)
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.clock = clock
+        # The idle connections, as (connection, created, returned) tuples.
+        self.idle = deque()
+        # The establishment times of the checked out connections, per id of
+        # the connection.
+        self.in_use = {}
+        # The number of connections that are being established.
+        self.num_pending = 0
+        # A boolean flag that indicates whether this pool is closed.
+        self.is_closed = False
+        self.condition = threading.Condition()
+        # The counters of the pool metrics.
+        self.stats = {
+            "checkouts": 0,
+            "checkins": 0,
+            "created": 0,
+            "recycled": 0,
+            "discarded": 0,
+            "timeouts": 0,
+            "wait_time": 0.0,
+            "max_wait_time": 0.0
+        }
+
+    def get_num_open(self):
+        """
+        Returns the number of open connections, including the connections
+        that are being established. Must be called with the lock held.
+        """
+        return len(self.idle) + len(self.in_use) + self.num_pending
+
+    def fill(self):
+        """
+        Establishes new connections until the pool holds at least the minimal
+        number of open connections. Used to warm up the pool on startup, such
+        that the first requests do not pay for the connection setup.
+        """
+        while True:
+            with self.condition:
+                if self.is_closed or self.get_num_open() >= self.min_size:
+                    return
+                self.num_pending += 1
+            try:
+                conn = self.create()
+            finally:
+                with self.condition:
+                    self.num_pending -= 1
+            with self.condition:
+                if not self.is_closed:
+                    now = self.clock()
+                    self.idle.append((conn, now, now))
+                    self.condition.notify()
+                    continue
+            close_quietly(conn)
+
+    def checkout(self):
+        """
+        Takes a connection from the pool. Establishes a new connection if
+        there is no idle connection and the pool is not exhausted; waits for
+        a connection to be returned otherwise. Raises a PoolTimeoutError if
+        no connection gets available in time.
+
+        Returns:
+            The connection. Must be returned with checkin().
+        """
+        start = self.clock()
+        deadline = None if self.timeout is None else start + self.timeout
+        expired = []
+        try:
+            with self.condition:
+                while True:
+                    if self.is_closed:
+                        raise PoolClosedError(
+                            code=1,
+                            msg="The connection pool is closed."
+                        )
+                    # Reuse the most recently returned connection.
+                    while len(self.idle) > 0:
+                        conn, created, returned = self.idle.pop()
+                        if self.is_expired(created, returned):
+                            expired.append(conn)
+                            self.stats["recycled"] += 1
+                            continue
+                        self.register_checkout(conn, created, start)
+                        return conn
+                    # Establish a new connection, if the pool is not exhausted.
+                    if self.get_num_open() < self.max_size:
+                        self.num_pending += 1
+                        break
+                    # Wait for a connection to be returned.
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - self.clock()
+                        if remaining <= 0:
+                            self.stats["timeouts"] += 1
+                            raise PoolTimeoutError(
+                                code=1,
+                                msg="No connection available after %s "
+                                    "seconds (%d connections in use).",
+                                args=(self.timeout, len(self.in_use))
+                            )
+                    self.condition.wait(remaining)
+        finally:
+            # Close the expired connections outside of the lock.
+            for expired_conn in expired:
+                close_quietly(expired_conn)
+
+        # Establish the connection outside of the lock, such that other
+        # threads are not blocked by the connection setup.
+        try:
+            conn = self.create()
+        except BaseException:
+            with self.condition:
+                self.num_pending -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.num_pending -= 1
+            self.register_checkout(conn, self.clock(), start)
+        return conn
+
+    def checkin(self, conn, discard=False):
+        """
+        Returns the given connection to the pool.
+
+        Args:
+            conn (Connection): The connection to return, taken with
+                checkout().
+            discard (bool, optional): A boolean flag that indicates whether to
+                close the connection instead of reusing it, e.g. because it is
+                broken.
+        """
+        with self.condition:
+            created = self.in_use.pop(id(conn), None)
+            if created is None:
+                raise ValueError("The connection was not taken from this "
+                                 "pool.")
+            self.stats["checkins"] += 1
+            now = self.clock()
+            close = discard or self.is_closed or self.is_expired(created, now)
+            if close:
+                self.stats["discarded" if discard else "recycled"] += 1
+            else:
+                self.idle.append((conn, created, now))
+            self.condition.notify()
+        if close:
+            close_quietly(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Returns a context manager that takes a connection from the pool and
+        returns it on leaving the context.
+
+        Yields:
+            The connection.
+        """
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    def close(self):
+        """
+        Closes all idle connections. Connections in use are closed when they
+        are returned. No connections can be taken from a closed pool.
+        """
+        with self.condition:
+            self.is_closed = True
+            idle = [conn for conn, _, _ in self.idle]
+            self.idle.clear()
+            self.condition.notify_all()
+        for conn in idle:
+            close_quietly(conn)
+
+    def get_stats(self):
+        """
+        Returns the metrics of this pool.
+
+        Returns:
+            A dictionary with the number of open, idle and used connections,
+            the number of checkouts, checkins, created, recycled and discarded
+            connections, the number of checkout timeouts and the total and
+            maximal time spent waiting on checkout, in seconds.
+        """
+        with self.condition:
+            stats = dict(self.stats)
+            stats["open"] = self.get_num_open()
+            stats["idle"] = len(self.idle)
+            stats["in_use"] = len(self.in_use)
+        return stats
+
+    # =========================================================================
+    # Utility methods.
+
+    def create(self):
+        """
+        Establishes a new connection and counts it.
+        """
+        conn = self.connect()
+        with self.condition:
+            self.stats["created"] += 1
+        return conn
+
+    def is_expired(self, created, returned):
+        """
+        Returns True if a connection established at the given time and
+        returned to the pool at the given time must be recycled.
+        """
+        now = self.clock()
+        if self.max_lifetime is not None:
+            if now - created >= self.max_lifetime:
+                return True
+        if self.max_idle is not None:
+            if now - returned >= self.max_idle:
+                return True
+        return False
+
+    def register_checkout(self, conn, created, start):
+        """
+        Marks the given connection as in use and updates the metrics. Must be
+        called with the lock held.
+        """
+        self.in_use[id(conn)] = created
+        wait_time = self.clock() - start
+        self.stats["checkouts"] += 1
+        self.stats["wait_time"] += wait_time
+        self.stats["max_wait_time"] = max(self.stats["max_wait_time"],
+                                          wait_time)
+
+
+def close_quietly(conn):
+    """
+    Closes the given connection and ignores any errors, e.g. if the
+    connection is already broken.
+    """
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+# =============================================================================
+# Errors.
+
+
+class PoolTimeoutError(DataMapperError):
+    """
+    An error to raise if no connection could be taken from a pool in time.
+    """
+    prefix = "An error occurred on taking a connection from a pool: "
+
+
+class PoolClosedError(DataMapperError):
+    """
+    An error to raise on taking a connection from a closed pool.
+    """
+    prefix = "An error occurred on taking a connection from a pool: "
@@ -1,13 +1,14 @@
 import os
 import sys
-import configparser
+import threading
 
-from collections import OrderedDict
+from types import MappingProxyType
 
 from data_mapper.database.base import Database
 from data_mapper.database.base import DatabaseProfile
 from data_mapper.database.base import DatabaseSystem
 from data_mapper.database.mysql import MySQLDatabase
+from data_mapper.database.schema import SchemaCache
 from data_mapper.database.sqlite import SQLiteDatabase
 
 from data_mapper.exceptions import DataMapperError
@@ -17,22 +18,45 @@ class DatabaseRegistry:
     """
     A database registry to manage (1) various database instances with various
     database systems and (2) various database profiles.
+
+    The registered databases, profiles and database instances are published
+    as read-only snapshots. Writers build a new snapshot under the lock and
+    replace the old one in a single step, such that lookups need no lock and
+    never see a partial update.
     """
     # The registered databases, per system ("mysql", "sqlite", etc.).
-    registered_databases = OrderedDict()
+    registered_databases = MappingProxyType({})
     # The registered database profiles, per profile name.
-    registered_profiles = OrderedDict()
+    registered_profiles = MappingProxyType({})
+    # The database instances, shared by all users of a profile, per key of the
+    # profile.
+    database_instances = MappingProxyType({})
+    # The lock to guard the modifications of this registry.
+    lock = threading.RLock()
+    # The number of times database instances were dropped or profiles were
+    # reloaded. Used by DatabaseReference to detect outdated databases.
+    generation = 0
+    # The parsed profile config files, as (stat key, sections) tuples per
+    # path. Kept on clear(), such that initializing again does not parse an
+    # unchanged file.
+    parsed_files = {}
+    # The names of the profiles read from a profile config file, per path.
+    profile_files = {}
     # A boolean flag to indicate whether this registry is initialized.
     is_initialized = False
 
     @classmethod
     def clear(cls):
         """
-        Clears the registered databases and the registered profiles.
+        Clears the registered databases and the registered profiles. Closes
+        and drops the database instances created so far.
         """
-        cls.registered_databases.clear()
-        cls.registered_profiles.clear()
-        cls.is_initialized = False
+        with cls.lock:
+            cls.clear_database_instances()
+            cls.registered_databases = MappingProxyType({})
+            cls.registered_profiles = MappingProxyType({})
+            cls.profile_files.clear()
+            cls.is_initialized = False
 
     @classmethod
     def initialize(cls, profiles_file_path=None):
@@ -57,6 +81,9 @@ class DatabaseRegistry:
             # Register the profiles.
             for profile in profiles:
                 cls.register_profile(profile)
+            cls.profile_files[profiles_file_path] = [
+                profile.name for profile in profiles
+            ]
 
         # The registry is now initialized.
         cls.is_initialized = True
@@ -78,7 +105,13 @@ class DatabaseRegistry:
 
         # Register the database, with the lowercased db system as key.
         db_system_str = database.system.value.lower()
-        cls.registered_databases[db_system_str] = database
+        with cls.lock:
+            # Drop the instances of a database registered before for the
+            # system.
+            cls.clear_database_instances(db_system_str)
+            registered_databases = dict(cls.registered_databases)
+            registered_databases[db_system_str] = database
+            cls.registered_databases = MappingProxyType(registered_databases)
 
     @classmethod
     def register_profile(cls, profile):
@@ -93,17 +126,104 @@ class DatabaseRegistry:
         cls.validate_profile(profile, error_to_raise=RegisterProfileError)
 
         # Register the profile, with the name as key.
-        cls.registered_profiles[profile.name] = profile
+        with cls.lock:
+            registered_profiles = dict(cls.registered_profiles)
+            registered_profiles[profile.name] = profile
+            cls.registered_profiles = MappingProxyType(registered_profiles)
+
+    @classmethod
+    def reload_profiles(cls, path):
+        """
+        Reads the profiles from the given profile config file again and
+        replaces the profiles read from the file before, at once. Profiles
+        that were not changed keep their database instances; the instances of
+        changed and removed profiles are closed and dropped. Unlike
+        initialize(), this neither clears the registered databases nor drops
+        the instances of other profiles.
+
+        Args:
+            path (str): The path to the profile config file.
+        Returns:
+            True if any profile was changed, added or removed; False
+            otherwise.
+        """
+        profiles = cls.read_profiles_from_file(path)
+        for profile in profiles:
+            cls.validate_profile(profile, error_to_raise=RegisterProfileError)
+
+        with cls.lock:
+            old_names = cls.profile_files.get(path, [])
+            old_keys = {cls.registered_profiles[name].get_key()
+                        for name in old_names
+                        if name in cls.registered_profiles}
+            # Build the new profiles aside and publish them in a single step.
+            registered_profiles = dict(
+                (name, profile)
+                for name, profile in cls.registered_profiles.items()
+                if name not in old_names
+            )
+            for profile in profiles:
+                registered_profiles[profile.name] = profile
+            # The keys include the names and all settings of the profiles.
+            new_keys = {profile.get_key() for profile in profiles}
+            if old_keys == new_keys:
+                return False
+            cls.registered_profiles = MappingProxyType(registered_profiles)
+            cls.profile_files[path] = [profile.name for profile in profiles]
+            cls.generation += 1
+
+            # Drop the instances of the outdated profiles.
+            outdated = old_keys - new_keys
+            cls.drop_database_instances(
+                lambda key, database: key in outdated
+            )
+        return True
+
+    @classmethod
+    def watch_profiles_file(cls, path, interval=1.0):
+        """
+        Starts a daemon thread that checks the given profile config file
+        periodically and reloads the profiles on changes, see
+        reload_profiles(). Opt-in; the profiles are never reloaded otherwise.
+
+        Args:
+            path (str): The path to the profile config file.
+            interval (float, optional): The number of seconds between two
+                checks of the file.
+        Returns:
+            The started ProfilesFileWatcher. Call its stop() method to stop
+            watching the file.
+        """
+        watcher = ProfilesFileWatcher(cls, path, interval)
+        watcher.start()
+        return watcher
 
     # =========================================================================
     # Getter methods.
 
+    @classmethod
+    def get_reference(cls, profile_name=None, profile=None):
+        """
+        Returns a reference to the database related to the given profile name
+        or the given profile, see get_database(). The database is requested on
+        the first use of the reference.
+
+        Args:
+            profile_name (str, optional): The name of an registered profile.
+            profile (DatabaseProfile, optional): The profile to use.
+        Returns:
+            The DatabaseReference.
+        """
+        return DatabaseReference(cls, profile_name, profile)
+
     @classmethod
     def get_database(cls, profile_name=None, profile=None):
         """
         Returns the database related to the given profile name or the given
         profile. If there is no profile given, the last profile in the profile
-        config file is chosen.
+        config file is chosen. The database is created and the profile is
+        validated on the first request only; all following requests with a
+        profile of the same settings share the database and its connection.
 
         Args:
             profile_name (str, optional): The name of an registered profile.
@@ -119,11 +239,94 @@ class DatabaseRegistry:
             # Fetch the latest of the registered profiles.
             profile = cls.get_last_registered_profile()
 
-        # Validate the profile.
-        cls.validate_profile(profile, error_to_raise=GetDatabaseError)
+        # Return the shared database instance, if there is any.
+        if isinstance(profile, DatabaseProfile):
+            database = cls.database_instances.get(profile.get_key())
+            if database is not None:
+                return database
+
+        with cls.lock:
+            # Validate the profile.
+            cls.validate_profile(profile, error_to_raise=GetDatabaseError)
+
+            # Check again, another thread may have created the instance in
+            # the meantime.
+            key = profile.get_key()
+            database = cls.database_instances.get(key)
+            if database is None:
+                # Instantiate a database instance, related to the profile.
+                database = cls.registered_databases[profile.system](profile)
+                database_instances = dict(cls.database_instances)
+                database_instances[key] = database
+                cls.database_instances = MappingProxyType(database_instances)
+            return database
 
-        # Instantiate a database instance, related to the given profile.
-        return cls.registered_databases[profile.system](profile)
+    @classmethod
+    def clear_database_instances(cls, db_system=None):
+        """
+        Closes and drops the database instances created so far, such that the
+        next call of get_database() creates new instances. The cached schemas
+        of the dropped instances are invalidated.
+
+        Args:
+            db_system (str, optional): The lowercased db system of the
+                instances to drop. All instances are dropped if no system is
+                given.
+        """
+        with cls.lock:
+            cls.generation += 1
+            cls.drop_database_instances(
+                lambda key, database: (db_system is None
+                                       or database.system.value == db_system)
+            )
+
+    @classmethod
+    def drop_database_instances(cls, condition):
+        """
+        Closes and drops the database instances that fulfill the given
+        condition, and invalidates their cached schemas. Must be called with
+        the lock held.
+
+        Args:
+            condition (function): The function that returns True if the given
+                key of a profile and the given database instance are to be
+                dropped.
+        """
+        database_instances = {}
+        dropped = []
+        for key, database in cls.database_instances.items():
+            if condition(key, database):
+                dropped.append(database)
+            else:
+                database_instances[key] = database
+        cls.database_instances = MappingProxyType(database_instances)
+        for database in dropped:
+            database.close()
+            # Forget the schemas, the tables may change until the database is
+            # requested again.
+            SchemaCache.invalidate(database)
+
+    @classmethod
+    def reset_after_fork(cls):
+        """
+        Drops the connections, connection pools and driver threads inherited
+        from the parent process, in a child process created by os.fork(),
+        e.g. a worker of a process pool. Called automatically in the child,
+        see os.register_at_fork(). The registered databases and profiles,
+        the parsed profile config files and the database instances are kept,
+        such that workers neither parse the config again nor register their
+        mappers again; the instances connect again on first use. Watchers of
+        profile config files are not inherited and must be started again in
+        the child, if needed.
+        """
+        # The locks may have been held by other threads of the parent.
+        cls.lock = threading.RLock()
+        SchemaCache.lock = threading.Lock()
+        Database.executor_lock = threading.Lock()
+        # The generation is kept, such that the database references of the
+        # mappers stay valid.
+        for database in cls.database_instances.values():
+            database.reset_after_fork()
 
     @classmethod
     def get_profile(cls, profile_name):
@@ -306,13 +509,41 @@ class DatabaseRegistry:
             dict of str:DatabaseProfile. A dictionary that maps profile names
                 to the related DatabaseProfile objects.
         """
-        # Check if the given path exists.
-        if not os.access(path, os.F_OK):
+        # Check if the given path exists. The parsed file is cached by its
+        # modification time and size, such that an unchanged file is parsed
+        # only once.
+        try:
+            stat = os.stat(path)
+        except OSError:
             raise ParseProfileConfigFileError(
                 code=1,
                 msg="The profile config file '%s' does not exist.",
                 args=path,
             )
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        parsed_file = cls.parsed_files.get(path)
+        if parsed_file is not None and parsed_file[0] == stat_key:
+            sections = parsed_file[1]
+        else:
+            sections = cls.parse_profiles_file(path)
+            cls.parsed_files[path] = (stat_key, sections)
+
+        # Create new DatabaseProfile objects on every call, the profiles are
+        # mutable.
+        return [cls.create_profile(name, section)
+                for name, section in sections]
+
+    @classmethod
+    def parse_profiles_file(cls, path):
+        """
+        Parses the given profile config file.
+
+        Args:
+            path (str): The path to the file to parse.
+        Returns:
+            list of (str, dict of str:str). The names of the profiles, with
+                the options of the related sections.
+        """
         # Check if the given path can be read.
         if not os.access(path, os.R_OK):
             raise ParseProfileConfigFileError(
@@ -320,7 +551,9 @@ class DatabaseRegistry:
                 msg="The profile config file '%s' can not be read.",
                 args=path
             )
-        # Read the profile file using a config parser.
+        # Read the profile file using a config parser, imported on the first
+        # read only.
+        import configparser
         try:
             profile_file = configparser.ConfigParser()
             profile_file.read(path)
@@ -335,26 +568,139 @@ class DatabaseRegistry:
         # No need to check if profile_names is empty here, because
         # the method config_parser.read() ensures that there is at least one
         # section.
+        return [(name, dict(profile_file[name])) for name in db_profile_names]
+
+    @classmethod
+    def create_profile(cls, name, section):
+        """
+        Creates a database profile from the given section of a profile config
+        file.
+
+        Args:
+            name (str): The name of the profile.
+            section (dict of str:str): The options of the section.
+        Returns:
+            The DatabaseProfile.
+        """
+        db_profile = DatabaseProfile(name)
+        db_profile.system = section.get("system")
+        db_profile.host = section.get("host")
+        db_profile.port = section.get("port")
+        db_profile.user = section.get("user")
+        db_profile.password = section.get("password")
+        db_profile.db = section.get("db")
+        db_profile.pool_min_size = section.get("pool_min_size")
+        db_profile.pool_max_size = section.get("pool_max_size")
+        db_profile.pool_timeout = section.get("pool_timeout")
+        db_profile.pool_max_lifetime = section.get("pool_max_lifetime")
+        db_profile.pool_max_idle = section.get("pool_max_idle")
+        db_profile.max_packet_size = section.get("max_packet_size")
+        return db_profile
+
+
+class DatabaseReference:
+    """
+    A lazy reference to the database of a profile. The database is requested
+    from the registry on the first use, and requested again if database
+    instances were dropped or profiles were reloaded since, such that holders
+    of a reference never use an outdated database.
+    """
+    def __init__(self, registry, profile_name=None, profile=None):
+        """
+        Creates a new reference. Does not request the database.
+
+        Args:
+            registry (DatabaseRegistry): The registry to request the database
+                from.
+            profile_name (str, optional): The name of an registered profile.
+            profile (DatabaseProfile, optional): The profile to use.
+        """
+        self.registry = registry
+        self.profile_name = profile_name
+        self.profile = profile
+        # The resolved database, as (generation, database) tuple.
+        self.resolved = None
+
+    def __call__(self):
+        """
+        Returns the referenced database.
+        """
+        resolved = self.resolved
+        generation = self.registry.generation
+        if resolved is None or resolved[0] != generation:
+            database = self.registry.get_database(
+                profile_name=self.profile_name,
+                profile=self.profile
+            )
+            resolved = (generation, database)
+            self.resolved = resolved
+        return resolved[1]
+
+
+class ProfilesFileWatcher(threading.Thread):
+    """
+    A daemon thread that reloads the profiles of a profile config file on
+    changes, see DatabaseRegistry.watch_profiles_file().
+    """
+    def __init__(self, registry, path, interval=1.0):
+        """
+        Creates a new watcher. Call start() to start watching.
+
+        Args:
+            registry (DatabaseRegistry): The registry to reload the profiles
+                of.
+            path (str): The path to the profile config file.
+            interval (float, optional): The number of seconds between two
+                checks of the file.
+        """
+        super().__init__(name="ProfilesFileWatcher", daemon=True)
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        # The modification time and size of the file, as last read by the
+        # registry. A file that was not read yet is reloaded on the first
+        # check.
+        parsed_file = registry.parsed_files.get(path)
+        self.stat_key = parsed_file[0] if parsed_file is not None else None
+        # The error raised on the last reload, if any.
+        self.error = None
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            stat_key = self.get_stat_key()
+            if stat_key == self.stat_key:
+                continue
+            try:
+                self.registry.reload_profiles(self.path)
+                self.error = None
+                self.stat_key = stat_key
+            except DataMapperError as error:
+                # Keep the current profiles, e.g. if the file is being
+                # written. Retry on the next check.
+                self.error = error
+
+    def stop(self):
+        """
+        Stops watching the file and waits for the thread to finish.
+        """
+        self.stopped.set()
+        self.join()
+
+    def get_stat_key(self):
+        """
+        Returns the modification time and size of the watched file, or None
+        if the file does not exist.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
 
-        # Read the individual database profile sections.
-        db_profiles = []
-        for db_profile_name in db_profile_names:
-            # Get the section in profile file that represents a single profile.
-            db_profile_section = profile_file[db_profile_name]
-
-            # Create the related DatabaseProfile object.
-            db_profile = DatabaseProfile(db_profile_name)
-            db_profile.system = db_profile_section.get("system")
-            db_profile.host = db_profile_section.get("host")
-            db_profile.port = db_profile_section.get("port")
-            db_profile.user = db_profile_section.get("user")
-            db_profile.password = db_profile_section.get("password")
-            db_profile.db = db_profile_section.get("db")
-
-            # Add the profile to the index.
-            db_profiles.append(db_profile)
-
-        return db_profiles
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=DatabaseRegistry.reset_after_fork)
 
 # =============================================================================
 # Errors.
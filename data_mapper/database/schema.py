@@ -0,0 +1,103 @@
+import threading
+
+from data_mapper.exceptions import DataMapperError
+
+
+class SchemaCache:
+    """
+    A per-process cache of the table schemas known to match the database
+    fields of the models. A schema is identified by the profile of the
+    database, the name of the table and the fingerprint of the fields (see
+    compute_fingerprint()). Once a schema was verified by introspection, the
+    check on the hot path is a set lookup. The cache must be invalidated
+    explicitly if the tables are changed outside of this process, e.g. after
+    a migration.
+    """
+    # The verified schemas, as (profile key, table name, fingerprint) tuples.
+    verified_schemas = set()
+    # The tables created by this process, as (profile key, table name,
+    # fingerprint) tuples. The fingerprints include the indexes.
+    created_tables = set()
+    # The lock to guard the modifications of the cache.
+    lock = threading.Lock()
+
+    @classmethod
+    def get_key(cls, database, table_name, fingerprint):
+        """
+        Returns the key of the given schema.
+
+        Args:
+            database (Database): The database of the table.
+            table_name (str): The name of the table.
+            fingerprint (str): The fingerprint of the database fields.
+        Returns:
+            The key of the schema.
+        """
+        return (database.db_profile.get_key(), table_name, fingerprint)
+
+    @classmethod
+    def is_verified(cls, key):
+        """
+        Returns True if the schema with the given key was verified.
+        """
+        return key in cls.verified_schemas
+
+    @classmethod
+    def mark_verified(cls, key):
+        """
+        Marks the schema with the given key as verified.
+        """
+        with cls.lock:
+            cls.verified_schemas.add(key)
+
+    @classmethod
+    def is_created(cls, key):
+        """
+        Returns True if the table with the given key was created.
+        """
+        return key in cls.created_tables
+
+    @classmethod
+    def mark_created(cls, key):
+        """
+        Marks the table with the given key as created.
+        """
+        with cls.lock:
+            cls.created_tables.add(key)
+
+    @classmethod
+    def invalidate(cls, database=None, table_name=None):
+        """
+        Drops the cached schemas, such that they are verified again on their
+        next use.
+
+        Args:
+            database (Database, optional): The database to drop the schemas
+                of. The schemas of all databases are dropped if no database is
+                given.
+            table_name (str, optional): The name of the table to drop the
+                schemas of. The schemas of all tables are dropped if no table
+                name is given.
+        """
+        profile_key = None
+        if database is not None:
+            profile_key = database.db_profile.get_key()
+
+        def keep(key):
+            return ((profile_key is not None and key[0] != profile_key)
+                    or (table_name is not None and key[1] != table_name))
+
+        with cls.lock:
+            cls.verified_schemas = set(filter(keep, cls.verified_schemas))
+            cls.created_tables = set(filter(keep, cls.created_tables))
+
+# =============================================================================
+# Errors.
+
+
+class SchemaError(DataMapperError):
+    """
+    An error to raise if a table does not match the database fields of its
+    model.
+    """
+    prefix = "An error occurred on checking the schema of a table: "
@@ -0,0 +1,978 @@
+import threading
+
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from data_mapper.database.base import Database
+from data_mapper.database.base import INHERITED_CONNECTIONS
+from data_mapper.database.fields import compute_fingerprint
+from data_mapper.database.schema import SchemaCache
+from data_mapper.database.schema import SchemaError
+
+# The rendered DDL statements, per database class, table name and fingerprint
+# of the fields and indexes.
+DDL_CACHE = {}
+
+# The name of the table with the sequences of the HiLoIdGenerator.
+SEQUENCE_TABLE = "data_mapper_sequences"
+
+# The maximal number of rows and parameters per query that reads the ids of
+# upserted rows, see read_upserted_ids(). The limits of compound SELECTs and
+# parameters of SQLite.
+MAX_LOOKUP_ROWS = 500
+MAX_LOOKUP_PARAMS = 999
+
+# =============================================================================
+# SQL Database.
+
+
+class SQLDatabase(Database):
+    """
+    An abstract class that acts as an interface to any database system that is
+    accessed via SQL statements and a DB-API 2.0 compliant driver.
+    """
+    # The placeholder for parameters in SQL statements.
+    placeholder = "?"
+    # The character to use on quoting identifiers like table or column names.
+    identifier_quote = '"'
+    # The name of the primary key column, in each table.
+    id_column = "id"
+
+    def __init__(self, db_profile):
+        """
+        Creates a new SQL database. The connections to the database are not
+        established until they are needed for the first time.
+
+        Args:
+            db_profile (DatabaseProfile): The profile of the database.
+        """
+        self.db_profile = db_profile
+        # The connection of the current thread, see get_connection().
+        self.local = threading.local()
+        # The connections of all threads, per ident of the thread. Used to
+        # close the connections of all threads.
+        self.connections = {}
+        # The lock to guard the modifications of the connections.
+        self.connections_lock = threading.Lock()
+        # The state of the running transaction, per thread.
+        self.transaction_state = TransactionState()
+
+    def connect(self):
+        """
+        Establishes a new connection to the underlying database.
+
+        Returns:
+            A DB-API 2.0 compliant connection.
+        """
+        raise NotImplementedError()
+
+    def get_connection(self):
+        """
+        Returns the connection of the current thread to the underlying
+        database. Establishes the connection if the thread has no connection
+        yet. Connections are thread-affine, such that threads never share a
+        connection and need no lock to use it.
+
+        Returns:
+            A DB-API 2.0 compliant connection.
+        """
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.connect()
+            self.local.conn = conn
+            with self.connections_lock:
+                dead = self.prune_connections()
+                self.connections[threading.get_ident()] = conn
+            for dead_conn in dead:
+                dead_conn.close()
+        return conn
+
+    def prune_connections(self):
+        """
+        Drops the connections of the threads that are no longer alive. Must be
+        called with the connections lock held.
+
+        Returns:
+            The dropped connections, to be closed by the caller.
+        """
+        alive = {thread.ident for thread in threading.enumerate()}
+        dead = [thread_id for thread_id in self.connections
+                if thread_id not in alive]
+        return [self.connections.pop(thread_id) for thread_id in dead]
+
+    def close(self):
+        """
+        Closes the connections of all threads to the underlying database.
+        """
+        super().close()
+        with self.connections_lock:
+            connections = list(self.connections.values())
+            self.connections = {}
+            # Threads holding a closed connection connect again on their next
+            # request, see get_connection().
+            self.local = threading.local()
+        for conn in connections:
+            conn.close()
+
+    def reset_after_fork(self):
+        super().reset_after_fork()
+        INHERITED_CONNECTIONS.extend(self.connections.values())
+        self.local = threading.local()
+        self.connections = {}
+        # The lock may have been held by another thread of the parent.
+        self.connections_lock = threading.Lock()
+        # Transactions of the parent are not continued in the child.
+        self.transaction_state = TransactionState()
+
+    def acquire(self):
+        """
+        Returns a connection to execute statements with, outside of any
+        running transaction. Database systems with a connection pool should
+        override this method and release().
+
+        Returns:
+            A DB-API 2.0 compliant connection.
+        """
+        return self.get_connection()
+
+    def release(self, conn, discard=False):
+        """
+        Releases the given connection, taken with acquire().
+
+        Args:
+            conn (Connection): The connection to release.
+            discard (bool, optional): A boolean flag that indicates whether
+                the connection is broken and must not be reused.
+        """
+        pass
+
+    def is_disconnect(self, error):
+        """
+        Returns True if the given error indicates a broken connection.
+
+        Args:
+            error (BaseException): The error to process.
+        Returns:
+            True if the connection the error was raised on must be discarded.
+        """
+        return False
+
+    @contextmanager
+    def connection(self):
+        """
+        Returns a context manager that provides a connection to execute
+        statements with. Inside of a running transaction, the connection of
+        the transaction is provided.
+
+        Yields:
+            A DB-API 2.0 compliant connection.
+        """
+        state = self.transaction_state
+        if state.conn is not None:
+            yield state.conn
+            return
+
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except BaseException as error:
+            discard = self.is_disconnect(error)
+            raise
+        finally:
+            self.release(conn, discard)
+
+    def begin(self, cursor):
+        """
+        Starts a new transaction on the given cursor.
+
+        Args:
+            cursor (Cursor): The cursor to process.
+        """
+        cursor.execute("BEGIN")
+
+    @contextmanager
+    def transaction(self):
+        """
+        Returns a context manager that runs the enclosed statements inside a
+        single transaction. The transaction is committed on leaving the
+        outermost context and rolled back if an error occurred. Nested
+        contexts join the running transaction.
+
+        Yields:
+            A cursor to execute the statements with.
+        """
+        # Join the running transaction, if there is any.
+        state = self.transaction_state
+        if state.cursor is not None:
+            yield state.cursor
+            return
+
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                self.begin(cursor)
+                state.conn = conn
+                state.cursor = cursor
+                yield cursor
+                conn.commit()
+                callbacks = state.callbacks
+            except BaseException:
+                try:
+                    conn.rollback()
+                finally:
+                    for callback in state.rollback_callbacks:
+                        callback()
+                raise
+            finally:
+                state.conn = None
+                state.cursor = None
+                state.callbacks = []
+                state.rollback_callbacks = []
+                cursor.close()
+
+        for callback in callbacks:
+            callback()
+
+    def on_commit(self, callback):
+        """
+        Registers the given function to be called after the running
+        transaction was committed. The function is not called if the
+        transaction is rolled back.
+
+        Args:
+            callback (function): The function to call, without arguments.
+        """
+        self.transaction_state.callbacks.append(callback)
+
+    def on_rollback(self, callback):
+        """
+        Registers the given function to be called after the running
+        transaction was rolled back. The function is not called if the
+        transaction is committed.
+
+        Args:
+            callback (function): The function to call, without arguments.
+        """
+        self.transaction_state.rollback_callbacks.append(callback)
+
+    # =========================================================================
+    # Database methods.
+
+    def exists_table(self, model):
+        raise NotImplementedError()
+
+    def create_table(self, model, database_fields, database_indexes=None):
+        """
+        Creates the table and the indexes for the given model, if they do not
+        exist yet. The DDL statements are rendered once per table and
+        fingerprint of the fields and indexes, and issued once per process
+        and database (see SchemaCache); repeated calls for an unchanged model
+        do not touch the database.
+        """
+        table_name = model.__name__
+        fingerprint = compute_fingerprint(database_fields, database_indexes)
+        key = SchemaCache.get_key(self, table_name, fingerprint)
+        if SchemaCache.is_created(key):
+            return True
+
+        statements = self.get_ddl(
+            table_name,
+            database_fields,
+            database_indexes,
+            fingerprint
+        )
+        with self.transaction() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+        SchemaCache.mark_created(key)
+
+        # Verify the table right away, it may have existed before with other
+        # columns.
+        self.verify_columns(
+            table_name,
+            database_fields,
+            self.get_table_columns(table_name)
+        )
+        SchemaCache.mark_verified(SchemaCache.get_key(
+            self,
+            table_name,
+            compute_fingerprint(database_fields)
+        ))
+        return True
+
+    def check_schema(self, mapper):
+        """
+        Checks that the table of the model of the given mapper exists and has
+        a column per database field. The table is introspected once per
+        process and fingerprint of the fields; all following checks are
+        lookups in the SchemaCache. A missing table is created, a table with
+        missing columns raises a SchemaError.
+
+        Args:
+            mapper (Mapper): The mapper of the model.
+        """
+        key = mapper.schema_key
+        if key is None:
+            key = mapper.schema_key = SchemaCache.get_key(
+                self,
+                mapper.model.__name__,
+                compute_fingerprint(mapper.database_fields)
+            )
+        if not SchemaCache.is_verified(key):
+            self.verify_schema(mapper, key)
+
+    def verify_schema(self, mapper, key):
+        """
+        Verifies the schema of the table of the model of the given mapper by
+        introspection and marks it as verified. See check_schema().
+
+        Args:
+            mapper (Mapper): The mapper of the model.
+            key (tuple): The key of the schema in the SchemaCache.
+        """
+        table_name = mapper.model.__name__
+        columns = self.get_table_columns(table_name)
+        if columns is None:
+            mapper.create_db_table()
+        else:
+            self.verify_columns(table_name, mapper.database_fields, columns)
+        SchemaCache.mark_verified(key)
+
+    def verify_columns(self, table_name, database_fields, columns):
+        """
+        Checks that the given columns of the given table contain a column per
+        given database field. Raises a SchemaError otherwise.
+
+        Args:
+            table_name (str): The name of the table.
+            database_fields (dict of str:DatabaseField): The database fields.
+            columns (set of str): The names of the columns of the table.
+        """
+        missing = [name for name in
+                   [self.id_column] + list(database_fields)
+                   if name not in (columns or ())]
+        if len(missing) > 0:
+            raise SchemaError(
+                code=1,
+                msg="The table '%s' has no columns for the fields %s.",
+                args=(table_name, ", ".join(missing))
+            )
+
+    def get_table_columns(self, table_name):
+        """
+        Returns the names of the columns of the given table.
+
+        Args:
+            table_name (str): The name of the table.
+        Returns:
+            The set of column names, or None if there is no such table.
+        """
+        raise NotImplementedError()
+
+    def save(self, instance):
+        return self.save_many([instance])
+
+    def save_many(self, instances):
+        """
+        Writes the given model instances to the underlying database, using a
+        single executemany() per statement type inside one transaction.
+        Instances without an id are inserted (and get an id assigned). Stored
+        instances are updated, but only in their dirty fields; stored
+        instances without any dirty fields are skipped. All instances must be
+        instances of the same model.
+
+        Args:
+            instances (list of Model): The model instances to write.
+        Returns:
+            True if the instances were successfully written to the database;
+            False otherwise.
+        """
+        instances = list(instances)
+        if len(instances) == 0:
+            return True
+
+        mapper = instances[0].mapper
+
+        # Split the instances into new instances and dirty stored instances,
+        # grouped by their dirty fields.
+        new_instances = []
+        dirty_instances = OrderedDict()
+        for instance in instances:
+            if instance.id is None:
+                new_instances.append(instance)
+            elif instance.dirty_fields:
+                dirty_fields = frozenset(instance.dirty_fields)
+                dirty_instances.setdefault(dirty_fields, []).append(instance)
+
+        if len(new_instances) == 0 and len(dirty_instances) == 0:
+            return True
+
+        self.check_schema(mapper)
+        with self.transaction() as cursor:
+            if len(new_instances) > 0:
+                extract = mapper.get_statement("insert").extract
+                ids = self.insert_rows(mapper, [
+                    extract(instance) for instance in new_instances
+                ])
+                # Assign the ids only after the transaction was committed.
+                self.on_commit(lambda: assign_ids(new_instances, ids))
+            for dirty_fields, group in dirty_instances.items():
+                statement = mapper.get_statement("update", dirty_fields)
+                extract = statement.extract
+                cursor.executemany(statement.sql, [
+                    extract(instance) + (instance.id,)
+                    for instance in group
+                ])
+            self.on_commit(lambda: mark_clean(instances))
+        return True
+
+    def insert_rows(self, mapper, rows):
+        """
+        Inserts the given rows with a single executemany(), inside one
+        transaction. The ids of the rows are generated by generate_ids().
+
+        Args:
+            mapper (Mapper): The mapper of the model.
+            rows (list of tuple): The values of the rows, in the order of the
+                database fields of the mapper and converted to the values to
+                pass to the database.
+        Returns:
+            The ids of the inserted rows, in the order of the given rows.
+        """
+        rows = list(rows)
+        if len(rows) == 0:
+            return range(0)
+
+        self.check_schema(mapper)
+        statement = mapper.get_statement("insert")
+        with self.transaction() as cursor:
+            ids = self.generate_ids(cursor, mapper, len(rows))
+            cursor.executemany(statement.sql, [
+                row + (id,) for row, id in zip(rows, ids)
+            ])
+        return ids
+
+    def upsert_rows(self, mapper, rows, conflict_fields, update_fields=None):
+        """
+        Inserts the given rows with a single executemany(), inside one
+        transaction, and updates the existing rows with the same values in
+        the conflict fields instead. The ids of the rows are generated by
+        generate_ids(); the ids of rows that are updated are skipped.
+
+        Args:
+            mapper (Mapper): The mapper of the model.
+            rows (list of tuple): The values of the rows, in the order of the
+                database fields of the mapper and converted to the values to
+                pass to the database.
+            conflict_fields (list of str): The names of the fields of a unique
+                index, which identify the existing rows.
+            update_fields (list of str, optional): The names of the fields to
+                update in existing rows. Defaults to all fields except for the
+                conflict fields.
+        Returns:
+            The ids of the rows, in the order of the given rows, see
+            read_upserted_ids().
+        """
+        rows = list(rows)
+        if len(rows) == 0:
+            return []
+
+        self.check_schema(mapper)
+        statement = mapper.get_upsert_statement(conflict_fields, update_fields)
+        with self.transaction() as cursor:
+            ids = self.generate_ids(cursor, mapper, len(rows))
+            cursor.executemany(statement.sql, [
+                row + (id,) for row, id in zip(rows, ids)
+            ])
+            return self.read_upserted_ids(cursor, mapper, rows, ids,
+                                          conflict_fields)
+
+    def select(self, mapper, where=None, max_num=None, batch_size=1000,
+               order_by=None):
+        """
+        Reads the rows of the table of the model of the given mapper, lazily.
+        The rows are fetched from a cursor with fetchmany(), so only a single
+        batch of rows is held in memory at any time. The rows are ordered by
+        the given field and their ids. The SQL of the query is cached by the
+        mapper, per shape of the filter expression.
+
+        Args:
+            mapper (Mapper): The mapper of the model.
+            where (Expression, optional): The filter expression the rows must
+                match.
+            max_num (int, optional): The maximal number of rows to read.
+            batch_size (int, optional): The number of rows to fetch from the
+                database at once.
+            order_by (str, optional): The name of the field to sort the rows
+                by, before their ids.
+        Returns:
+            An iterator over the rows, each row consisting of the id followed
+            by the values of the database fields of the mapper.
+        """
+        statement = mapper.get_query(
+            where,
+            limited=max_num is not None,
+            order_by=order_by
+        )
+        params = []
+        if where is not None:
+            where.add_params(params, mapper.convert_param)
+        if max_num is not None:
+            params.append(max_num)
+        return self.fetch(statement, params, batch_size)
+
+    def fetch(self, statement, params, batch_size):
+        """
+        Executes the given query and yields its rows. The rows are fetched
+        from the cursor in batches of the given size.
+
+        Args:
+            statement (str): The query to execute.
+            params (sequence): The parameters of the query.
+            batch_size (int): The number of rows to fetch at once.
+        Yields:
+            The rows of the query.
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(statement, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if len(rows) == 0:
+                        break
+                    yield from rows
+            finally:
+                cursor.close()
+
+    # =========================================================================
+    # Utility methods.
+
+    def read_upserted_ids(self, cursor, mapper, rows, ids, conflict_fields):
+        """
+        Reads the ids of the given upserted rows: inserted rows have the
+        generated ids, while updated rows keep the ids of the existing rows.
+        The rows are looked up by the values of their conflict fields, with a
+        SELECT per row combined by UNION ALL, such that the database compares
+        the values like on detecting the conflicts.
+
+        Args:
+            cursor (Cursor): The cursor of the transaction of the upsert.
+            mapper (Mapper): The mapper of the model.
+            rows (list of tuple): The values of the upserted rows, converted.
+            ids (sequence of int): The generated ids of the rows.
+            conflict_fields (list of str): The names of the fields of the
+                unique index, which identify the existing rows.
+        Returns:
+            The ids of the rows, in the order of the given rows. Rows with a
+            NULL in a conflict field never conflict and keep the generated
+            id. The id is None for the rows that are not found, e.g. if they
+            conflicted with another unique index.
+        """
+        fields = list(mapper.database_fields)
+        indexes = [fields.index(name) for name in conflict_fields]
+        select = "SELECT %s, %s FROM %s WHERE %s" % (
+            self.placeholder,
+            self.quote(self.id_column),
+            self.quote(mapper.model.__name__),
+            " AND ".join(
+                "%s = %s" % (self.quote(name), self.placeholder)
+                for name in conflict_fields
+            )
+        )
+        lookups = [i for i, row in enumerate(rows)
+                   if all(row[index] is not None for index in indexes)]
+        chunk_size = min(MAX_LOOKUP_ROWS,
+                         MAX_LOOKUP_PARAMS // (len(indexes) + 1))
+        found = {}
+        for start in range(0, len(lookups), chunk_size):
+            chunk = lookups[start:start + chunk_size]
+            params = []
+            for i in chunk:
+                params.append(i)
+                params.extend(rows[i][index] for index in indexes)
+            cursor.execute(" UNION ALL ".join([select] * len(chunk)), params)
+            found.update(cursor.fetchall())
+        looked_up = set(lookups)
+        return [found.get(i) if i in looked_up else id
+                for i, id in enumerate(ids)]
+
+    def generate_ids(self, cursor, mapper, num):
+        """
+        Generates <num>-many ids for new rows of the model of the given
+        mapper, with the id generator of the mapper (see IdGenerator). Falls
+        back to allocate_ids() if the mapper has no id generator. Must be
+        called inside of a transaction that locks the table for writing.
+
+        Args:
+            cursor (Cursor): The cursor of the running transaction.
+            mapper (Mapper): The mapper of the model.
+            num (int): The number of ids to generate.
+        Returns:
+            The generated ids, in a sequence.
+        """
+        table_name = mapper.model.__name__
+        if mapper.id_generator is None:
+            return self.allocate_ids(cursor, table_name, num)
+        return mapper.id_generator.generate(self, table_name, num)
+
+    def next_sequence_value(self, name, increment=1):
+        """
+        Increments the sequence with the given name by the given increment,
+        in the sequence table (see create_sequence_table()). A new sequence
+        starts at 0. Inside of a running transaction, the increment is part
+        of it.
+
+        Args:
+            name (str): The name of the sequence.
+            increment (int, optional): The increment.
+        Returns:
+            The value of the sequence before the increment.
+        """
+        table = self.quote(SEQUENCE_TABLE)
+        name_column = self.quote("name")
+        value_column = self.quote("next_value")
+        with self.transaction() as cursor:
+            # Lock the row of the sequence by updating it first.
+            cursor.execute(
+                "UPDATE %s SET %s = %s + %s WHERE %s = %s" % (
+                    table, value_column, value_column, self.placeholder,
+                    name_column, self.placeholder
+                ),
+                (increment, name)
+            )
+            if cursor.rowcount == 0:
+                cursor.execute(
+                    "INSERT INTO %s (%s, %s) VALUES (%s, %s)" % (
+                        table, name_column, value_column, self.placeholder,
+                        self.placeholder
+                    ),
+                    (name, increment)
+                )
+                return 0
+            cursor.execute(
+                "SELECT %s FROM %s WHERE %s = %s" % (
+                    value_column, table, name_column, self.placeholder
+                ),
+                (name,)
+            )
+            return cursor.fetchone()[0] - increment
+
+    def create_sequence_table(self):
+        """
+        Creates the sequence table of next_sequence_value(), if it does not
+        exist yet.
+        """
+        with self.transaction() as cursor:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS %s (%s VARCHAR(255) NOT NULL "
+                "PRIMARY KEY, %s BIGINT NOT NULL)" % (
+                    self.quote(SEQUENCE_TABLE),
+                    self.quote("name"),
+                    self.quote("next_value")
+                )
+            )
+
+    def allocate_ids(self, cursor, table_name, num):
+        """
+        Allocates <num>-many consecutive ids for new rows in the given table.
+        Must be called inside of a transaction that locks the table for
+        writing.
+
+        Args:
+            cursor (Cursor): The cursor of the running transaction.
+            table_name (str): The name of the table.
+            num (int): The number of ids to allocate.
+        Returns:
+            The allocated ids, as a range.
+        """
+        cursor.execute("SELECT MAX(%s) FROM %s" % (
+            self.quote(self.id_column),
+            self.quote(table_name)
+        ))
+        max_id = cursor.fetchone()[0] or 0
+        return range(max_id + 1, max_id + 1 + num)
+
+    def get_converter(self, db_field):
+        """
+        Returns a function that converts values of the given field to values
+        that can be passed to the driver.
+
+        Args:
+            db_field (DatabaseField): The database field to process.
+        Returns:
+            The function to convert the values, or None if the values can be
+            passed to the driver as they are.
+        """
+        return None
+
+    def get_result_converter(self, db_field):
+        """
+        Returns a function that converts values of the given field, as read
+        from the driver, back to the values of the model.
+
+        Args:
+            db_field (DatabaseField): The database field to process.
+        Returns:
+            The function to convert the values, or None if the values can be
+            used as they are.
+        """
+        return None
+
+    def quote(self, identifier):
+        """
+        Quotes the given identifier (like a table or column name).
+
+        Args:
+            identifier (str): The identifier to quote.
+        Returns:
+            The quoted identifier.
+        """
+        quote = self.identifier_quote
+        return quote + identifier.replace(quote, quote * 2) + quote
+
+    def get_ddl(self, table_name, db_fields, db_indexes=None,
+                fingerprint=None):
+        """
+        Returns the DDL statements that create the given table with the given
+        fields and indexes. The statements are served from a cache, per
+        database class, table name and fingerprint.
+
+        Args:
+            table_name (str): The name of the table.
+            db_fields (dict of str:DatabaseField): The database fields.
+            db_indexes (list of DatabaseIndex, optional): The indexes.
+            fingerprint (str, optional): The fingerprint of the fields and
+                indexes, see compute_fingerprint().
+        Returns:
+            The list of DDL statements.
+        """
+        if fingerprint is None:
+            fingerprint = compute_fingerprint(db_fields, db_indexes)
+        key = (type(self), table_name, fingerprint)
+        statements = DDL_CACHE.get(key)
+        if statements is None:
+            statements = self.get_create_table_statements(
+                table_name,
+                db_fields,
+                db_indexes or []
+            )
+            DDL_CACHE[key] = statements
+        return statements
+
+    def get_create_table_statements(self, table_name, db_fields, db_indexes):
+        """
+        Renders the DDL statements that create the given table with the given
+        fields and indexes. Database systems that support indexes inside the
+        CREATE TABLE statement should override this method.
+
+        Args:
+            table_name (str): The name of the table.
+            db_fields (dict of str:DatabaseField): The database fields.
+            db_indexes (list of DatabaseIndex): The indexes.
+        Returns:
+            The list of DDL statements.
+        """
+        statements = [self.get_create_table_statement(table_name, db_fields)]
+        for db_index in db_indexes:
+            statements.append(self.get_create_index_statement(
+                table_name,
+                db_index
+            ))
+        return statements
+
+    def get_create_table_statement(self, table_name, db_fields):
+        """
+        Returns the CREATE TABLE statement for the given table and fields.
+
+        Args:
+            table_name (str): The name of the table.
+            db_fields (dict of str:DatabaseField): The database fields.
+        Returns:
+            The CREATE TABLE statement.
+        """
+        raise NotImplementedError()
+
+    def get_create_index_statement(self, table_name, db_index):
+        """
+        Returns the CREATE INDEX statement for the given index.
+
+        Args:
+            table_name (str): The name of the table.
+            db_index (DatabaseIndex): The index.
+        Returns:
+            The CREATE INDEX statement.
+        """
+        return "CREATE %sINDEX IF NOT EXISTS %s ON %s (%s)" % (
+            "UNIQUE " if db_index.unique else "",
+            self.quote(db_index.get_name(table_name)),
+            self.quote(table_name),
+            ", ".join(self.quote(field) for field in db_index.fields)
+        )
+
+    def get_insert_statement(self, table_name, columns):
+        """
+        Returns the INSERT statement for the given table and columns. The id
+        column is expected as the last parameter.
+
+        Args:
+            table_name (str): The name of the table.
+            columns (list of str): The names of the columns to insert.
+        Returns:
+            The INSERT statement.
+        """
+        columns = list(columns) + [self.id_column]
+        return "INSERT INTO %s (%s) VALUES (%s)" % (
+            self.quote(table_name),
+            ", ".join(self.quote(column) for column in columns),
+            ", ".join([self.placeholder] * len(columns))
+        )
+
+    def get_upsert_statement(self, table_name, columns, conflict_columns,
+                             update_columns):
+        """
+        Returns the INSERT statement for the given table and columns that
+        updates the given columns of the existing row instead, if a row with
+        the same values in the given conflict columns exists. The id column
+        is expected as the last parameter.
+
+        Args:
+            table_name (str): The name of the table.
+            columns (list of str): The names of the columns to insert.
+            conflict_columns (list of str): The names of the columns of a
+                unique index, which identify the existing rows.
+            update_columns (list of str): The names of the columns to update
+                in existing rows. Existing rows are kept as they are if no
+                columns are given.
+        Returns:
+            The INSERT statement.
+        """
+        return "%s %s" % (
+            self.get_insert_statement(table_name, columns),
+            self.get_upsert_clause(conflict_columns, update_columns)
+        )
+
+    def get_upsert_clause(self, conflict_columns, update_columns):
+        """
+        Returns the clause of an INSERT statement that updates the given
+        columns of existing rows, see get_upsert_statement(). Renders the
+        ON CONFLICT clause of SQLite (and PostgreSQL); database systems with
+        another syntax should override this method.
+
+        Args:
+            conflict_columns (list of str): The names of the columns of a
+                unique index, which identify the existing rows.
+            update_columns (list of str): The names of the columns to update.
+        Returns:
+            The clause.
+        """
+        clause = "ON CONFLICT (%s)" % ", ".join(
+            self.quote(column) for column in conflict_columns
+        )
+        if len(update_columns) == 0:
+            return clause + " DO NOTHING"
+        return clause + " DO UPDATE SET " + ", ".join(
+            "%s = excluded.%s" % (self.quote(column), self.quote(column))
+            for column in update_columns
+        )
+
+    def get_select_statement(self, table_name, columns, where=None,
+                             limited=False, order_by=None):
+        """
+        Returns the SELECT statement that reads the id and the given columns
+        of the rows of the given table, ordered by the given column and their
+        ids.
+
+        Args:
+            table_name (str): The name of the table.
+            columns (list of str): The names of the columns to read.
+            where (Expression, optional): The filter expression the rows must
+                match.
+            limited (bool, optional): A boolean flag that indicates whether the
+                number of rows is limited. If so, the maximal number of rows is
+                expected as the last parameter.
+            order_by (str, optional): The name of the column to sort the rows
+                by, before their ids.
+        Returns:
+            The SELECT statement.
+        """
+        statement = "SELECT %s FROM %s" % (
+            ", ".join(self.quote(column) for column in
+                      [self.id_column] + list(columns)),
+            self.quote(table_name)
+        )
+        if where is not None:
+            statement += " WHERE " + where.render(self)
+        sort_columns = [self.id_column]
+        if order_by is not None:
+            sort_columns.insert(0, order_by)
+        statement += " ORDER BY %s" % ", ".join(
+            self.quote(column) for column in sort_columns
+        )
+        if limited:
+            statement += " LIMIT %s" % self.placeholder
+        return statement
+
+    def get_update_statement(self, table_name, columns):
+        """
+        Returns the UPDATE statement for the given table and columns. The id
+        of the row to update is expected as the last parameter.
+
+        Args:
+            table_name (str): The name of the table.
+            columns (list of str): The names of the columns to update.
+        Returns:
+            The UPDATE statement.
+        """
+        return "UPDATE %s SET %s WHERE %s = %s" % (
+            self.quote(table_name),
+            ", ".join("%s = %s" % (self.quote(column), self.placeholder)
+                      for column in columns),
+            self.quote(self.id_column),
+            self.placeholder
+        )
+
+
+class TransactionState(threading.local):
+    """
+    The state of the running transaction of a database, per thread. Each
+    thread runs its own transactions; nested transactions join the running
+    transaction of the same thread only.
+    """
+    def __init__(self):
+        # The connection of the running transaction, if there is any.
+        self.conn = None
+        # The cursor of the running transaction, if there is any.
+        self.cursor = None
+        # The functions to call after the running transaction was committed.
+        self.callbacks = []
+        # The functions to call after the running transaction was rolled
+        # back.
+        self.rollback_callbacks = []
+
+# =============================================================================
+# Utility functions.
+
+
+def assign_ids(instances, ids):
+    """
+    Assigns the given ids to the given instances.
+
+    Args:
+        instances (list of Model): The instances to process.
+        ids (iterable of int): The ids to assign, one per instance.
+    """
+    for instance, id in zip(instances, ids):
+        instance.id = id
+
+
+def mark_clean(instances):
+    """
+    Marks the given instances as unchanged.
+
+    Args:
+        instances (list of Model): The instances to process.
+    """
+    for instance in instances:
+        instance.mark_clean()
@@ -1,12 +1,162 @@
-from data_mapper.database.base import Database
+import itertools
+
 from data_mapper.database.base import DatabaseSystem
+from data_mapper.database.base import INHERITED_CONNECTIONS
+from data_mapper.database.converters import convert_list
+from data_mapper.database.converters import convert_time
+from data_mapper.database.converters import parse_bool
+from data_mapper.database.converters import parse_list
+from data_mapper.database.converters import parse_time
+from data_mapper.database.converters import parse_datetime
+from data_mapper.database.fields import DatabaseStringField
+from data_mapper.database.fields import DatabaseBooleanField
+from data_mapper.database.fields import DatabaseIntField
+from data_mapper.database.fields import DatabaseFloatField
+from data_mapper.database.fields import DatabaseDoubleField
+from data_mapper.database.fields import DatabaseListField
+from data_mapper.database.fields import DatabaseBinaryField
+from data_mapper.database.fields import DatabaseTimeField
+from data_mapper.database.fields import DatabaseDateTimeField
+from data_mapper.database.schema import SchemaCache
+from data_mapper.database.sql import SQLDatabase
+
+# The SQLite column types, per database field class.
+COLUMN_TYPES = {
+    DatabaseStringField: "TEXT",
+    DatabaseBooleanField: "INTEGER",
+    DatabaseIntField: "INTEGER",
+    DatabaseFloatField: "REAL",
+    DatabaseDoubleField: "REAL",
+    DatabaseListField: "TEXT",
+    DatabaseBinaryField: "BLOB",
+    DatabaseTimeField: "TEXT",
+    DatabaseDateTimeField: "TEXT"
+}
 
+# The counter of the in-memory databases, to give them unique names.
+MEMORY_IDS = itertools.count(1)
 
-class SQLiteDatabase(Database):
+
+class SQLiteDatabase(SQLDatabase):
     """
     A class that acts as an interface to an instance of a SQLite database.
+    Each thread uses its own connection. If the profile names no database
+    file, the threads share a named in-memory database, that lives until the
+    database is closed.
     """
     system = DatabaseSystem.SQLITE
+    # SQLite locks the whole database file on writes, concurrent writers only
+    # wait for each other.
+    single_writer = True
 
     def __init__(self, db_profile):
-        self.db_profile = db_profile
+        super().__init__(db_profile)
+        # The URI of the in-memory database, if no database file is given.
+        # The memdb VFS lets the connections of all threads open the same
+        # database, with the regular locking of database files.
+        self.memory_uri = "file:/data_mapper-%d?vfs=memdb" % next(MEMORY_IDS)
+        # The connection that keeps the in-memory database alive, as long as
+        # this database is open.
+        self.anchor = None
+
+    def connect(self):
+        # Import the driver on the first connection only, such that importing
+        # this module stays cheap.
+        import sqlite3
+        # Disable the implicit transactions of the sqlite3 module, the
+        # transactions are managed explicitly by transaction(). Allow the
+        # connection to be closed and interrupted by other threads.
+        if self.db_profile.db:
+            return sqlite3.connect(
+                self.db_profile.db,
+                isolation_level=None,
+                check_same_thread=False
+            )
+
+        # Use an in-memory database if there is no database file given.
+        with self.connections_lock:
+            if self.anchor is None:
+                self.anchor = sqlite3.connect(
+                    self.memory_uri,
+                    uri=True,
+                    check_same_thread=False
+                )
+        return sqlite3.connect(
+            self.memory_uri,
+            uri=True,
+            isolation_level=None,
+            check_same_thread=False
+        )
+
+    def close(self):
+        super().close()
+        with self.connections_lock:
+            anchor = self.anchor
+            self.anchor = None
+        if anchor is not None:
+            anchor.close()
+        if not self.db_profile.db:
+            # An in-memory database is gone with its connections.
+            SchemaCache.invalidate(self)
+
+    def reset_after_fork(self):
+        super().reset_after_fork()
+        # The inherited anchor keeps the child's copy of an in-memory
+        # database alive, such that new connections of the child open it.
+        if self.anchor is not None:
+            INHERITED_CONNECTIONS.append(self.anchor)
+            self.anchor = None
+
+    def interrupt(self, thread_id):
+        conn = self.connections.get(thread_id)
+        if conn is not None:
+            conn.interrupt()
+
+    def begin(self, cursor):
+        # Lock the database for writing right at the start of the transaction,
+        # such that the ids allocated by allocate_ids() stay unique.
+        cursor.execute("BEGIN IMMEDIATE")
+
+    def exists_table(self, model):
+        cursor = self.get_connection().execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (model.__name__,)
+        )
+        return cursor.fetchone() is not None
+
+    def get_table_columns(self, table_name):
+        cursor = self.get_connection().execute(
+            "SELECT name FROM pragma_table_info(?)",
+            (table_name,)
+        )
+        return {row[0] for row in cursor.fetchall()} or None
+
+    def get_converter(self, db_field):
+        if isinstance(db_field, DatabaseListField):
+            return convert_list
+        if isinstance(db_field, (DatabaseTimeField, DatabaseDateTimeField)):
+            return convert_time
+        return None
+
+    def get_result_converter(self, db_field):
+        if isinstance(db_field, DatabaseBooleanField):
+            return parse_bool
+        if isinstance(db_field, DatabaseListField):
+            return parse_list
+        if isinstance(db_field, DatabaseTimeField):
+            return parse_time
+        if isinstance(db_field, DatabaseDateTimeField):
+            return parse_datetime
+        return None
+
+    def get_create_table_statement(self, table_name, db_fields):
+        entries = ["%s INTEGER PRIMARY KEY" % self.quote(self.id_column)]
+        for name, db_field in db_fields.items():
+            entries.append("%s %s" % (
+                self.quote(name),
+                COLUMN_TYPES.get(type(db_field), "")
+            ))
+        return "CREATE TABLE IF NOT EXISTS %s (%s)" % (
+            self.quote(table_name),
+            ", ".join(entries)
+        )
@@ -1,6 +1,7 @@
 class DataMapperError(Exception):
     """
-    The base class of errors in the DataMapper.
+    The base class of errors in the DataMapper. The message of an error is
+    formatted lazily, on the first time it is read.
     """
     prefix = None
 
@@ -14,12 +15,30 @@ class DataMapperError(Exception):
             msg (str): The reason of this error, as a string.
             args (tuple of str): The arguments to plug into msg.
         """
+        # Keep the arguments in the args of the exception, such that errors
+        # can be pickled, e.g. across processes, and have a meaningful repr.
+        super().__init__(code, msg, args)
         self.code = code
-        message = ""
-        if self.prefix is not None:
-            message += self.prefix
-        if msg is not None:
-            message += msg
-        if args is not None:
-            message = message % args
-        super().__init__(message)
+        self.msg = msg
+        self.msg_args = args
+        self._message = None
+
+    @property
+    def message(self):
+        """
+        Returns the message of this error, with the prefix prepended and the
+        arguments plugged into the message.
+        """
+        if self._message is None:
+            message = ""
+            if self.prefix is not None:
+                message += self.prefix
+            if self.msg is not None:
+                message += self.msg
+            if self.msg_args is not None:
+                message = message % self.msg_args
+            self._message = message
+        return self._message
+
+    def __str__(self):
+        return self.message
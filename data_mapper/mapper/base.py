@@ -1,13 +1,710 @@
 # TODO: Implement logic to validate, save, edit, delete, get from database.
-# TODO: Unique ids.
-# TODO: Thread-safe?
+
+from data_mapper.mapper.codegen import compile_function
+from data_mapper.mapper.columns import drop_rows
+from data_mapper.mapper.columns import normalize_columns
+from data_mapper.mapper.columns import validate_columns
+from data_mapper.mapper.columns import round_columns
+from data_mapper.mapper.parallel import parallel_load
+from data_mapper.mapper.validation import compile_validator
+from data_mapper.mapper.validation import ValidationError
+from data_mapper.mapper.validation import ValidationReport
+from data_mapper.mapper.validation import MESSAGES
+from data_mapper.mapper.validation import get_constraint
+
+from data_mapper.query import After
+from data_mapper.query import Page
+from data_mapper.query import combine
+from data_mapper.query import encode_token
+from data_mapper.query import decode_token
 
 
 class Mapper:
-    def __init__(self, database, model, database_fields):
-        self.database = database
+    """
+    Maps the instances of a model to the rows of its table. Mappers are
+    shared by all threads: their caches of statements, queries and compiled
+    functions are filled lazily without a lock, since concurrent fills
+    compute equal values.
+    """
+    def __init__(self, database, model, database_fields,
+                 database_indexes=None, id_generator=None):
+        # The database, or a function without arguments that returns the
+        # database, see the property database.
+        self._database = database
         self.model = model
         self.database_fields = database_fields
+        self.database_indexes = database_indexes or []
+        # The IdGenerator of the ids of new rows, None to allocate the ids
+        # following the largest id in the table.
+        self.id_generator = id_generator
+        # The compiled statements, per operation and set of columns.
+        self.statements = {}
+        # The key of the schema of the table in the SchemaCache, computed on
+        # the first check.
+        self.schema_key = None
+        # The rendered queries, per shape of the filter expression.
+        self.queries = {}
+        # The converters of the values in filter expressions, per field name.
+        self.param_converters = None
+        # The compiled function that returns the values of all database fields
+        # of an instance, unconverted. Compiled on first use.
+        self.extract_values = None
+        # The compiled function that validates the values of all database
+        # fields of an instance. Compiled on first use.
+        self.check_values = None
+        # The compiled validators of column-oriented values, per tuple of the
+        # names of the fields validated row by row, see validate_columns().
+        self.column_validators = {}
+        # The compiled function that creates an instance from a row read from
+        # the database, compiled on first use.
+        self.load = None
+
+    @property
+    def database(self):
+        """
+        Returns the database of this mapper. If the mapper was created with a
+        function instead of a database, e.g. a DatabaseReference, the function
+        is called on each access; it is expected to resolve the database on
+        the first call and to return it cheaply afterwards. Thus, creating a
+        mapper neither resolves the database profile nor connects to the
+        database.
+        """
+        database = self._database
+        if callable(database):
+            return database()
+        return database
 
     def create_db_table(self):
-        self.database.create_table(self.model, self.database_fields)
+        self.database.create_table(
+            self.model,
+            self.database_fields,
+            self.database_indexes
+        )
+        if self.id_generator is not None:
+            self.id_generator.create_storage(self.database)
+
+    def get(self, where=None, max_num=None, batch_size=1000):
+        """
+        Reads the instances of the model from the database, lazily. Only a
+        single batch of rows is held in memory at any time, so that even
+        large tables can be scanned with constant memory.
+
+        Args:
+            where (Expression, optional): The filter expression the instances
+                must match.
+            max_num (int, optional): The maximal number of instances to read.
+            batch_size (int, optional): The number of rows to fetch from the
+                database at once.
+        Returns:
+            An iterator over the instances, ordered by their ids.
+        """
+        self.check_expression(where)
+        if self.load is None:
+            self.load = self.compile_loader()
+        rows = self.database.select(
+            self,
+            where=where,
+            max_num=max_num,
+            batch_size=batch_size
+        )
+        return map(self.load, rows)
+
+    def get_page(self, where=None, order_by=None, page_size=100, token=None):
+        """
+        Reads a page of instances of the model from the database, with keyset
+        pagination: instead of skipping the rows of the previous pages with an
+        OFFSET, the returned token encodes the position of the last row of the
+        page, which is turned into a range predicate on the next request.
+        Thus, reading a deep page costs the same as reading the first page.
+
+        Args:
+            where (Expression, optional): The filter expression the instances
+                must match.
+            order_by (str, optional): The name of the field to sort the
+                instances by, before their ids.
+            page_size (int, optional): The maximal number of instances per
+                page.
+            token (str, optional): The token of the previous page, None to
+                read the first page.
+        Returns:
+            The Page with the instances, ordered by the given field and their
+            ids, and the token of the next page.
+        """
+        if order_by is not None and order_by not in self.database_fields:
+            raise ValueError("Unknown field '%s'." % order_by)
+        if page_size < 1:
+            raise ValueError("The page size must be positive.")
+        self.check_expression(where)
+
+        expressions = [] if where is None else [where]
+        if token is not None:
+            value, id_value = decode_token(token, order_by)
+            expressions.append(After(order_by, value, id_value))
+        if self.load is None:
+            self.load = self.compile_loader()
+
+        # Read one row more than requested to detect whether there is a next
+        # page.
+        rows = list(self.database.select(
+            self,
+            where=combine(expressions),
+            max_num=page_size + 1,
+            batch_size=page_size + 1,
+            order_by=order_by
+        ))
+        next_token = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last_row = rows[-1]
+            value = None
+            if order_by is not None:
+                position = list(self.database_fields).index(order_by)
+                value = last_row[position + 1]
+            next_token = encode_token(order_by, value, last_row[0])
+        return Page([self.load(row) for row in rows], next_token)
+
+    def save(self, instance):
+        """
+        Writes the given instance to the database.
+
+        Args:
+            instance (Model): The instance to write.
+        Returns:
+            True if the instance was successfully written to the database;
+            False otherwise.
+        """
+        return self.database.save(instance)
+
+    def save_many(self, instances, validate=True):
+        """
+        Writes the given instances to the database, in a single batch.
+
+        Args:
+            instances (list of Model): The instances to write.
+            validate (bool, optional): A boolean flag that indicates whether
+                to validate the instances before writing them.
+        Returns:
+            True if the instances were successfully written to the database;
+            False otherwise.
+        """
+        if validate:
+            instances = list(instances)
+            for instance in instances:
+                self.validate(instance)
+        return self.database.save_many(instances)
+
+    def upsert_many(self, instances, conflict_fields, update_fields=None,
+                    validate=True):
+        """
+        Writes the given instances to the database, in a single batch: the
+        instances are inserted as new rows, unless a row with the same values
+        in the given conflict fields exists, which is updated instead. Unlike
+        reading the rows first and then saving the instances, this needs a
+        single round trip and can not race with concurrent writers. The
+        conflict fields must be covered by a unique index. After the commit,
+        the instances get the ids of their rows, the ids of the existing rows
+        for the updated instances, and are marked as unchanged. Instances
+        whose rows are not found keep no id, see
+        SQLDatabase.read_upserted_ids(), and must be re-read.
+
+        Args:
+            instances (list of Model): The instances to write.
+            conflict_fields (list of str): The names of the fields of a unique
+                index, which identify the existing rows.
+            update_fields (list of str, optional): The names of the fields to
+                update in existing rows. Defaults to all fields except for the
+                conflict fields. Existing rows are kept as they are if an empty
+                list is given.
+            validate (bool, optional): A boolean flag that indicates whether
+                to validate the instances before writing them.
+        Returns:
+            True if the instances were successfully written to the database;
+            False otherwise.
+        """
+        instances = list(instances)
+        if validate:
+            for instance in instances:
+                self.validate(instance)
+        statement = self.get_upsert_statement(conflict_fields, update_fields)
+        extract = statement.extract
+        database = self.database
+        with database.transaction():
+            ids = database.upsert_rows(
+                self,
+                [extract(instance) for instance in instances],
+                conflict_fields,
+                update_fields
+            )
+            # Assign the ids only after the transaction was committed.
+            database.on_commit(lambda: assign_upserted_ids(instances, ids))
+        return True
+
+    # =========================================================================
+    # Async methods. The blocking calls are run on the driver threads of the
+    # database, see Database.run_async().
+
+    async def aget(self, where=None, max_num=None, batch_size=1000):
+        """
+        The async variant of get(). Reads all instances at once.
+
+        Returns:
+            The list of the instances, ordered by their ids.
+        """
+        self.check_expression(where)
+        if self.load is None:
+            self.load = self.compile_loader()
+        rows = await self.database.aselect(
+            self,
+            where=where,
+            max_num=max_num,
+            batch_size=batch_size
+        )
+        return [self.load(row) for row in rows]
+
+    async def aget_page(self, where=None, order_by=None, page_size=100,
+                        token=None):
+        """
+        The async variant of get_page().
+        """
+        return await self.database.run_async(
+            self.get_page,
+            where=where,
+            order_by=order_by,
+            page_size=page_size,
+            token=token
+        )
+
+    async def asave(self, instance):
+        """
+        The async variant of save().
+        """
+        return await self.database.asave(instance)
+
+    async def asave_many(self, instances, validate=True):
+        """
+        The async variant of save_many(). The instances are validated before
+        the write is queued.
+        """
+        instances = list(instances)
+        if validate:
+            for instance in instances:
+                self.validate(instance)
+        return await self.database.asave_many(instances)
+
+    def save_columns(self, columns, use_numpy=None):
+        """
+        Validates the given column-oriented values and inserts the valid rows
+        as new rows into the database, in a single batch. Numeric columns
+        given as NumPy arrays are validated and rounded with vectorized
+        operations if NumPy is installed; all other columns are processed in
+        pure Python.
+
+        Args:
+            columns (dict of str:sequence): The values, per field name. All
+                sequences must have the same length. Missing fields are filled
+                with their default values.
+            use_numpy (bool, optional): A boolean flag that indicates whether
+                to use NumPy. Defaults to True if NumPy is installed.
+        Returns:
+            The ValidationReport with the errors of the invalid rows, which
+            were not inserted.
+        """
+        report, rows = self.prepare_columns(columns, use_numpy)
+        self.database.insert_rows(self, rows)
+        return report
+
+    def prepare_columns(self, columns, use_numpy=None):
+        """
+        Validates the given column-oriented values and converts the valid
+        rows to the values to pass to the database, see save_columns().
+
+        Args:
+            columns (dict of str:sequence): The values, per field name.
+            use_numpy (bool, optional): A boolean flag that indicates whether
+                to use NumPy. Defaults to True if NumPy is installed.
+        Returns:
+            A tuple of the ValidationReport with the errors of the invalid
+            rows and the list of the valid rows, converted.
+        """
+        db_fields = self.database_fields
+        num_rows, columns = normalize_columns(db_fields, columns)
+        report = validate_columns(db_fields, columns, use_numpy,
+                                  self.column_validators)
+        # Drop the invalid rows first, their values may not be convertible.
+        if report:
+            columns = drop_rows(columns, report.get_invalid_rows())
+        columns = round_columns(db_fields, columns, use_numpy)
+
+        # Convert the values to the values to pass to the database.
+        for i, db_field in enumerate(db_fields.values()):
+            converter = self.database.get_converter(db_field)
+            if converter is not None:
+                columns[i] = [converter(value) for value in columns[i]]
+        return report, list(zip(*columns))
+
+    def parallel_load(self, source, workers=None, partition_size=10000):
+        """
+        Validates the given rows and inserts the valid rows as new rows into
+        the database, with a pool of worker processes. The rows are split
+        into partitions of consecutive rows, which are validated and
+        converted by the workers in parallel. Each worker inserts its valid
+        rows with its own connection; if the database allows a single writer
+        only (like SQLite), the workers return the converted rows and the
+        calling process inserts them, in the order of the partitions. The
+        workers are forked, such that they share the registries and the
+        compiled functions of this mapper. The rows are loaded in the calling
+        process if a single worker is requested or the platform can not
+        fork.
+
+        Args:
+            source (iterable of dict): The rows to load, as dictionaries of
+                values per field name. Missing fields are filled with their
+                default values. The source is read lazily.
+            workers (int, optional): The number of worker processes. Defaults
+                to the number of CPUs.
+            partition_size (int, optional): The number of rows per partition.
+        Returns:
+            The LoadResult with the ValidationReport of the invalid rows, per
+            index of the row in the source, and the throughput statistics.
+        """
+        return parallel_load(self, source, workers, partition_size)
+
+    def validate(self, instance):
+        """
+        Validates the values of the database fields of the given instance
+        against the constraints of the fields. Raises a ValidationError on the
+        first invalid value.
+
+        Args:
+            instance (Model): The instance to validate.
+        Returns:
+            The validated instance, if the validation succeeded.
+        """
+        if self.check_values is None:
+            self.compile_validators()
+        values = self.extract_values(instance)
+        errors = self.check_values(values)
+        if errors is not None:
+            field_name, code = errors[0]
+            raise ValidationError(
+                code=code,
+                msg=MESSAGES[code],
+                args={
+                    "field": field_name,
+                    "value": values[list(self.database_fields).index(
+                        field_name
+                    )],
+                    "constraint": get_constraint(
+                        self.database_fields[field_name],
+                        code
+                    )
+                }
+            )
+        return instance
+
+    def validate_many(self, instances):
+        """
+        Validates the values of the database fields of the given instances.
+        Instead of raising an error per invalid instance, all errors are
+        collected in a compact report, so that invalid instances can be
+        filtered out cheaply on bulk loads.
+
+        Args:
+            instances (list of Model): The instances to validate.
+        Returns:
+            The ValidationReport with the errors, per index of the instance in
+            the given list. The report is empty if all instances are valid.
+        """
+        if self.check_values is None:
+            self.compile_validators()
+        extract_values = self.extract_values
+        check_values = self.check_values
+        rows = [extract_values(instance) for instance in instances]
+        errors = []
+        for row_index, values in enumerate(rows):
+            row_errors = check_values(values)
+            if row_errors is not None:
+                for field_name, code in row_errors:
+                    errors.append((row_index, field_name, code))
+        return ValidationReport(self.database_fields, rows, errors)
+
+    # =========================================================================
+    # Statement methods.
+
+    def get_statement(self, operation, columns=None):
+        """
+        Returns the compiled statement for the given operation and the given
+        columns. The statement is compiled on the first request and served
+        from a cache on all following requests.
+
+        Args:
+            operation (str): The operation, "insert" or "update".
+            columns (iterable of str, optional): The columns to write. All
+                database fields are written if no columns are given.
+        Returns:
+            The compiled statement.
+        """
+        key = (operation, None if columns is None else frozenset(columns))
+        statement = self.statements.get(key)
+        if statement is None:
+            statement = self.compile_statement(operation, key[1])
+            self.statements[key] = statement
+        return statement
+
+    def get_upsert_statement(self, conflict_fields, update_fields=None):
+        """
+        Returns the compiled INSERT statement that updates the existing rows
+        with the same values in the given conflict fields instead, see
+        upsert_many(). The statement is compiled on the first request and
+        served from a cache on all following requests.
+
+        Args:
+            conflict_fields (list of str): The names of the fields of a unique
+                index, which identify the existing rows.
+            update_fields (list of str, optional): The names of the fields to
+                update in existing rows. Defaults to all fields except for the
+                conflict fields.
+        Returns:
+            The compiled statement.
+        """
+        key = (
+            "upsert",
+            tuple(conflict_fields),
+            None if update_fields is None else frozenset(update_fields)
+        )
+        statement = self.statements.get(key)
+        if statement is None:
+            if len(key[1]) == 0:
+                raise ValueError("No conflict fields given.")
+            names = set(key[1]) | (key[2] or set())
+            unknown = names - set(self.database_fields)
+            if len(unknown) > 0:
+                raise ValueError("Unknown fields: %s." %
+                                 ", ".join(sorted(unknown)))
+            # Bring the fields to update into the order of the database
+            # fields.
+            columns = list(self.database_fields)
+            update_columns = [
+                name for name in columns if name not in key[1]
+                and (key[2] is None or name in key[2])
+            ]
+            sql = self.database.get_upsert_statement(
+                self.model.__name__,
+                columns,
+                list(key[1]),
+                update_columns
+            )
+            statement = Statement(
+                sql,
+                columns,
+                self.compile_extractor(columns)
+            )
+            self.statements[key] = statement
+        return statement
+
+    def get_query(self, where=None, limited=False, order_by=None):
+        """
+        Returns the SELECT statement for the given filter expression. The
+        statement is rendered once per shape of the expression and served
+        from a cache for all expressions of the same shape, regardless of
+        their values.
+
+        Args:
+            where (Expression, optional): The filter expression.
+            limited (bool, optional): A boolean flag that indicates whether the
+                number of rows is limited.
+            order_by (str, optional): The name of the field to sort the rows
+                by, before their ids.
+        Returns:
+            The SELECT statement.
+        """
+        key = (None if where is None else where.get_shape(), limited, order_by)
+        query = self.queries.get(key)
+        if query is None:
+            query = self.database.get_select_statement(
+                self.model.__name__,
+                list(self.database_fields),
+                where,
+                limited,
+                order_by
+            )
+            self.queries[key] = query
+        return query
+
+    def check_expression(self, where):
+        """
+        Checks that the given filter expression references only database
+        fields of the model. Raises a ValueError otherwise.
+
+        Args:
+            where (Expression): The filter expression to check, or None.
+        """
+        if where is not None:
+            unknown = where.get_field_names() - set(self.database_fields)
+            if len(unknown) > 0:
+                raise ValueError("Unknown fields: %s." %
+                                 ", ".join(sorted(unknown)))
+
+    def convert_param(self, field_name, value):
+        """
+        Converts the given value of a filter expression to the value to pass
+        to the database.
+
+        Args:
+            field_name (str): The name of the field of the value.
+            value (object): The value to convert.
+        Returns:
+            The converted value.
+        """
+        converters = self.param_converters
+        if converters is None:
+            converters = self.param_converters = {
+                name: self.database.get_converter(db_field)
+                for name, db_field in self.database_fields.items()
+            }
+        converter = converters[field_name]
+        return value if converter is None else converter(value)
+
+    def compile_statement(self, operation, columns=None):
+        """
+        Compiles the statement for the given operation and the given columns.
+
+        Args:
+            operation (str): The operation, "insert" or "update".
+            columns (set of str, optional): The columns to write. All database
+                fields are written if no columns are given.
+        Returns:
+            The compiled statement.
+        """
+        # Bring the columns into the order of the database fields.
+        columns = [name for name in self.database_fields
+                   if columns is None or name in columns]
+        table_name = self.model.__name__
+
+        if operation == "insert":
+            sql = self.database.get_insert_statement(table_name, columns)
+        elif operation == "update":
+            sql = self.database.get_update_statement(table_name, columns)
+        else:
+            raise ValueError("Unknown operation '%s'." % operation)
+
+        return Statement(sql, columns, self.compile_extractor(columns))
+
+    def compile_validators(self):
+        """
+        Compiles the functions to extract and to validate the values of all
+        database fields of an instance. The validator is assigned last, such
+        that both functions are available once check_values is set.
+        """
+        self.extract_values = self.compile_extractor(
+            list(self.database_fields),
+            convert=False
+        )
+        self.check_values = compile_validator(self.database_fields)
+
+    def compile_extractor(self, columns, convert=True):
+        """
+        Compiles a function that extracts the values of the given columns from
+        a model instance, converted to the values to pass to the database.
+
+        Args:
+            columns (list of str): The columns to extract.
+            convert (bool, optional): A boolean flag that indicates whether to
+                convert the values with the converters of the database.
+        Returns:
+            A function that returns the values of an instance, as a tuple.
+        """
+        namespace = {"_getattr": getattr}
+        values = []
+        for i, column in enumerate(columns):
+            db_field = self.database_fields[column]
+            # Fall back to the default value if the instance has no value.
+            namespace["default%d" % i] = db_field.default_value
+            value = "_getattr(instance, %r, default%d)" % (column, i)
+            # Convert the value if the database requires a conversion.
+            converter = None
+            if convert:
+                converter = self.database.get_converter(db_field)
+            if converter is not None:
+                namespace["convert%d" % i] = converter
+                value = "convert%d(%s)" % (i, value)
+            values.append(value + ",")
+        return compile_function(
+            "extract",
+            ["instance"],
+            ["return (%s)" % " ".join(values)],
+            namespace
+        )
+
+    def compile_loader(self):
+        """
+        Compiles a function that creates an instance of the model from a row
+        read from the database. The instance is created without calling
+        __init__() and is not marked dirty.
+
+        Returns:
+            A function that expects a row, consisting of the id followed by the
+            values of the database fields, and returns the instance.
+        """
+        namespace = {
+            "_model": self.model,
+            "_set": object.__setattr__
+        }
+        lines = [
+            "instance = _model.__new__(_model)",
+            "_set(instance, 'id', row[0])"
+        ]
+        for i, (name, db_field) in enumerate(self.database_fields.items()):
+            value = "row[%d]" % (i + 1)
+            converter = self.database.get_result_converter(db_field)
+            if converter is not None:
+                namespace["convert%d" % i] = converter
+                value = "convert%d(%s)" % (i, value)
+            lines.append("_set(instance, %r, %s)" % (name, value))
+        lines.append("return instance")
+        return compile_function("load", ["row"], lines, namespace)
+
+
+class Statement:
+    """
+    A compiled statement, consisting of the rendered SQL and a function that
+    extracts the parameters of the statement from a model instance.
+    """
+    def __init__(self, sql, columns, extract):
+        """
+        Creates a new compiled statement.
+
+        Args:
+            sql (str): The rendered SQL.
+            columns (list of str): The columns written by the statement.
+            extract (function): The function that extracts the values of the
+                columns from a model instance.
+        """
+        self.sql = sql
+        self.columns = columns
+        self.extract = extract
+
+    def __str__(self):
+        return "Statement(%s)" % self.sql
+
+    def __repr__(self):
+        return self.__str__()
+
+# =============================================================================
+# Utility functions.
+
+
+def assign_upserted_ids(instances, ids):
+    """
+    Assigns the ids of their rows to the given upserted instances and marks
+    them as unchanged.
+
+    Args:
+        instances (list of Model): The upserted instances.
+        ids (list of int): The ids of the rows of the instances, None for the
+            rows that were not found.
+    """
+    for instance, id in zip(instances, ids):
+        if id is not None:
+            instance.id = id
+        instance.mark_clean()
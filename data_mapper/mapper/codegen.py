@@ -0,0 +1,27 @@
+def compile_function(name, args, lines, namespace=None):
+    """
+    Compiles a function with the given name, arguments and body. Used to
+    generate specialized functions (like row extractors) once per model, so
+    that no generic loop over the database fields is needed on each call.
+
+    >>> add = compile_function("add", ["a", "b"], ["return a + b"])
+    >>> add(1, 2)
+    3
+
+    Args:
+        name (str): The name of the function.
+        args (list of str): The names of the arguments of the function.
+        lines (list of str): The lines of the body of the function.
+        namespace (dict, optional): The global names to make available in the
+            body of the function.
+    Returns:
+        The compiled function.
+    """
+    namespace = dict(namespace) if namespace is not None else {}
+    source = "def %s(%s):\n%s\n" % (
+        name,
+        ", ".join(args),
+        "\n".join("    " + line for line in lines)
+    )
+    exec(compile(source, "<generated %s>" % name, "exec"), namespace)
+    return namespace[name]
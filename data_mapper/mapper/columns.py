@@ -0,0 +1,273 @@
+from data_mapper.database.fields import DatabaseIntField
+from data_mapper.database.fields import DatabaseFloatField
+from data_mapper.database.fields import DatabaseDoubleField
+
+from data_mapper.mapper.validation import compile_validator
+from data_mapper.mapper.validation import ValidationReport
+from data_mapper.mapper.validation import CHOICES
+from data_mapper.mapper.validation import MIN_VALUE
+from data_mapper.mapper.validation import MAX_VALUE
+from data_mapper.mapper.validation import UNSIGNED
+from data_mapper.mapper.validation import INVALID_TYPE
+
+# The database fields that can be validated as NumPy arrays.
+NUMERIC_FIELDS = (DatabaseIntField, DatabaseFloatField, DatabaseDoubleField)
+# The database fields with a precision to round to.
+PRECISION_FIELDS = (DatabaseFloatField, DatabaseDoubleField)
+
+# The NumPy module, False if not looked up yet and None if not installed.
+_numpy = False
+
+
+def get_numpy():
+    """
+    Returns the NumPy module, if it is installed. NumPy is an optional
+    dependency; it is imported on the first call of this function.
+
+    Returns:
+        The NumPy module, or None if NumPy is not installed.
+    """
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = None
+    return _numpy
+
+
+class ColumnRows:
+    """
+    A read-only, row-oriented view of column-oriented values. Used to read
+    single values of the rows (like in a ValidationReport) without turning
+    all columns into rows.
+    """
+    def __init__(self, columns):
+        """
+        Creates a new view.
+
+        Args:
+            columns (list of sequence): The columns, in the order of the
+                database fields.
+        """
+        self.columns = columns
+
+    def __getitem__(self, row_index):
+        return tuple(column[row_index] for column in self.columns)
+
+    def __len__(self):
+        return len(self.columns[0]) if len(self.columns) > 0 else 0
+
+
+def normalize_columns(db_fields, columns):
+    """
+    Brings the given columns into the order of the given database fields.
+    Columns of missing fields are filled with the default values.
+
+    Args:
+        db_fields (dict of str:DatabaseField): The database fields.
+        columns (dict of str:sequence): The values, per field name. All
+            sequences must have the same length.
+    Returns:
+        The number of rows and the list of columns, in the order of the
+        database fields.
+    """
+    unknown = set(columns) - set(db_fields)
+    if len(unknown) > 0:
+        raise ValueError("Unknown columns: %s." % ", ".join(sorted(unknown)))
+    lengths = {len(column) for column in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("The columns must have the same length.")
+    num_rows = lengths.pop() if len(lengths) > 0 else 0
+
+    normalized = []
+    for name, db_field in db_fields.items():
+        column = columns.get(name)
+        if column is None:
+            column = [db_field.default_value] * num_rows
+        normalized.append(column)
+    return num_rows, normalized
+
+
+def is_numeric_array(numpy, column):
+    """
+    Returns True if the given column is a NumPy array of numbers.
+    """
+    return isinstance(column, numpy.ndarray) and column.dtype.kind in "iuf"
+
+
+def validate_columns(db_fields, columns, use_numpy=None, validators=None):
+    """
+    Validates the given column-oriented values against the constraints of the
+    given database fields. Columns of numeric fields that are given as NumPy
+    arrays are validated with vectorized operations; all other columns are
+    validated row by row with the compiled validator. Values of float and
+    double fields with a precision that can not be rounded, see
+    round_columns(), are reported with the code INVALID_TYPE.
+
+    Args:
+        db_fields (dict of str:DatabaseField): The database fields.
+        columns (list of sequence): The columns, in the order of the database
+            fields (see normalize_columns()).
+        use_numpy (bool, optional): A boolean flag that indicates whether to
+            use NumPy. Defaults to True if NumPy is installed.
+        validators (dict, optional): The cache of the compiled validators,
+            per tuple of the names of the validated fields, e.g. of a mapper.
+            The validators are compiled on every call if no cache is given.
+    Returns:
+        The ValidationReport with the errors.
+    """
+    numpy = get_numpy() if use_numpy is not False else None
+    if use_numpy and numpy is None:
+        raise ValueError("NumPy is not installed.")
+
+    field_names = list(db_fields)
+    field_indexes = {name: i for i, name in enumerate(field_names)}
+    errors = []
+
+    # Validate the numeric arrays vectorized and the remaining columns with
+    # the compiled validator.
+    remaining_fields = {}
+    remaining_columns = []
+    for name, column in zip(field_names, columns):
+        db_field = db_fields[name]
+        if (numpy is not None and isinstance(db_field, NUMERIC_FIELDS)
+                and is_numeric_array(numpy, column)):
+            validate_numeric_array(numpy, name, db_field, column, errors)
+        else:
+            remaining_fields[name] = db_field
+            remaining_columns.append(column)
+
+    if len(remaining_fields) > 0:
+        key = tuple(remaining_fields)
+        validate = None if validators is None else validators.get(key)
+        if validate is None:
+            validate = compile_validator(remaining_fields)
+            if validators is not None:
+                validators[key] = validate
+        for row_index, values in enumerate(zip(*remaining_columns)):
+            row_errors = validate(values)
+            if row_errors is not None:
+                for field_name, code in row_errors:
+                    errors.append((row_index, field_name, code))
+        for name, column in zip(remaining_fields, remaining_columns):
+            db_field = remaining_fields[name]
+            if (isinstance(db_field, PRECISION_FIELDS)
+                    and db_field.precision is not None):
+                validate_precision(name, db_field, column, errors)
+
+    # Sort the errors by row and field, like Mapper.validate_many() does.
+    errors.sort(key=lambda error: (error[0], field_indexes[error[1]]))
+    return ValidationReport(db_fields, ColumnRows(columns), errors)
+
+
+def validate_numeric_array(numpy, name, db_field, array, errors):
+    """
+    Validates the given NumPy array of numbers against the constraints of
+    the given numeric database field and appends the errors to the given
+    list. The checks are done in the same order as in compile_validator().
+
+    Args:
+        numpy (module): The NumPy module.
+        name (str): The name of the field.
+        db_field (DatabaseField): The numeric database field.
+        array (numpy.ndarray): The values of the field.
+        errors (list of tuple): The list to append the errors to.
+    """
+    masks = []
+    if db_field.choices:
+        masks.append((CHOICES, ~numpy.isin(array, list(db_field.choices))))
+    if db_field.min_value is not None:
+        masks.append((MIN_VALUE, array < db_field.min_value))
+    if db_field.max_value is not None:
+        masks.append((MAX_VALUE, array > db_field.max_value))
+    if db_field.unsigned:
+        masks.append((UNSIGNED, array < 0))
+    for code, mask in masks:
+        for row_index in numpy.flatnonzero(mask).tolist():
+            errors.append((row_index, name, code))
+
+
+def validate_precision(name, db_field, column, errors):
+    """
+    Validates that the given values of a float or double field can be
+    rounded to the precision of the field and appends an INVALID_TYPE error
+    per value that can not, unless the value was reported with another error
+    already.
+
+    Args:
+        name (str): The name of the field.
+        db_field (DatabaseField): The float or double field.
+        column (sequence): The values of the field.
+        errors (list of tuple): The list to append the errors to.
+    """
+    reported = {row_index for row_index, field_name, _ in errors
+                if field_name == name}
+    precision = db_field.precision
+    for row_index, value in enumerate(column):
+        if value is None or row_index in reported:
+            continue
+        try:
+            round(value, precision)
+        except TypeError:
+            errors.append((row_index, name, INVALID_TYPE))
+
+
+def drop_rows(columns, row_indexes):
+    """
+    Removes the rows with the given indexes from the given columns, e.g. the
+    invalid rows before the values are rounded and converted.
+
+    Args:
+        columns (list of sequence): The columns.
+        row_indexes (set of int): The indexes of the rows to remove.
+    Returns:
+        The list of the remaining columns.
+    """
+    numpy = get_numpy()
+    remaining = []
+    for column in columns:
+        if numpy is not None and isinstance(column, numpy.ndarray):
+            column = numpy.delete(column, sorted(row_indexes))
+        else:
+            column = [value for row_index, value in enumerate(column)
+                      if row_index not in row_indexes]
+        remaining.append(column)
+    return remaining
+
+
+def round_columns(db_fields, columns, use_numpy=None):
+    """
+    Rounds the columns of float and double fields to the precisions of the
+    fields and turns NumPy arrays into lists of Python values, which can be
+    passed to the database drivers.
+
+    Args:
+        db_fields (dict of str:DatabaseField): The database fields.
+        columns (list of sequence): The columns, in the order of the database
+            fields.
+        use_numpy (bool, optional): A boolean flag that indicates whether to
+            use NumPy. Defaults to True if NumPy is installed.
+    Returns:
+        The list of rounded columns.
+    """
+    numpy = get_numpy() if use_numpy is not False else None
+
+    rounded = []
+    for db_field, column in zip(db_fields.values(), columns):
+        precision = None
+        if isinstance(db_field, PRECISION_FIELDS):
+            precision = db_field.precision
+        if numpy is not None and is_numeric_array(numpy, column):
+            if precision is not None:
+                column = numpy.round(column, precision)
+            column = column.tolist()
+            precision = None
+        elif numpy is not None and isinstance(column, numpy.ndarray):
+            column = column.tolist()
+        if precision is not None:
+            column = [None if value is None else round(value, precision)
+                      for value in column]
+        rounded.append(column)
+    return rounded
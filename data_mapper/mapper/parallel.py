@@ -0,0 +1,228 @@
+import itertools
+import os
+import time
+
+from collections import deque
+
+from data_mapper.mapper.validation import ValidationReport
+
+# The mappers of the running parallel loads, per id of the load. The worker
+# processes are forked and inherit this dictionary, such that the mappers and
+# their compiled functions need not be pickled.
+LOADS = {}
+# The counter of the parallel loads, to give them unique ids.
+LOAD_IDS = itertools.count(1)
+
+
+class LoadResult:
+    """
+    The result of a parallel load: the merged validation report of all
+    partitions and the throughput statistics.
+    """
+    def __init__(self, report, num_rows, num_inserted, num_partitions,
+                 num_workers, elapsed):
+        """
+        Creates a new load result.
+
+        Args:
+            report (ValidationReport): The errors of the invalid rows, per
+                index of the row in the source. The report holds the values
+                of the invalid rows only.
+            num_rows (int): The number of rows read from the source.
+            num_inserted (int): The number of inserted rows.
+            num_partitions (int): The number of partitions.
+            num_workers (int): The number of worker processes, 1 if the rows
+                were loaded in the calling process.
+            elapsed (float): The duration of the load, in seconds.
+        """
+        self.report = report
+        self.num_rows = num_rows
+        self.num_inserted = num_inserted
+        self.num_partitions = num_partitions
+        self.num_workers = num_workers
+        self.elapsed = elapsed
+
+    @property
+    def rows_per_second(self):
+        """
+        Returns the number of rows loaded per second.
+        """
+        if self.elapsed <= 0:
+            return float(self.num_rows)
+        return self.num_rows / self.elapsed
+
+    def __str__(self):
+        return "LoadResult(%d of %d rows inserted, %d partitions, " \
+               "%d workers, %.0f rows/s)" % (
+                   self.num_inserted,
+                   self.num_rows,
+                   self.num_partitions,
+                   self.num_workers,
+                   self.rows_per_second
+               )
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def parallel_load(mapper, source, workers=None, partition_size=10000):
+    """
+    Loads the rows of the given source into the table of the model of the
+    given mapper, see Mapper.parallel_load().
+
+    Args:
+        mapper (Mapper): The mapper of the model.
+        source (iterable of dict): The rows to load, as dictionaries of
+            values per field name.
+        workers (int, optional): The number of worker processes. Defaults to
+            the number of CPUs.
+        partition_size (int, optional): The number of rows per partition.
+    Returns:
+        The LoadResult.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("The number of workers must be positive.")
+    if partition_size < 1:
+        raise ValueError("The partition size must be positive.")
+
+    start_time = time.perf_counter()
+    database = mapper.database
+    # Check the schema and compile the functions of the mapper before the
+    # workers are forked, such that the workers inherit them.
+    database.check_schema(mapper)
+    mapper.get_statement("insert")
+    if mapper.check_values is None:
+        mapper.compile_validators()
+    # Funnel the writes through the calling process, if the database allows
+    # a single writer only. The workers do the CPU work in any case.
+    write_in_workers = not database.single_writer
+
+    errors = []
+    invalid_rows = {}
+    counts = {"rows": 0, "inserted": 0, "partitions": 0}
+
+    def merge(start, result):
+        # Merge the result of a partition, in the order of the partitions.
+        partition_errors, partition_rows, rows, num_inserted = result
+        errors.extend((start + row_index, field_name, code)
+                      for row_index, field_name, code in partition_errors)
+        for row_index, values in partition_rows.items():
+            invalid_rows[start + row_index] = values
+        if not write_in_workers:
+            database.insert_rows(mapper, rows)
+            num_inserted = len(rows)
+        counts["inserted"] += num_inserted
+
+    load_id = next(LOAD_IDS)
+    LOADS[load_id] = mapper
+    pool = create_pool(workers) if workers > 1 else None
+    try:
+        pending = deque()
+        for start, rows in iter_partitions(source, partition_size):
+            counts["rows"] += len(rows)
+            counts["partitions"] += 1
+            if pool is None:
+                merge(start, load_partition(load_id, rows, write_in_workers))
+                continue
+            pending.append((start, pool.submit(
+                load_partition,
+                load_id,
+                rows,
+                write_in_workers
+            )))
+            # Bound the number of partitions in flight, such that the memory
+            # stays constant for sources of any size.
+            if len(pending) >= 2 * workers:
+                start, future = pending.popleft()
+                merge(start, future.result())
+        while len(pending) > 0:
+            start, future = pending.popleft()
+            merge(start, future.result())
+    finally:
+        del LOADS[load_id]
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    return LoadResult(
+        ValidationReport(mapper.database_fields, invalid_rows, errors),
+        counts["rows"],
+        counts["inserted"],
+        counts["partitions"],
+        workers if pool is not None else 1,
+        time.perf_counter() - start_time
+    )
+
+
+def create_pool(workers):
+    """
+    Creates a pool of the given number of forked worker processes.
+    multiprocessing is imported on the first call, it is expensive to import.
+
+    Args:
+        workers (int): The number of worker processes.
+    Returns:
+        The ProcessPoolExecutor, or None if the platform can not fork.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("fork")
+    )
+
+
+def iter_partitions(source, partition_size):
+    """
+    Splits the given rows into partitions of consecutive rows.
+
+    Args:
+        source (iterable of dict): The rows.
+        partition_size (int): The maximal number of rows per partition.
+    Returns:
+        An iterator over the partitions, as (index of the first row, list of
+        rows) tuples.
+    """
+    source = iter(source)
+    for start in itertools.count(0, partition_size):
+        rows = list(itertools.islice(source, partition_size))
+        if len(rows) == 0:
+            return
+        yield start, rows
+
+
+def load_partition(load_id, rows, write):
+    """
+    Validates and converts the given partition of rows and inserts the valid
+    rows, if requested. Runs in a worker process.
+
+    Args:
+        load_id (int): The id of the load, see LOADS.
+        rows (list of dict): The rows of the partition.
+        write (bool): A boolean flag that indicates whether to insert the
+            valid rows with the connection of the worker.
+    Returns:
+        A tuple of the errors, per index of the row in the partition, the
+        values of the invalid rows, per index of the row, the valid rows,
+        converted, if they were not inserted, and the number of inserted
+        rows.
+    """
+    mapper = LOADS[load_id]
+    db_fields = mapper.database_fields
+    unknown = set().union(*rows) - set(db_fields)
+    if len(unknown) > 0:
+        raise ValueError("Unknown fields: %s." % ", ".join(sorted(unknown)))
+    columns = {
+        name: [row.get(name, db_field.default_value) for row in rows]
+        for name, db_field in db_fields.items()
+    }
+    report, valid_rows = mapper.prepare_columns(columns, use_numpy=False)
+    invalid_rows = {row_index: report.rows[row_index]
+                    for row_index in report.get_invalid_rows()}
+    if not write:
+        return report.errors, invalid_rows, valid_rows, 0
+    mapper.database.insert_rows(mapper, valid_rows)
+    return report.errors, invalid_rows, [], len(valid_rows)
@@ -1,21 +1,36 @@
-from collections import OrderedDict
+import os
+import threading
+
+from types import MappingProxyType
 
 from data_mapper.database.registry import DatabaseRegistry
 from data_mapper.database.fields import DatabaseField
+from data_mapper.database.fields import DatabaseIndex
+from data_mapper.database.ids import IdGenerator
 
 from data_mapper.mapper.base import Mapper
 
 from data_mapper.exceptions import DataMapperError
 
 from data_mapper.model import Model
+from data_mapper.model import create_slotted_model
 
 
 class MapperRegistry:
     """
-    A mapper registry to manage mappers of models.
+    A mapper registry to manage mappers of models. The registered mappers are
+    published as a read-only view. Each registration is a single store into
+    the underlying dictionary, such that lookups need no lock. Unlike the
+    snapshots of the DatabaseRegistry, the view is not copied on writes, as
+    a process may register thousands of models; iterate over a copy of the
+    view if mappers may be registered concurrently.
     """
     # The registered mappers, per model.
-    registered_mappers = OrderedDict()
+    mappers = {}
+    # The read-only view of the registered mappers.
+    registered_mappers = MappingProxyType(mappers)
+    # The lock to guard the registrations.
+    lock = threading.Lock()
     # A boolean flag to indicate whether this registry is initialized.
     is_initialized = False
 
@@ -24,8 +39,10 @@ class MapperRegistry:
         """
         Clears the registered mappers.
         """
-        cls.registered_mappers.clear()
-        cls.is_initialized = False
+        with cls.lock:
+            cls.mappers = {}
+            cls.registered_mappers = MappingProxyType(cls.mappers)
+            cls.is_initialized = False
 
     @classmethod
     def initialize(cls):
@@ -37,14 +54,28 @@ class MapperRegistry:
         # The registry is now initialized.
         cls.is_initialized = True
 
+    @classmethod
+    def reset_after_fork(cls):
+        """
+        Renews the lock in a child process created by os.fork(), as it may
+        have been held by another thread of the parent. The registered
+        mappers are kept, see DatabaseRegistry.reset_after_fork().
+        """
+        cls.lock = threading.Lock()
+
     # =========================================================================
     # Register methods.
 
     @classmethod
-    def register(cls, db_profile=None, db_profile_name=None, db_fields=None):
+    def register(cls, db_profile=None, db_profile_name=None, db_fields=None,
+                 slots=False, db_indexes=None, id_generator=None):
         """
         Returns a decorator that instantiates and registers a mapper for the
-        given model.
+        given model. The database profile is resolved and the database is
+        requested on the first use of the mapper, not on registration, such
+        that importing a module with many models is cheap and does not
+        connect to any database. Errors related to the profile are raised on
+        the first use, too.
 
         Args:
             db_profile (DatabaseProfile, optional): The database profile to use
@@ -53,6 +84,14 @@ class MapperRegistry:
                 given model.
             db_fields (dict of str:DatabaseField): The database fields for the
                 given model.
+            slots (bool, optional): A boolean flag that indicates whether to
+                replace the given model by a compact variant that stores the
+                database fields in slots, see create_slotted_model().
+            db_indexes (list of DatabaseIndex, optional): The indexes to
+                create on the table of the given model.
+            id_generator (IdGenerator, optional): The generator of the ids of
+                new instances, e.g. a HiLoIdGenerator. The ids following the
+                largest id in the table are used if no generator is given.
         Returns:
             A decorator, that registers a mapper for the given model.
         """
@@ -61,15 +100,45 @@ class MapperRegistry:
             cls.validate_model(model, error_to_raise=RegisterMapperError)
             # Validate the database fields.
             cls.validate_fields(db_fields, error_to_raise=RegisterMapperError)
+            # Validate the database indexes.
+            cls.validate_indexes(
+                db_indexes,
+                db_fields,
+                error_to_raise=RegisterMapperError
+            )
+            # Validate the id generator.
+            cls.validate_id_generator(
+                id_generator,
+                error_to_raise=RegisterMapperError
+            )
 
-            # Request a database from the DatabaseRegistry.
-            database = DatabaseRegistry.get_database(
+            # Reference the database, it is requested from the
+            # DatabaseRegistry on the first use of the mapper.
+            database = DatabaseRegistry.get_reference(
                 profile=db_profile,
                 profile_name=db_profile_name
             )
 
-            # Create a mapper from the given database and register it.
-            cls.registered_mappers[model] = Mapper(database, model, db_fields)
+            if slots:
+                # Validate the attributes of the model.
+                cls.validate_slotted_model(
+                    model,
+                    db_fields,
+                    error_to_raise=RegisterMapperError
+                )
+                # Replace the model by its compact variant.
+                model = create_slotted_model(model, db_fields)
+
+            # Create a mapper and register it. The database is resolved on
+            # the first use of the mapper.
+            mapper = Mapper(database, model, db_fields, db_indexes,
+                            id_generator)
+            with cls.lock:
+                cls.mappers[model] = mapper
+            # Make the mapper accessible from the model and its instances.
+            model.mapper = mapper
+            # Track the changes of the database fields.
+            model.tracked_fields = frozenset(db_fields)
             return model
         return decorator
 
@@ -200,6 +269,109 @@ class MapperRegistry:
                 )
         return db_fields
 
+    @classmethod
+    def validate_indexes(cls, db_indexes, db_fields,
+                         error_to_raise=DataMapperError):
+        """
+        Validates the given database indexes. Raises the given error (or a
+        generic DataMapperError if no error to raise is given) if the
+        validation fails. Returns the validated indexes if the validation
+        succeeds.
+
+        Args:
+            db_indexes (list of DatabaseIndex): The database indexes to
+                validate, or None.
+            db_fields (dict of str:DatabaseField): The database fields the
+                indexes refer to.
+            error_to_raise (DataMapperError): The error to raise on a
+                validation error.
+        Returns:
+            The validated database indexes, if the validation succeeded.
+        """
+        if db_indexes is None:
+            return db_indexes
+        for db_index in db_indexes:
+            # Check if the index is an instance of DatabaseIndex.
+            if not isinstance(db_index, DatabaseIndex):
+                raise error_to_raise(
+                    code=9,
+                    msg="The index '%s' is not an instance of DatabaseIndex.",
+                    args=db_index
+                )
+            # Check if the index refers to known fields only.
+            for field_name in db_index.fields:
+                if field_name != "id" and field_name not in db_fields:
+                    raise error_to_raise(
+                        code=10,
+                        msg="The index '%s' refers to the unknown field "
+                            "'%s'.",
+                        args=(db_index, field_name)
+                    )
+        return db_indexes
+
+    @classmethod
+    def validate_id_generator(cls, id_generator,
+                              error_to_raise=DataMapperError):
+        """
+        Validates the given id generator. Raises the given error (or a
+        generic DataMapperError if no error to raise is given) if the
+        validation fails. Returns the id generator if the validation
+        succeeds.
+
+        Args:
+            id_generator (IdGenerator): The id generator to validate, or None.
+            error_to_raise (DataMapperError): The error to raise on a
+                validation error.
+        Returns:
+            The validated id generator, if the validation succeeded.
+        """
+        if id_generator is None:
+            return id_generator
+        # Check if the generator is an instance of IdGenerator.
+        if not isinstance(id_generator, IdGenerator):
+            raise error_to_raise(
+                code=11,
+                msg="The id generator '%s' is not an instance of "
+                    "IdGenerator.",
+                args=id_generator
+            )
+        return id_generator
+
+    @classmethod
+    def validate_slotted_model(cls, model, db_fields,
+                               error_to_raise=DataMapperError):
+        """
+        Validates that the given model can be replaced by its slotted variant,
+        see create_slotted_model(). Raises the given error (or a generic
+        DataMapperError if no error to raise is given) if the validation
+        fails. Returns the model if the validation succeeds.
+
+        Args:
+            model (Model): The model to validate.
+            db_fields (dict of str:DatabaseField): The database fields of the
+                model.
+            error_to_raise (DataMapperError): The error to raise on a
+                validation error.
+        Returns:
+            The validated model, if the validation succeeded.
+        """
+        for field_name in list(db_fields) + ["id", "dirty_fields"]:
+            value = model.__dict__.get(field_name)
+            # Check if the model defines a method or a property named like a
+            # slot. Plain class attributes are used as default values.
+            if hasattr(type(value), "__get__"):
+                raise error_to_raise(
+                    code=12,
+                    msg="The attribute '%s' of model '%s' conflicts with the "
+                        "slot of the database field.",
+                    args=(field_name, model.__name__)
+                )
+        return model
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=MapperRegistry.reset_after_fork)
+
 # =============================================================================
 # Errors.
 
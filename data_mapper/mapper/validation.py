@@ -0,0 +1,269 @@
+from data_mapper.database.fields import DatabaseListField
+
+from data_mapper.exceptions import DataMapperError
+
+from data_mapper.mapper.codegen import compile_function
+
+# =============================================================================
+# Error codes.
+
+# The value of a mandatory field is missing.
+MANDATORY = 1
+# The value is not one of the allowed choices.
+CHOICES = 2
+# The value is shorter than the minimal length.
+MIN_LENGTH = 3
+# The value is longer than the maximal length.
+MAX_LENGTH = 4
+# The value is smaller than the minimal value.
+MIN_VALUE = 5
+# The value is larger than the maximal value.
+MAX_VALUE = 6
+# The value of an unsigned field is negative.
+UNSIGNED = 7
+# The value has less than the minimal number of elements.
+MIN_ELEMENTS = 8
+# The value has more than the maximal number of elements.
+MAX_ELEMENTS = 9
+# The value has a type the constraints of the field can not be checked for,
+# e.g. a string in an int field.
+INVALID_TYPE = 10
+
+# The messages, per error code. The messages are formatted with the name of
+# the field, the value and the violated constraint.
+MESSAGES = {
+    MANDATORY: "The field '%(field)s' is mandatory.",
+    CHOICES: "The value '%(value)s' of field '%(field)s' is not one of the "
+             "choices %(constraint)s.",
+    MIN_LENGTH: "The value '%(value)s' of field '%(field)s' is shorter than "
+                "%(constraint)s.",
+    MAX_LENGTH: "The value '%(value)s' of field '%(field)s' is longer than "
+                "%(constraint)s.",
+    MIN_VALUE: "The value '%(value)s' of field '%(field)s' is smaller than "
+               "%(constraint)s.",
+    MAX_VALUE: "The value '%(value)s' of field '%(field)s' is larger than "
+               "%(constraint)s.",
+    UNSIGNED: "The value '%(value)s' of field '%(field)s' is negative.",
+    MIN_ELEMENTS: "The value '%(value)s' of field '%(field)s' has less than "
+                  "%(constraint)s elements.",
+    MAX_ELEMENTS: "The value '%(value)s' of field '%(field)s' has more than "
+                  "%(constraint)s elements.",
+    INVALID_TYPE: "The value '%(value)s' of field '%(field)s' has an invalid "
+                  "type."
+}
+
+# The names of the attributes of the database fields, per error code. Errors
+# without a constraint (INVALID_TYPE) have no entry.
+CONSTRAINTS = {
+    MANDATORY: "mandatory",
+    CHOICES: "choices",
+    MIN_LENGTH: "min_length",
+    MAX_LENGTH: "max_length",
+    MIN_VALUE: "min_value",
+    MAX_VALUE: "max_value",
+    UNSIGNED: "unsigned",
+    MIN_ELEMENTS: "min_elements",
+    MAX_ELEMENTS: "max_elements"
+}
+
+# The conditions that detect a violation of a limit, per error code.
+LIMIT_CHECKS = [
+    (MIN_LENGTH, "_len(value) < min_length%d"),
+    (MAX_LENGTH, "_len(value) > max_length%d"),
+    (MIN_VALUE, "value < min_value%d"),
+    (MAX_VALUE, "value > max_value%d"),
+    (MIN_ELEMENTS, "_len(value) < min_elements%d"),
+    (MAX_ELEMENTS, "_len(value) > max_elements%d")
+]
+
+# =============================================================================
+# Validator.
+
+
+def compile_validator(db_fields):
+    """
+    Compiles a function that validates the values of the given database
+    fields against the constraints declared by the fields. The compiled
+    function contains only the checks of the declared constraints; choices
+    are checked against frozensets. Values the checks can not be applied to,
+    like a string in an int field with a minimal value, are reported with
+    the code INVALID_TYPE.
+
+    >>> from data_mapper.database.fields import DatabaseStringField
+    >>> validate = compile_validator({
+    ...     "name": DatabaseStringField("name", mandatory=True, max_length=3)
+    ... })
+    >>> validate(("Bob",)) is None
+    True
+    >>> validate(("Alice",))
+    [('name', 4)]
+    >>> validate((123,))
+    [('name', 10)]
+
+    Args:
+        db_fields (dict of str:DatabaseField): The database fields.
+    Returns:
+        A function that expects the values of the database fields as a
+        sequence, in the order of the given fields. It returns None if all
+        values are valid, and a list of (field name, error code) tuples
+        otherwise.
+    """
+    namespace = {"_len": len}
+    lines = ["errors = []"]
+    for i, (name, db_field) in enumerate(db_fields.items()):
+        checks = []
+        is_list = isinstance(db_field, DatabaseListField)
+
+        # Collect the checks of the declared constraints.
+        choices = getattr(db_field, "choices", None)
+        if choices:
+            namespace["choices%d" % i] = frozenset(choices)
+            if is_list:
+                condition = "not choices%d.issuperset(value)" % i
+            else:
+                condition = "value not in choices%d" % i
+            checks.append((condition, CHOICES))
+        for code, condition in LIMIT_CHECKS:
+            constraint = CONSTRAINTS[code]
+            limit = getattr(db_field, constraint, None)
+            if limit is None:
+                continue
+            namespace["%s%d" % (constraint, i)] = limit
+            checks.append((condition % i, code))
+        if getattr(db_field, "unsigned", False):
+            checks.append(("value < 0", UNSIGNED))
+
+        # Skip the fields without any constraints.
+        if not db_field.mandatory and len(checks) == 0:
+            continue
+
+        lines.append("value = values[%d]" % i)
+        if len(checks) == 0:
+            lines.append("if value is None:")
+        else:
+            lines.append("if value is not None:")
+            # The checks raise a TypeError on values of a wrong type.
+            lines.append("    try:")
+            for condition, code in checks:
+                lines.append("        if %s:" % condition)
+                lines.append("            errors.append((%r, %d))" %
+                             (name, code))
+            lines.append("    except TypeError:")
+            lines.append("        errors.append((%r, %d))" %
+                         (name, INVALID_TYPE))
+            if db_field.mandatory:
+                lines.append("else:")
+        if db_field.mandatory:
+            lines.append("    errors.append((%r, %d))" % (name, MANDATORY))
+    lines.append("return errors or None")
+
+    return compile_function("validate", ["values"], lines, namespace)
+
+
+def get_constraint(db_field, code):
+    """
+    Returns the constraint of the given database field that is violated by
+    errors with the given code.
+
+    Args:
+        db_field (DatabaseField): The database field.
+        code (int): The error code.
+    Returns:
+        The value of the constraint, or None if the code has no constraint.
+    """
+    constraint = CONSTRAINTS.get(code)
+    if constraint is None:
+        return None
+    return getattr(db_field, constraint, None)
+
+# =============================================================================
+# Validation report.
+
+
+class ValidationReport:
+    """
+    A compact report of the validation errors in a batch of rows. Each error
+    is stored as a (row index, field name, error code) tuple; the messages
+    are only formatted when they are read.
+    """
+    def __init__(self, db_fields, rows, errors=None):
+        """
+        Creates a new validation report.
+
+        Args:
+            db_fields (dict of str:DatabaseField): The database fields of the
+                validated rows.
+            rows (list of tuple): The values of the validated rows, in the
+                order of the database fields.
+            errors (list of tuple, optional): The errors, as (row index, field
+                name, error code) tuples.
+        """
+        self.db_fields = db_fields
+        self.rows = rows
+        self.errors = errors if errors is not None else []
+        # The positions of the fields in the rows, per field name.
+        self.field_indexes = {name: i for i, name in enumerate(db_fields)}
+
+    def __len__(self):
+        return len(self.errors)
+
+    def __iter__(self):
+        return iter(self.errors)
+
+    def __bool__(self):
+        return len(self.errors) > 0
+
+    def __str__(self):
+        return "ValidationReport(%d errors in %d rows)" % (
+            len(self.errors),
+            len(self.get_invalid_rows())
+        )
+
+    def __repr__(self):
+        return self.__str__()
+
+    def get_invalid_rows(self):
+        """
+        Returns the indexes of the rows with at least one error.
+
+        Returns:
+            The set of the indexes of the invalid rows.
+        """
+        return {row_index for row_index, _, _ in self.errors}
+
+    def get_message(self, error):
+        """
+        Formats the message of the given error.
+
+        Args:
+            error (tuple): The error, as a (row index, field name, error code)
+                tuple.
+        Returns:
+            The formatted message.
+        """
+        row_index, field_name, code = error
+        value = self.rows[row_index][self.field_indexes[field_name]]
+        return "Row %d: %s" % (row_index, MESSAGES[code] % {
+            "field": field_name,
+            "value": value,
+            "constraint": get_constraint(self.db_fields[field_name], code)
+        })
+
+    def get_messages(self):
+        """
+        Formats the messages of all errors.
+
+        Returns:
+            The list of formatted messages, in the order of the errors.
+        """
+        return [self.get_message(error) for error in self.errors]
+
+# =============================================================================
+# Errors.
+
+
+class ValidationError(DataMapperError):
+    """
+    An error to raise on any errors related to validating a model instance.
+    """
+    prefix = "An error occurred on validating a model: "
@@ -1,55 +1,278 @@
+from data_mapper.mapper.codegen import compile_function
+from data_mapper.query import Field
+from data_mapper.query import combine
+from data_mapper.session import Session
+
+
 class Model:
+    # Declare no slots, such that slotted subclasses have no __dict__. See
+    # create_slotted_model().
+    __slots__ = ()
     # The database field specifications.
     db_fields = {}
     # The mapper for this model.
     mapper = None
+    # The id of this model in the database, None if not stored yet.
+    id = None
+    # The names of the fields to track changes for.
+    tracked_fields = frozenset()
+    # The names of the tracked fields changed since the last write, None if
+    # there are no such fields.
+    dirty_fields = None
 
     def __init__(self, **kwargs):
         """
         Creates a new base model.
         """
-        self._name = self.__class__.__name__
         for key, value in kwargs.items():
             setattr(self, key, value)
 
+    def __setattr__(self, name, value):
+        """
+        Sets the given attribute and marks it as dirty, if it is a tracked
+        field.
+        """
+        object.__setattr__(self, name, value)
+        if name in self.tracked_fields:
+            if self.dirty_fields is None:
+                object.__setattr__(self, "dirty_fields", set())
+            self.dirty_fields.add(name)
+
+    def is_dirty(self):
+        """
+        Returns True if this model is not stored yet or if any of its tracked
+        fields was changed since the last write; False otherwise.
+        """
+        return self.id is None or bool(self.dirty_fields)
+
+    def mark_clean(self):
+        """
+        Marks all tracked fields of this model as unchanged.
+        """
+        object.__setattr__(self, "dirty_fields", None)
+
     def save(self):
         """
-        Writes the values of fields defined by DB_FIELDS to database.
+        Writes the values of the database fields of this model to database.
         """
-        # Check, if the property "DB_FIELDS" is given.
-        if not hasattr(self, 'DB_FIELDS'):
-            raise ValueError("Model '%s' has no DB_FIELDS." % self._name)
+        # Check, if there is a mapper registered for this model.
+        if self.mapper is None:
+            raise ValueError("Model '%s' has no mapper." %
+                             self.__class__.__name__)
 
-        # TODO: Validate.
+        # Defer the write to the end of the active session, if there is any.
+        # The session validates the model on adding it.
+        session = Session.get_active()
+        if session is not None:
+            session.add(self)
+            return True
 
-        # Process the DB_FIELDS one after another.
-        for field_name, field_spec in self.DB_FIELDS.items():
-            self.save_db_field(field_name, field_spec)
+        self.mapper.validate(self)
+        return self.mapper.save(self)
 
-    def save_db_field(self, field_name, field_spec):
+    @classmethod
+    def get(cls, max_num=None, batch_size=1000, where=None, **kwargs):
         """
-        Writes the value of given DbField to database.
+        Reads the instances of this model from the database. The instances are
+        read lazily, in batches of the given size.
+
+            Team.get(where=(Field("name") == "X") | (Field("name") == "Y"))
+            Team.get(name="X", rank=1)
+
+        Args:
+            max_num (int, optional): The maximal number of instances to read.
+            batch_size (int, optional): The number of rows to fetch from the
+                database at once.
+            where (Expression, optional): The filter expression the instances
+                must match, see data_mapper.query.
+            **kwargs: The values the instances must have, per field name.
+        Returns:
+            An iterator over the instances, ordered by their ids.
         """
-        if field_name is None:
-            return
+        return cls.mapper.get(
+            where=cls._combine_filters(where, kwargs),
+            max_num=max_num,
+            batch_size=batch_size
+        )
 
-        # Make sure that the name of the field is a string.
-        field_name = str(field_name)
-        if len(field_name) == 0:
-            return
+    @classmethod
+    def get_page(cls, page_size=100, token=None, order_by=None, where=None,
+                 **kwargs):
+        """
+        Reads a page of instances of this model from the database, with
+        keyset pagination. Pass the token of the returned page to read the
+        next page:
 
-        # Make sure that the spec of the field is an instance of DbField.
-        # if not isinstance(field_spec, db_fields.DbField):
-        #    raise ValueError("Ignoring field '%s' in model '%s'." %
-        # (field_name, self._name))
+            page = Team.get_page(page_size=50, order_by="rank")
+            while page.token is not None:
+                page = Team.get_page(page_size=50, order_by="rank",
+                                     token=page.token)
 
-        # Fetch the model value for the given database field, or the default
-        # value defined by the specification if no such value is set.
-        getattr(self, field_name, field_spec.default_value)
+        Args:
+            page_size (int, optional): The maximal number of instances per
+                page.
+            token (str, optional): The token of the previous page, None to
+                read the first page.
+            order_by (str, optional): The name of the field to sort the
+                instances by, before their ids.
+            where (Expression, optional): The filter expression the instances
+                must match, see data_mapper.query.
+            **kwargs: The values the instances must have, per field name.
+        Returns:
+            The Page with the instances and the token of the next page, which
+            is None on the last page.
+        """
+        return cls.mapper.get_page(
+            where=cls._combine_filters(where, kwargs),
+            order_by=order_by,
+            page_size=page_size,
+            token=token
+        )
 
-    def get(self, max_num=None, **kwargs):
-        # * Implement filters like name == "X" OR/AND name == "Y"
-        pass
+    # =========================================================================
+    # Async methods.
+
+    async def asave(self):
+        """
+        The async variant of save(). The write is run on a driver thread of
+        the database, without blocking the event loop.
+        """
+        if self.mapper is None:
+            raise ValueError("Model '%s' has no mapper." %
+                             self.__class__.__name__)
+
+        # Defer the write to the end of the active session, if there is any.
+        session = Session.get_active()
+        if session is not None:
+            session.add(self)
+            return True
+
+        self.mapper.validate(self)
+        return await self.mapper.asave(self)
+
+    @classmethod
+    async def aget(cls, max_num=None, batch_size=1000, where=None, **kwargs):
+        """
+        The async variant of get(). Reads all matching instances at once.
+
+        Returns:
+            The list of the instances, ordered by their ids.
+        """
+        return await cls.mapper.aget(
+            where=cls._combine_filters(where, kwargs),
+            max_num=max_num,
+            batch_size=batch_size
+        )
+
+    @classmethod
+    async def aget_page(cls, page_size=100, token=None, order_by=None,
+                        where=None, **kwargs):
+        """
+        The async variant of get_page().
+        """
+        return await cls.mapper.aget_page(
+            where=cls._combine_filters(where, kwargs),
+            order_by=order_by,
+            page_size=page_size,
+            token=token
+        )
 
     def delete(self):
         pass
+
+    @classmethod
+    def _combine_filters(cls, where, values):
+        """
+        Combines the given filter expression with the given values, for the
+        read methods above. Checks that this model has a mapper. Named with
+        an underscore, such that it does not clash with a database field.
+
+        Args:
+            where (Expression): The filter expression, None if there is none.
+            values (dict of str:object): The values the instances must have,
+                per field name.
+        Returns:
+            The combined filter expression, None if there is no filter.
+        """
+        if cls.mapper is None:
+            raise ValueError("Model '%s' has no mapper." % cls.__name__)
+        expressions = [] if where is None else [where]
+        for name, value in values.items():
+            expressions.append(Field(name) == value)
+        return combine(expressions)
+
+
+def create_slotted_model(model, db_fields):
+    """
+    Creates a compact variant of the given model, that stores the values of
+    the given database fields in slots instead of an instance __dict__. This
+    reduces the memory per instance and speeds up the attribute access.
+    Instances of the created model can not carry any attributes besides the
+    database fields. Class attributes named like a database field are used as
+    the default values of the field.
+
+    Args:
+        model (class of Model): The model to process. All its base classes
+            must declare __slots__, as Model does.
+        db_fields (dict of str:DatabaseField): The database fields of the
+            model.
+    Returns:
+        The created model. It has the name, the base classes and the
+        attributes of the given model.
+    Raises:
+        ValueError: If a method or another descriptor of the given model is
+            named like a database field.
+    """
+    namespace = dict(model.__dict__)
+    namespace.pop("__dict__", None)
+    namespace.pop("__weakref__", None)
+    slots = list(db_fields) + ["id", "dirty_fields"]
+    namespace["__slots__"] = tuple(slots)
+
+    # Compile a __new__() that initializes every slot, such that reading a
+    # field that was never set returns its default value instead of raising
+    # an AttributeError.
+    defaults = {"id": None, "dirty_fields": None}
+    for name, db_field in db_fields.items():
+        defaults[name] = db_field.default_value
+    # Move the class attributes named like a slot into the defaults, a class
+    # attribute conflicts with the slot of the same name.
+    for name in slots:
+        if name not in namespace:
+            continue
+        if hasattr(type(namespace[name]), "__get__"):
+            raise ValueError(
+                "The attribute '%s' of model '%s' is named like a database "
+                "field." % (name, model.__name__)
+            )
+        defaults[name] = namespace.pop(name)
+    code_namespace = {"_new": object.__new__, "_set": object.__setattr__}
+    lines = ["instance = _new(cls)"]
+    for i, name in enumerate(slots):
+        code_namespace["default%d" % i] = defaults[name]
+        lines.append("_set(instance, %r, default%d)" % (name, i))
+    lines.append("return instance")
+    namespace["__new__"] = compile_function(
+        "__new__",
+        ["cls", "*args", "**kwargs"],
+        lines,
+        code_namespace
+    )
+
+    slotted_model = type(model)(model.__name__, model.__bases__, namespace)
+
+    # Let methods that use super() without arguments refer to the created
+    # model instead of the given model.
+    for value in namespace.values():
+        if isinstance(value, (classmethod, staticmethod)):
+            value = value.__func__
+        elif isinstance(value, property):
+            value = value.fget
+        for cell in getattr(value, "__closure__", None) or ():
+            try:
+                if cell.cell_contents is model:
+                    cell.cell_contents = slotted_model
+            except ValueError:
+                # The cell is empty.
+                pass
+    return slotted_model
@@ -0,0 +1,493 @@
+import base64
+import binascii
+import datetime
+import decimal
+import json
+
+
+class Field:
+    """
+    A reference to a database field, used to build filter expressions:
+
+        (Field("name") == "X") | (Field("name") == "Y")
+        Field("rank").between(1, 10) & ~Field("tags").is_null()
+        Field("name").in_(["X", "Y"])
+    """
+    def __init__(self, name):
+        """
+        Creates a new reference to the database field with the given name.
+
+        Args:
+            name (str): The name of the database field.
+        """
+        self.name = name
+
+    def __eq__(self, value):
+        if value is None:
+            return self.is_null()
+        return Comparison(self.name, "=", value)
+
+    def __ne__(self, value):
+        if value is None:
+            return ~self.is_null()
+        return Comparison(self.name, "<>", value)
+
+    def __lt__(self, value):
+        return Comparison(self.name, "<", value)
+
+    def __le__(self, value):
+        return Comparison(self.name, "<=", value)
+
+    def __gt__(self, value):
+        return Comparison(self.name, ">", value)
+
+    def __ge__(self, value):
+        return Comparison(self.name, ">=", value)
+
+    def in_(self, values):
+        """
+        Returns an expression that is true if the field has one of the given
+        values.
+        """
+        return In(self.name, list(values))
+
+    def between(self, low, high):
+        """
+        Returns an expression that is true if the value of the field is in the
+        range [low, high].
+        """
+        return Between(self.name, low, high)
+
+    def is_null(self):
+        """
+        Returns an expression that is true if the field has no value.
+        """
+        return IsNull(self.name)
+
+    def __str__(self):
+        return "Field(%s)" % self.name
+
+    def __repr__(self):
+        return self.__str__()
+
+# =============================================================================
+# Expressions.
+
+
+class Expression:
+    """
+    The base class of all filter expressions. An expression is compiled in two
+    parts: its SQL, which depends only on the shape of the expression (the
+    fields, operators and the number of values), and its parameters. Thus, the
+    SQL of expressions of the same shape can be cached and reused with
+    different values.
+    """
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+    def get_shape(self):
+        """
+        Returns the shape of this expression, a hashable value that is equal
+        for all expressions that render the same SQL.
+        """
+        raise NotImplementedError()
+
+    def get_field_names(self):
+        """
+        Returns the names of the fields referenced by this expression.
+        """
+        raise NotImplementedError()
+
+    def render(self, database):
+        """
+        Renders the SQL of this expression, with placeholders for the values.
+
+        Args:
+            database (SQLDatabase): The database to render the SQL for.
+        Returns:
+            The SQL of this expression.
+        """
+        raise NotImplementedError()
+
+    def add_params(self, params, convert):
+        """
+        Appends the values of this expression to the given parameters, in the
+        order of the placeholders in the rendered SQL.
+
+        Args:
+            params (list): The list to append the values to.
+            convert (function): The function to convert a value, given the
+                name of its field and the value.
+        """
+        raise NotImplementedError()
+
+
+class Comparison(Expression):
+    """
+    An expression that compares a field with a value.
+    """
+    def __init__(self, name, operator, value):
+        self.name = name
+        self.operator = operator
+        self.value = value
+
+    def get_shape(self):
+        return ("cmp", self.name, self.operator)
+
+    def get_field_names(self):
+        return {self.name}
+
+    def render(self, database):
+        return "%s %s %s" % (
+            database.quote(self.name),
+            self.operator,
+            database.placeholder
+        )
+
+    def add_params(self, params, convert):
+        params.append(convert(self.name, self.value))
+
+
+class In(Expression):
+    """
+    An expression that checks if a field has one of the given values.
+    """
+    def __init__(self, name, values):
+        self.name = name
+        self.values = values
+
+    def get_shape(self):
+        return ("in", self.name, len(self.values))
+
+    def get_field_names(self):
+        return {self.name}
+
+    def render(self, database):
+        if len(self.values) == 0:
+            return "1 = 0"
+        return "%s IN (%s)" % (
+            database.quote(self.name),
+            ", ".join([database.placeholder] * len(self.values))
+        )
+
+    def add_params(self, params, convert):
+        for value in self.values:
+            params.append(convert(self.name, value))
+
+
+class Between(Expression):
+    """
+    An expression that checks if the value of a field is in a given range.
+    """
+    def __init__(self, name, low, high):
+        self.name = name
+        self.low = low
+        self.high = high
+
+    def get_shape(self):
+        return ("between", self.name)
+
+    def get_field_names(self):
+        return {self.name}
+
+    def render(self, database):
+        return "%s BETWEEN %s AND %s" % (
+            database.quote(self.name),
+            database.placeholder,
+            database.placeholder
+        )
+
+    def add_params(self, params, convert):
+        params.append(convert(self.name, self.low))
+        params.append(convert(self.name, self.high))
+
+
+class IsNull(Expression):
+    """
+    An expression that checks if a field has no value.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def get_shape(self):
+        return ("null", self.name)
+
+    def get_field_names(self):
+        return {self.name}
+
+    def render(self, database):
+        return "%s IS NULL" % database.quote(self.name)
+
+    def add_params(self, params, convert):
+        pass
+
+
+class Junction(Expression):
+    """
+    The base class of expressions that join two expressions by an operator.
+    """
+    # The operator to join the expressions with.
+    operator = None
+
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+
+    def get_shape(self):
+        return (self.operator, self.left.get_shape(), self.right.get_shape())
+
+    def get_field_names(self):
+        return self.left.get_field_names() | self.right.get_field_names()
+
+    def render(self, database):
+        return "(%s %s %s)" % (
+            self.left.render(database),
+            self.operator,
+            self.right.render(database)
+        )
+
+    def add_params(self, params, convert):
+        self.left.add_params(params, convert)
+        self.right.add_params(params, convert)
+
+
+class And(Junction):
+    """
+    An expression that is true if both given expressions are true.
+    """
+    operator = "AND"
+
+
+class Or(Junction):
+    """
+    An expression that is true if any of the given expressions is true.
+    """
+    operator = "OR"
+
+
+class Not(Expression):
+    """
+    An expression that is true if the given expression is false.
+    """
+    def __init__(self, expression):
+        self.expression = expression
+
+    def get_shape(self):
+        return ("NOT", self.expression.get_shape())
+
+    def get_field_names(self):
+        return self.expression.get_field_names()
+
+    def render(self, database):
+        return "NOT (%s)" % self.expression.render(database)
+
+    def add_params(self, params, convert):
+        self.expression.add_params(params, convert)
+
+
+class After(Expression):
+    """
+    An expression that matches the rows behind a given position in the order
+    of a sort field, with the id as tie-breaker. Used for keyset pagination:
+    the leading range on the sort field can be served by an index on (sort
+    field, id), so all pages are equally expensive, unlike on OFFSET scans.
+    The values are the values stored in the database and are not converted.
+    """
+    def __init__(self, name, value, id_value):
+        """
+        Creates a new expression.
+
+        Args:
+            name (str): The name of the sort field, or None to sort by the ids
+                only.
+            value (object): The value of the sort field at the position.
+            id_value (int): The id at the position.
+        """
+        self.name = name
+        self.value = value
+        self.id_value = id_value
+
+    def get_shape(self):
+        return ("after", self.name, self.value is None)
+
+    def get_field_names(self):
+        return set() if self.name is None else {self.name}
+
+    def render(self, database):
+        id_column = database.quote(database.id_column)
+        placeholder = database.placeholder
+        if self.name is None:
+            return "%s > %s" % (id_column, placeholder)
+        name = database.quote(self.name)
+        if self.value is None:
+            # NULL values are sorted first, so all non-NULL values follow.
+            return "((%s IS NULL AND %s > %s) OR %s IS NOT NULL)" % (
+                name, id_column, placeholder, name
+            )
+        return "(%s >= %s AND (%s > %s OR %s > %s))" % (
+            name, placeholder, name, placeholder, id_column, placeholder
+        )
+
+    def add_params(self, params, convert):
+        if self.name is not None and self.value is not None:
+            params.append(self.value)
+            params.append(self.value)
+        params.append(self.id_value)
+
+
+def combine(expressions):
+    """
+    Combines the given expressions with AND.
+
+    Args:
+        expressions (list of Expression): The expressions to combine.
+    Returns:
+        The combined expression, or None if no expressions are given.
+    """
+    combined = None
+    for expression in expressions:
+        combined = expression if combined is None else combined & expression
+    return combined
+
+# =============================================================================
+# Pagination.
+
+
+class Page:
+    """
+    A page of instances, read with keyset pagination.
+    """
+    def __init__(self, items, token=None):
+        """
+        Creates a new page.
+
+        Args:
+            items (list of Model): The instances of the page.
+            token (str, optional): The opaque token to read the next page
+                with, None if this is the last page.
+        """
+        self.items = items
+        self.token = token
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __str__(self):
+        return "Page(%d items, token=%s)" % (len(self.items), self.token)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def encode_token(order_by, value, id_value):
+    """
+    Encodes the position of the last row of a page into an opaque token.
+
+    >>> decode_token(encode_token("rank", 3, 17), "rank")
+    (3, 17)
+    >>> value = datetime.datetime(2020, 1, 2, 3, 4, 5)
+    >>> decode_token(encode_token("created", value, 17), "created")[0]
+    datetime.datetime(2020, 1, 2, 3, 4, 5)
+
+    Args:
+        order_by (str): The name of the sort field, or None.
+        value (object): The stored value of the sort field in the last row,
+            see encode_value().
+        id_value (int): The id of the last row.
+    Returns:
+        The token, as URL-safe string.
+    """
+    data = json.dumps([order_by, encode_value(value), id_value],
+                      separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+
+def decode_token(token, order_by):
+    """
+    Decodes the given token, created by encode_token().
+
+    Args:
+        token (str): The token to decode.
+        order_by (str): The name of the sort field the token is expected for.
+    Returns:
+        The value of the sort field and the id encoded in the token.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        token_order_by, value, id_value = data
+        value = decode_value(value)
+    except (binascii.Error, decimal.InvalidOperation, AttributeError,
+            TypeError, UnicodeError, ValueError):
+        raise ValueError("Invalid page token '%s'." % token)
+    if token_order_by != order_by or not isinstance(id_value, int):
+        raise ValueError("The page token '%s' does not match the order by "
+                         "'%s'." % (token, order_by))
+    return value, id_value
+
+
+def encode_value(value):
+    """
+    Converts the given stored value of a sort field into a value that can
+    be serialized to JSON. Values of types JSON does not support, like the
+    datetime, timedelta (TIME columns of MySQL) and bytes values read from
+    the drivers, are turned into a single-entry dictionary of the name of
+    the type and a string or list representation.
+
+    Args:
+        value (object): The value to convert.
+    Returns:
+        The converted value.
+    """
+    # Check datetime before date, datetime is a subclass of date.
+    if isinstance(value, datetime.datetime):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"date": value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {"time": value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {"timedelta": [value.days, value.seconds, value.microseconds]}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"bytes": base64.b64encode(bytes(value)).decode("ascii")}
+    if isinstance(value, decimal.Decimal):
+        return {"decimal": str(value)}
+    return value
+
+
+def decode_value(value):
+    """
+    Converts the given value, created by encode_value(), back into the
+    stored value of the sort field.
+
+    Args:
+        value (object): The value to convert.
+    Returns:
+        The converted value.
+    """
+    if not isinstance(value, dict):
+        return value
+    if len(value) != 1:
+        raise ValueError("Invalid encoded value '%s'." % value)
+    type_name, data = next(iter(value.items()))
+    if type_name == "datetime":
+        return datetime.datetime.fromisoformat(data)
+    if type_name == "date":
+        return datetime.date.fromisoformat(data)
+    if type_name == "time":
+        return datetime.time.fromisoformat(data)
+    if type_name == "timedelta":
+        return datetime.timedelta(*data)
+    if type_name == "bytes":
+        return base64.b64decode(data.encode("ascii"), validate=True)
+    if type_name == "decimal":
+        return decimal.Decimal(data)
+    raise ValueError("Invalid encoded value '%s'." % value)
@@ -0,0 +1,187 @@
+import contextvars
+
+from collections import OrderedDict
+
+
+class Session:
+    """
+    A unit of work that records the model instances saved while the session
+    is active and writes them to the database in a single flush. Use it as a
+    context manager:
+
+        with Session():
+            team.save()   # Recorded, not written.
+            player.save()  # Recorded, not written.
+        # Both instances are written now, in a single transaction.
+
+    On flushing, the recorded instances are grouped by their models, such
+    that each table is written with a single batch of inserts and updates.
+    In async code, use it as an async context manager, which flushes without
+    blocking the event loop:
+
+        async with Session():
+            await team.asave()
+    """
+    # The stacks of active sessions, per context. Unlike a thread-local, a
+    # context variable is separate per asyncio task, such that a session
+    # opened by one task does not record the saves of other tasks on the same
+    # thread. The stacks are tuples, since tasks created inside of a session
+    # inherit a copy of the context, which must not share a mutable stack.
+    active_sessions = contextvars.ContextVar("active_sessions", default=())
+
+    def __init__(self):
+        """
+        Creates a new session.
+        """
+        # The recorded instances, per id() of the instance.
+        self.instances = OrderedDict()
+        # The tokens to restore the stacks of active sessions on exit, one
+        # per entry of this session.
+        self.tokens = []
+
+    def __enter__(self):
+        self.activate()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.deactivate()
+        if exc_type is None:
+            self.flush()
+        else:
+            # Discard the recorded instances if an error occurred.
+            self.instances.clear()
+        return False
+
+    async def __aenter__(self):
+        self.activate()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.deactivate()
+        if exc_type is None:
+            await self.aflush()
+        else:
+            # Discard the recorded instances if an error occurred.
+            self.instances.clear()
+        return False
+
+    def activate(self):
+        """
+        Pushes this session onto the stack of active sessions of the current
+        context.
+        """
+        stack = self.active_sessions.get()
+        self.tokens.append(self.active_sessions.set(stack + (self,)))
+
+    def deactivate(self):
+        """
+        Pops this session from the stack of active sessions of the current
+        context.
+        """
+        self.active_sessions.reset(self.tokens.pop())
+
+    @classmethod
+    def get_active_stack(cls):
+        """
+        Returns the stack of active sessions of the current context, i.e. of
+        the current thread or asyncio task.
+
+        Returns:
+            The tuple of active sessions, the innermost session last.
+        """
+        return cls.active_sessions.get()
+
+    @classmethod
+    def get_active(cls):
+        """
+        Returns the innermost active session of the current context, i.e. of
+        the current thread or asyncio task.
+
+        Returns:
+            The active session, or None if there is no active session.
+        """
+        stack = cls.active_sessions.get()
+        return stack[-1] if len(stack) > 0 else None
+
+    def add(self, instance):
+        """
+        Validates the given instance and records it, to write it on the next
+        flush. Raises a ValidationError if the instance is invalid. The
+        instance is validated again on flushing, since it may be changed in
+        the meantime.
+
+        Args:
+            instance (Model): The instance to record.
+        """
+        instance.mapper.validate(instance)
+        self.instances[id(instance)] = instance
+
+    def flush(self):
+        """
+        Writes all recorded instances to the database. The instances are
+        grouped by their models and each group is written in a single batch.
+        All groups of the same database are written in a single transaction.
+
+        Returns:
+            True if all instances were successfully written; False otherwise.
+        """
+        success = True
+        for database, database_groups in self.get_groups().items():
+            success = self.flush_groups(database, database_groups) and success
+        self.instances.clear()
+        return success
+
+    async def aflush(self):
+        """
+        The async variant of flush(). The instances of each database are
+        written on a driver thread of the database, without blocking the event
+        loop.
+
+        Returns:
+            True if all instances were successfully written; False otherwise.
+        """
+        success = True
+        for database, database_groups in self.get_groups().items():
+            success = await database.run_async(
+                self.flush_groups,
+                database,
+                database_groups
+            ) and success
+        self.instances.clear()
+        return success
+
+    def get_groups(self):
+        """
+        Groups the recorded instances by their databases and their mappers.
+
+        Returns:
+            The lists of the instances, per mapper, per database.
+        """
+        groups = OrderedDict()
+        for instance in self.instances.values():
+            mapper = instance.mapper
+            database_groups = groups.setdefault(mapper.database, OrderedDict())
+            database_groups.setdefault(mapper, []).append(instance)
+        return groups
+
+    def flush_groups(self, database, database_groups):
+        """
+        Writes the given groups of instances to the given database, in a
+        single transaction.
+
+        Args:
+            database (Database): The database to write to.
+            database_groups (dict of Mapper:list): The instances to write, per
+                mapper.
+        Returns:
+            True if all instances were successfully written; False otherwise.
+        """
+        # Check the schemas before the transaction, a table may have to be
+        # created, which implicitly commits on some database systems.
+        for mapper in database_groups:
+            database.check_schema(mapper)
+        success = True
+        with database.transaction():
+            for mapper, instances in database_groups.items():
+                success = mapper.save_many(instances) and success
+        return success
@@ -17,11 +17,6 @@ def resolve_file_path(path):
     return os.path.join(dirname, path)
 
 
-DatabaseRegistry.initialize(
-    profiles_file_path=resolve_file_path("resources/database_profiles.conf")
-)
-
-
 @MapperRegistry.register(
    db_profile=None,
    db_profile_name=None,
@@ -36,7 +31,15 @@ class Team(Model):
         # self.mapper.create_db_table()
 
 
-Team()
+if __name__ == "__main__":
+    # Read the profiles only when run as a script, such that importing this
+    # module neither reads files nor connects to a database.
+    DatabaseRegistry.initialize(
+        profiles_file_path=resolve_file_path(
+            "resources/database_profiles.conf"
+        )
+    )
+    Team()
 # profile = DatabaseProfile(db_user="root", db_password="admin")
 # db = MySqlDatabase(profile)
 # db.create_db_table(Team)
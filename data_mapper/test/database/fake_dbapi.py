@@ -0,0 +1,293 @@
+"""
+A DB-API 2.0 compliant stand-in for a MySQL driver, used to test the
+MySQLDatabase without a server. The statements are translated from the
+MySQL dialect to SQLite and executed on a SQLite database file.
+"""
+
+import itertools
+import re
+import sqlite3
+import threading
+
+apilevel = "2.0"
+threadsafety = 1
+paramstyle = "format"
+
+# Matches the index entries of CREATE TABLE statements.
+INDEX_ENTRY = re.compile(
+    r", (?:UNIQUE )?INDEX `[^`]+` \((?:[^()]|\([^()]*\))*\)"
+)
+# Matches the unique index entries of CREATE TABLE statements, capturing the
+# indexed columns.
+UNIQUE_ENTRY = re.compile(
+    r", UNIQUE INDEX `[^`]+` \(((?:[^()]|\([^()]*\))*)\)"
+)
+# Matches the prefix lengths of indexed columns.
+PREFIX_LENGTH = re.compile(r"\(\d+\)")
+# Matches the alias of the inserted rows and the references to the inserted
+# values in ON DUPLICATE KEY UPDATE clauses.
+ROW_ALIAS = re.compile(r" AS (`[^`]+`) ON DUPLICATE KEY UPDATE ")
+VALUES_REFERENCE = r"%s\.(`[^`]+`)"
+
+
+class Error(Exception):
+    pass
+
+
+class InterfaceError(Error):
+    pass
+
+
+class DatabaseError(Error):
+    pass
+
+
+class OperationalError(DatabaseError):
+    pass
+
+
+class ProgrammingError(DatabaseError):
+    pass
+
+
+class FakeDriver:
+    """
+    A fake driver module. Records the established connections and the
+    executed statements.
+    """
+    apilevel = apilevel
+    threadsafety = threadsafety
+    paramstyle = paramstyle
+    Error = Error
+    InterfaceError = InterfaceError
+    DatabaseError = DatabaseError
+    OperationalError = OperationalError
+    ProgrammingError = ProgrammingError
+
+    def __init__(self, path):
+        """
+        Creates a new fake driver.
+
+        Args:
+            path (str): The path to the SQLite database file to execute the
+                statements on.
+        """
+        self.path = path
+        self.connections = []
+        self.statements = []
+        self.connect_kwargs = None
+        # The idents of the threads that established the connections.
+        self.connect_threads = []
+        self.lock = threading.Lock()
+        # The ids of the connections, see thread_id().
+        self.ids = itertools.count(1)
+        # The largest number of rows a buffered cursor held in memory.
+        self.max_buffered_rows = 0
+        # The cursor classes, like the module pymysql.cursors.
+        self.cursors = FakeCursors
+
+    def connect(self, **kwargs):
+        self.connect_kwargs = kwargs
+        conn = FakeConnection(self)
+        with self.lock:
+            self.connections.append(conn)
+            self.connect_threads.append(threading.get_ident())
+        return conn
+
+
+class FakeConnection:
+    """
+    A fake connection, backed by a SQLite connection.
+    """
+    def __init__(self, driver):
+        self.driver = driver
+        self.conn = sqlite3.connect(
+            driver.path,
+            isolation_level=None,
+            check_same_thread=False,
+            timeout=10
+        )
+        self.is_closed = False
+        self.id = next(driver.ids)
+        # A boolean flag to simulate a broken connection.
+        self.is_broken = False
+        # The unbuffered cursor whose result is not read completely yet. No
+        # other statement can be executed on the connection meanwhile.
+        self.unread_cursor = None
+
+    def thread_id(self):
+        return self.id
+
+    def cursor(self, cursor_class=None):
+        if self.is_closed:
+            raise InterfaceError("The connection is closed.")
+        return (cursor_class or FakeCursor)(self)
+
+    def commit(self):
+        if self.conn.in_transaction:
+            self.conn.execute("COMMIT")
+
+    def rollback(self):
+        if self.conn.in_transaction:
+            self.conn.execute("ROLLBACK")
+
+    def close(self):
+        self.is_closed = True
+        # Drop an unread result, like the server does on a closed connection.
+        # Otherwise, SQLite keeps the query open and the database locked.
+        if self.unread_cursor is not None:
+            self.unread_cursor.cursor.close()
+            self.unread_cursor = None
+        self.conn.close()
+
+
+class FakeCursor:
+    """
+    A fake buffered cursor, that translates the statements to SQLite. Like
+    the default cursor of pymysql, it reads the whole result of a query into
+    memory on execute().
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.cursor = connection.conn.cursor()
+        # The rows of the result that were not fetched yet.
+        self.rows = []
+
+    def execute(self, statement, params=()):
+        self.check()
+        driver = self.connection.driver
+        driver.statements.append(statement)
+        if statement.startswith("KILL QUERY "):
+            # Abort the statement running on the connection with the id.
+            thread_id = int(statement[len("KILL QUERY "):])
+            for conn in list(driver.connections):
+                if conn.id == thread_id and not conn.is_closed:
+                    conn.conn.interrupt()
+            return
+        self.cursor.execute(translate(statement), params)
+        self.read_result()
+
+    def read_result(self):
+        """
+        Reads the whole result of the executed query into memory.
+        """
+        self.rows = self.cursor.fetchall()
+        driver = self.connection.driver
+        with driver.lock:
+            driver.max_buffered_rows = max(driver.max_buffered_rows,
+                                           len(self.rows))
+
+    def executemany(self, statement, params):
+        self.check()
+        self.connection.driver.statements.append(statement)
+        self.cursor.executemany(translate(statement), params)
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    def fetchone(self):
+        return self.rows.pop(0) if len(self.rows) > 0 else None
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        self.cursor.close()
+
+    def check(self):
+        if self.connection.is_broken:
+            raise OperationalError("Lost connection to MySQL server.")
+        if self.connection.unread_cursor not in (None, self):
+            raise ProgrammingError("Command Out of Sync.")
+
+
+class FakeSSCursor(FakeCursor):
+    """
+    A fake unbuffered cursor. Like pymysql.cursors.SSCursor, it reads the
+    rows of a result on fetching them. No other statement can be executed on
+    the connection until the result is read completely or the cursor is
+    closed, which reads the remaining rows.
+    """
+
+    def read_result(self):
+        if self.cursor.description is not None:
+            self.connection.unread_cursor = self
+
+    def fetchone(self):
+        return self.fetchmany(1)[0] if self.is_unread() else None
+
+    def fetchmany(self, size):
+        if not self.is_unread():
+            return []
+        rows = self.cursor.fetchmany(size)
+        if len(rows) < size:
+            self.connection.unread_cursor = None
+        return rows
+
+    def fetchall(self):
+        if not self.is_unread():
+            return []
+        self.connection.unread_cursor = None
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.fetchall()
+        super().close()
+
+    def is_unread(self):
+        """
+        Returns True if the result of this cursor is not read completely.
+        """
+        return self.connection.unread_cursor is self
+
+
+class FakeCursors:
+    """
+    The cursor classes of the fake driver, like the module pymysql.cursors.
+    """
+    Cursor = FakeCursor
+    SSCursor = FakeSSCursor
+
+
+def translate(statement):
+    """
+    Translates the given MySQL statement to SQLite.
+    """
+    if statement == "START TRANSACTION":
+        return "BEGIN IMMEDIATE"
+    if statement.startswith("SELECT 1 FROM information_schema.tables"):
+        return "SELECT 1 FROM sqlite_master WHERE type = 'table' AND " \
+               "name = ?"
+    if statement.startswith("SELECT column_name FROM information_schema"):
+        return "SELECT name FROM pragma_table_info(?)"
+    if statement.startswith("CREATE TABLE"):
+        # SQLite supports neither table options nor inline indexes. Unique
+        # indexes are turned into unique constraints.
+        statement = statement.split(" ENGINE=")[0]
+        statement = UNIQUE_ENTRY.sub(
+            lambda match: ", UNIQUE (%s)" % PREFIX_LENGTH.sub(
+                "",
+                match.group(1)
+            ),
+            statement
+        )
+        statement = INDEX_ENTRY.sub("", statement)
+    if " ON DUPLICATE KEY UPDATE " in statement:
+        # SQLite detects the conflicts by all unique constraints, too, if no
+        # conflict target is given.
+        match = ROW_ALIAS.search(statement)
+        if match is not None:
+            statement = re.sub(VALUES_REFERENCE % re.escape(match.group(1)),
+                               r"excluded.\1", statement)
+            statement = statement.replace(match.group(0),
+                                          " ON DUPLICATE KEY UPDATE ")
+        statement = statement.replace(" ON DUPLICATE KEY UPDATE ",
+                                      " ON CONFLICT DO UPDATE SET ")
+    statement = statement.replace("%s", "?").replace("`", '"')
+    return statement.replace(" FOR UPDATE", "")
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import unittest
+
+from data_mapper.database.base import Database
+from data_mapper.database.executor import DatabaseExecutor
+from data_mapper.database.executor import ExecutorShutdownError
+
+
+class InterruptibleDatabase(Database):
+    """
+    A database that records the interrupted threads and the threads that
+    interrupted them, and releases the blocked call on interrupts.
+    """
+    def __init__(self):
+        self.interrupted = []
+        self.interrupting = []
+        self.release = threading.Event()
+
+    def interrupt(self, thread_id):
+        self.interrupted.append(thread_id)
+        self.interrupting.append(threading.current_thread().name)
+        self.release.set()
+
+
+class TestDatabaseExecutor(unittest.TestCase):
+    """
+    Tests for the class DatabaseExecutor.
+    """
+
+    def setUp(self):
+        """
+        Defines actions to execute before each unittest method.
+        """
+        self.database = InterruptibleDatabase()
+        self.executor = DatabaseExecutor(self.database)
+
+    def tearDown(self):
+        """
+        Defines actions to execute after each unittest method.
+        """
+        self.database.release.set()
+        self.executor.shutdown()
+
+    def test_run(self):
+        """
+        Tests that run() returns the results and raises the errors of the
+        calls, and that the calls are processed in FIFO order.
+        """
+        calls = []
+
+        async def main():
+            results = await asyncio.gather(*[
+                self.executor.run(calls.append, i) for i in range(50)
+            ])
+            self.assertEqual(results, [None] * 50)
+            self.assertEqual(await self.executor.run(sum, [1, 2]), 3)
+            with self.assertRaises(ZeroDivisionError):
+                await self.executor.run(divmod, 1, 0)
+
+        asyncio.run(main())
+        self.assertEqual(calls, list(range(50)))
+        # The calls are run on the driver thread.
+        thread_ids = []
+        self.executor.submit(
+            lambda: thread_ids.append(threading.get_ident())
+        ).result()
+        self.assertEqual(thread_ids, [self.executor.threads[0].ident])
+
+    def test_cancel(self):
+        """
+        Tests that cancelling a task removes its queued call and interrupts
+        its running call, on the interrupt thread.
+        """
+        started = threading.Event()
+        calls = []
+
+        def block():
+            started.set()
+            self.database.release.wait(5)
+            calls.append("block")
+
+        async def main():
+            running = asyncio.ensure_future(self.executor.run(block))
+            queued = asyncio.ensure_future(
+                self.executor.run(calls.append, "queued")
+            )
+            await asyncio.get_running_loop().run_in_executor(
+                None,
+                started.wait
+            )
+            queued.cancel()
+            running.cancel()
+            for task in [running, queued]:
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+
+        asyncio.run(main())
+        self.executor.submit(calls.append, "next").result()
+        self.assertEqual(calls, ["block", "next"])
+        self.assertEqual(self.database.interrupted,
+                         [self.executor.threads[0].ident])
+        self.assertEqual(self.database.interrupting,
+                         ["DatabaseExecutor-interrupt"])
+        self.executor.shutdown()
+        self.assertFalse(self.executor.interrupt_thread.is_alive())
+
+    def test_shutdown(self):
+        """
+        Tests that no calls can be submitted to an executor that is shut down.
+        """
+        self.assertEqual(self.executor.submit(abs, -1).result(), 1)
+        self.executor.shutdown()
+        self.assertFalse(self.executor.threads[0].is_alive())
+        with self.assertRaises(ExecutorShutdownError) as context:
+            self.executor.submit(abs, -1)
+        self.assertEqual(context.exception.code, 1)
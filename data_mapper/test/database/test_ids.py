@@ -0,0 +1,286 @@
+import json
+import os
+import os.path
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from data_mapper.database.base import DatabaseProfile
+from data_mapper.database.fields import DatabaseStringField
+from data_mapper.database.ids import HiLoIdGenerator
+from data_mapper.database.ids import TimeOrderedIdGenerator
+from data_mapper.database.ids import IdGeneratorError
+from data_mapper.database.ids import reset_after_fork
+from data_mapper.database.ids import NODE_BITS
+from data_mapper.database.ids import SEQUENCE_BITS
+from data_mapper.database.registry import DatabaseRegistry
+from data_mapper.database.sql import SEQUENCE_TABLE
+
+from data_mapper.mapper.registry import MapperRegistry
+
+from data_mapper.model import Model
+
+from data_mapper.test.database.fake_dbapi import FakeDriver
+
+
+class TestHiLoIdGenerator(unittest.TestCase):
+    """
+    Tests for the class HiLoIdGenerator.
+    """
+
+    def setUp(self):
+        """
+        Defines actions to execute before each unittest method.
+        """
+        DatabaseRegistry.initialize()
+        MapperRegistry.initialize()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "test.db")
+        self.generator = HiLoIdGenerator(block_size=10)
+
+    def tearDown(self):
+        """
+        Defines actions to execute after each unittest method.
+        """
+        DatabaseRegistry.clear()
+        MapperRegistry.clear()
+        self.tmp_dir.cleanup()
+
+    def create_model(self, profile, id_generator, driver=None):
+        """
+        Creates a model stored in the database of the given profile, with the
+        given id generator. The given driver is used to connect to MySQL.
+        """
+        @MapperRegistry.register(
+            db_profile=profile,
+            db_fields={"name": DatabaseStringField("name")},
+            id_generator=id_generator
+        )
+        class Team(Model):
+            pass
+
+        if driver is not None:
+            Team.mapper.database.driver = driver
+        Team.mapper.create_db_table()
+        return Team
+
+    def read_sequences(self):
+        """
+        Reads the values of the sequences, per name.
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return dict(conn.execute(
+                "SELECT name, next_value FROM %s" % SEQUENCE_TABLE
+            ).fetchall())
+        finally:
+            conn.close()
+
+    # =========================================================================
+
+    def test_generate(self):
+        """
+        Tests that the ids are handed out from blocks, with a round trip per
+        reservation of blocks only.
+        """
+        model = self.create_model(DatabaseProfile(
+            "sqlite-profile",
+            system="sqlite",
+            db=self.db_path
+        ), self.generator)
+        teams = [model(name=str(i)) for i in range(25)]
+        model.mapper.save_many(teams)
+        self.assertEqual([team.id for team in teams], list(range(1, 26)))
+        self.assertEqual(self.read_sequences(), {"Team": 3})
+
+        # The ids of the current block are handed out without a round trip.
+        teams = [model(name="a"), model(name="b")]
+        model.mapper.save_many(teams)
+        self.assertEqual([team.id for team in teams], [26, 27])
+        self.assertEqual(self.read_sequences(), {"Team": 3})
+
+        # Another generator, e.g. in another process, reserves its own block.
+        database = model.mapper.database
+        other = HiLoIdGenerator(block_size=10)
+        self.assertEqual(other.generate(database, "Team", 3), [31, 32, 33])
+        self.assertEqual(self.generator.generate(database, "Team", 4),
+                         [28, 29, 30, 41])
+
+    def test_generate_with_rollback(self):
+        """
+        Tests that a block is discarded if the transaction that reserved it is
+        rolled back.
+        """
+        model = self.create_model(DatabaseProfile(
+            "sqlite-profile",
+            system="sqlite",
+            db=self.db_path
+        ), self.generator)
+        database = model.mapper.database
+        with self.assertRaises(ZeroDivisionError):
+            with database.transaction():
+                model(name="A").save()
+                1 / 0
+        self.assertEqual(self.generator.blocks, {})
+
+        team = model(name="B")
+        team.save()
+        self.assertEqual(team.id, 1)
+        self.assertEqual([team.name for team in model.get()], ["B"])
+
+    def test_generate_concurrently(self):
+        """
+        Tests that concurrent threads get unique ids.
+        """
+        model = self.create_model(DatabaseProfile(
+            "sqlite-profile",
+            system="sqlite",
+            db=self.db_path
+        ), self.generator)
+        errors = []
+
+        def work():
+            try:
+                for i in range(20):
+                    model(name=str(i)).save()
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        ids = [team.id for team in model.get()]
+        self.assertEqual(len(ids), 160)
+        self.assertEqual(len(set(ids)), 160)
+
+    def test_generate_with_mysql(self):
+        """
+        Tests the sequence table on MySQL.
+        """
+        model = self.create_model(DatabaseProfile(
+            "mysql-profile",
+            system="mysql",
+            db="test"
+        ), self.generator, FakeDriver(self.db_path))
+        driver = model.mapper.database.driver
+
+        teams = [model(name=str(i)) for i in range(12)]
+        model.mapper.save_many(teams)
+        self.assertEqual([team.id for team in teams], list(range(1, 13)))
+        self.assertEqual(self.read_sequences(), {"Team": 2})
+        self.assertIn(
+            "CREATE TABLE IF NOT EXISTS `%s` (`name` VARCHAR(255) NOT NULL "
+            "PRIMARY KEY, `next_value` BIGINT NOT NULL)" % SEQUENCE_TABLE,
+            driver.statements
+        )
+
+    def test_reset_after_fork(self):
+        """
+        Tests that the blocks are dropped in forked child processes.
+        """
+        model = self.create_model(DatabaseProfile(
+            "sqlite-profile",
+            system="sqlite",
+            db=self.db_path
+        ), self.generator)
+        model(name="A").save()
+        self.assertEqual(len(self.generator.blocks), 1)
+        reset_after_fork()
+        self.assertEqual(self.generator.blocks, {})
+        team = model(name="B")
+        team.save()
+        self.assertEqual(team.id, 11)
+
+
+class TestTimeOrderedIdGenerator(unittest.TestCase):
+    """
+    Tests for the class TimeOrderedIdGenerator.
+    """
+
+    def test_generate(self):
+        """
+        Tests that the ids are unique, ordered and carry the node id.
+        """
+        generator = TimeOrderedIdGenerator(node_id=5)
+        ids = generator.generate(None, "Team", 10000)
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertLess(ids[-1], 1 << 63)
+        for id in ids:
+            self.assertEqual((id >> SEQUENCE_BITS) & ((1 << NODE_BITS) - 1), 5)
+
+    def test_generate_with_used_up_sequence(self):
+        """
+        Tests that the generator waits for the next millisecond if the ids of
+        a millisecond are used up, or if the clock was set back.
+        """
+        generator = TimeOrderedIdGenerator()
+        timestamps = iter([100] * (1 << SEQUENCE_BITS) + [100, 101, 99, 102])
+        generator.get_timestamp = lambda: next(timestamps)
+        ids = generator.generate(None, "Team", (1 << SEQUENCE_BITS) + 2)
+        self.assertEqual(ids[-2] >> (NODE_BITS + SEQUENCE_BITS), 101)
+        self.assertEqual(ids[-1] >> (NODE_BITS + SEQUENCE_BITS), 102)
+        self.assertEqual(ids, sorted(set(ids)))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "os.fork() is not available")
+    def test_fork(self):
+        """
+        Tests that forked child processes take the child node ids of their
+        parent, such that the ids of the parent and its children are
+        disjoint, and that a child without a node id can not generate ids.
+        """
+        generator = TimeOrderedIdGenerator(node_id=5,
+                                           child_node_ids=range(100, 102))
+        generator.generate(None, "Team", 10)
+
+        children = []
+        for _ in range(3):
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                # The child can not fail the test, it reports its ids or the
+                # code of its error to the parent.
+                os.close(read_fd)
+                try:
+                    result = generator.generate(None, "Team", 5000)
+                except IdGeneratorError as error:
+                    result = error.code
+                os.write(write_fd, json.dumps(result).encode("utf-8"))
+                os._exit(0)
+            os.close(write_fd)
+            children.append((pid, read_fd))
+
+        results = [generator.generate(None, "Team", 5000)]
+        for pid, read_fd in children:
+            with os.fdopen(read_fd, "rb") as pipe:
+                results.append(json.loads(pipe.read().decode("utf-8")))
+            os.waitpid(pid, 0)
+
+        self.assertEqual(results[3], 1)
+        all_ids = results[:3]
+        node_mask = (1 << NODE_BITS) - 1
+        self.assertEqual(
+            [{(id >> SEQUENCE_BITS) & node_mask for id in ids}
+             for ids in all_ids],
+            [{5}, {100}, {101}]
+        )
+        self.assertEqual(len(set().union(*all_ids)), 3 * 5000)
+
+    def test_invalid_node_id(self):
+        """
+        Tests that the node id must fit into its bits.
+        """
+        with self.assertRaises(ValueError):
+            TimeOrderedIdGenerator(node_id=1 << NODE_BITS)
+        with self.assertRaises(ValueError):
+            TimeOrderedIdGenerator(node_id=-1)
+        with self.assertRaises(ValueError):
+            TimeOrderedIdGenerator(node_id=1, child_node_ids=[0, 1])
+        with self.assertRaises(ValueError):
+            TimeOrderedIdGenerator(child_node_ids=[1024])
+        with self.assertRaises(ValueError):
+            TimeOrderedIdGenerator(child_node_ids=[1, 1])
@@ -1,8 +1,511 @@
+import asyncio
+import datetime
+import os.path
+import tempfile
+import threading
 import unittest
 
+from data_mapper.database.base import DatabaseProfile
+from data_mapper.database.fields import DatabaseStringField
+from data_mapper.database.fields import DatabaseIntField
+from data_mapper.database.fields import DatabaseListField
+from data_mapper.database.fields import DatabaseBooleanField
+from data_mapper.database.fields import DatabaseBinaryField
+from data_mapper.database.fields import DatabaseFloatField
+from data_mapper.database.fields import DatabaseDoubleField
+from data_mapper.database.fields import DatabaseTimeField
+from data_mapper.database.fields import DatabaseDateTimeField
+from data_mapper.database.fields import DatabaseIndex
+from data_mapper.database.mysql import MySQLDatabase
+from data_mapper.database.mysql import get_pool_settings
+from data_mapper.database.mysql import estimate_size
+from data_mapper.database.registry import DatabaseRegistry
+
+from data_mapper.mapper.registry import MapperRegistry
+
+from data_mapper.model import Model
+
+from data_mapper.test.database.fake_dbapi import FakeDriver
+from data_mapper.test.database.fake_dbapi import OperationalError
+
 
 class TestMySQLDatabase(unittest.TestCase):
     """
-    Tests for the class MySQLDatabase.
+    Tests for the class MySQLDatabase, with a fake driver.
     """
-    pass
+
+    def setUp(self):
+        """
+        Defines actions to execute before each unittest method.
+        """
+        DatabaseRegistry.initialize()
+        MapperRegistry.initialize()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.driver = FakeDriver(os.path.join(self.tmp_dir.name, "test.db"))
+        self.profile = DatabaseProfile(
+            "mysql-profile",
+            system="mysql",
+            user="user",
+            password="secret",
+            db="test",
+            pool_min_size="2",
+            pool_max_size="4",
+            pool_timeout="5"
+        )
+
+        @MapperRegistry.register(
+            db_profile=self.profile,
+            db_fields={
+                "name": DatabaseStringField("name", max_length=10),
+                "rank": DatabaseIntField("rank"),
+                "active": DatabaseBooleanField("active"),
+                "tags": DatabaseListField("tags")
+            }
+        )
+        class Team(Model):
+            pass
+
+        self.model = Team
+        self.database = Team.mapper.database
+        self.database.driver = self.driver
+
+    def tearDown(self):
+        """
+        Defines actions to execute after each unittest method.
+        """
+        self.database.close()
+        self.tmp_dir.cleanup()
+        MapperRegistry.clear()
+        DatabaseRegistry.clear()
+
+    # =========================================================================
+
+    def test_connect(self):
+        """
+        Tests that the connections are established with the settings of the
+        profile and that the pool is warmed up.
+        """
+        self.assertIsInstance(self.database, MySQLDatabase)
+        self.assertEqual(self.driver.connections, [])
+        self.database.get_pool()
+        self.assertEqual(len(self.driver.connections), 2)
+        self.assertEqual(self.driver.connect_kwargs, {
+            "host": "localhost",
+            "port": 3306,
+            "user": "user",
+            "password": "secret",
+            "database": "test",
+            "charset": "utf8mb4",
+            "autocommit": False
+        })
+        self.assertEqual(get_pool_settings(self.profile), {
+            "min_size": 2,
+            "max_size": 4,
+            "timeout": 5.0
+        })
+
+    def test_create_table(self):
+        """
+        Tests the methods create_table() and exists_table().
+        """
+        self.assertFalse(self.database.exists_table(self.model))
+        self.model.mapper.create_db_table()
+        self.assertTrue(self.database.exists_table(self.model))
+        self.assertIn(
+            "CREATE TABLE IF NOT EXISTS `Team` (`id` BIGINT NOT NULL PRIMARY "
+            "KEY, `name` VARCHAR(10), `rank` INT, `active` TINYINT(1), "
+            "`tags` LONGTEXT) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4",
+            self.driver.statements
+        )
+
+        # Creating the unchanged table again does not issue any statement.
+        num_statements = len(self.driver.statements)
+        self.model.mapper.create_db_table()
+        self.assertEqual(len(self.driver.statements), num_statements)
+
+    def test_create_table_statement(self):
+        """
+        Tests the rendering of the CREATE TABLE statement for all field
+        types, constraints and indexes.
+        """
+        db_fields = {
+            "code": DatabaseStringField("code", max_length=8, mandatory=True,
+                                        default_value="it's"),
+            "text": DatabaseStringField("text", default_value="x"),
+            "long": DatabaseStringField("long", max_length=100000),
+            "flag": DatabaseBooleanField("flag", default_value=True),
+            "small": DatabaseIntField("small", unsigned=True, max_value=255),
+            "count": DatabaseIntField("count", width=5, default_value=0),
+            "big": DatabaseIntField("big", min_value=-2 ** 40),
+            "level": DatabaseIntField("level", choices=[1, 2, 300]),
+            "ratio": DatabaseFloatField("ratio", precision=2),
+            "score": DatabaseDoubleField("score", min_value=-10,
+                                         max_value=100, precision=3,
+                                         unsigned=True),
+            "tags": DatabaseListField("tags", default_value=[]),
+            "data": DatabaseBinaryField("data"),
+            "start": DatabaseTimeField("start"),
+            "created": DatabaseDateTimeField(
+                "created",
+                default_value=datetime.datetime(2020, 1, 2, 3, 4, 5)
+            )
+        }
+        db_indexes = [
+            DatabaseIndex(["code", "count"], unique=True),
+            DatabaseIndex("text", name="text_index")
+        ]
+        self.assertEqual(
+            self.database.get_create_table_statement("T", db_fields,
+                                                     db_indexes),
+            "CREATE TABLE IF NOT EXISTS `T` ("
+            "`id` BIGINT NOT NULL PRIMARY KEY, "
+            "`code` VARCHAR(8) NOT NULL DEFAULT 'it''s', "
+            "`text` LONGTEXT, "
+            "`long` MEDIUMTEXT, "
+            "`flag` TINYINT(1) DEFAULT 1, "
+            "`small` TINYINT UNSIGNED, "
+            "`count` INT(5) DEFAULT 0, "
+            "`big` BIGINT, "
+            "`level` SMALLINT, "
+            "`ratio` FLOAT, "
+            "`score` DOUBLE(6,3) UNSIGNED, "
+            "`tags` LONGTEXT, "
+            "`data` LONGBLOB, "
+            "`start` TIME(6), "
+            "`created` DATETIME(6) DEFAULT '2020-01-02 03:04:05', "
+            "UNIQUE INDEX `idx_T_code_count` (`code`, `count`), "
+            "INDEX `text_index` (`text`(191))"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+        )
+
+    def test_ddl_cache(self):
+        """
+        Tests that the DDL is rendered once per table and fingerprint.
+        """
+        db_fields = {"name": DatabaseStringField("name")}
+        statements = self.database.get_ddl("Cached", db_fields)
+        self.assertIs(self.database.get_ddl("Cached", db_fields), statements)
+        self.assertIs(
+            MySQLDatabase(self.profile).get_ddl("Cached", db_fields),
+            statements
+        )
+        # Changed fields give a new fingerprint and a new statement.
+        changed = self.database.get_ddl("Cached", {
+            "name": DatabaseStringField("name", max_length=3)
+        })
+        self.assertIsNot(changed, statements)
+        self.assertIn("VARCHAR(3)", changed[0])
+
+    def test_save_and_get(self):
+        """
+        Tests that instances are written and read with pooled connections.
+        """
+        self.model.mapper.create_db_table()
+        team = self.model(name="A", rank=1, active=True, tags=["x"])
+        team.save()
+        self.assertEqual(team.id, 1)
+        team.rank = 2
+        team.save()
+        self.assertIn("UPDATE `Team` SET `rank` = %s WHERE `id` = %s",
+                      self.driver.statements)
+
+        teams = list(self.model.get())
+        self.assertEqual(len(teams), 1)
+        self.assertEqual(teams[0].rank, 2)
+        self.assertIs(teams[0].active, True)
+        self.assertEqual(teams[0].tags, ["x"])
+
+        stats = self.database.get_pool().get_stats()
+        self.assertEqual(stats["in_use"], 0)
+        self.assertEqual(stats["checkouts"], stats["checkins"])
+
+    def test_get_with_unbuffered_cursor(self):
+        """
+        Tests that get() streams the rows with an unbuffered cursor, outside
+        of transactions.
+        """
+        self.model.mapper.create_db_table()
+        self.model.mapper.save_many(
+            [self.model(name=str(i), rank=i) for i in range(250)]
+        )
+        pool = self.database.get_pool()
+        self.driver.max_buffered_rows = 0
+
+        # The connection is kept checked out until all rows are read.
+        teams = self.model.get(batch_size=50)
+        self.assertEqual([next(teams).rank for _ in range(60)],
+                         list(range(60)))
+        self.assertEqual(pool.get_stats()["in_use"], 1)
+        # A connection with an unread result is discarded.
+        del teams
+        self.assertEqual(pool.get_stats()["in_use"], 0)
+        self.assertEqual(pool.get_stats()["discarded"], 1)
+
+        teams = list(self.model.get(batch_size=50))
+        self.assertEqual(len(teams), 250)
+        self.assertEqual(self.driver.max_buffered_rows, 0)
+        self.assertEqual(pool.get_stats()["discarded"], 1)
+
+        # Inside of a transaction, the result is buffered, such that other
+        # statements can be executed on the connection meanwhile.
+        with self.database.transaction():
+            for team in self.model.get(batch_size=50, max_num=2):
+                team.rank += 1000
+                team.save()
+        self.assertEqual(self.driver.max_buffered_rows, 2)
+        self.assertEqual([team.rank for team in self.model.get(max_num=3)],
+                         [1000, 1001, 2])
+
+    def get_inserts(self):
+        """
+        Returns the executed INSERT statements.
+        """
+        return [statement for statement in self.driver.statements
+                if statement.startswith("INSERT")]
+
+    def test_insert_in_single_statement(self):
+        """
+        Tests that small rows are packed into a single multi-row INSERT.
+        """
+        self.model.mapper.create_db_table()
+        teams = [self.model(name=str(i), rank=i) for i in range(3000)]
+        self.model.mapper.save_many(teams)
+
+        inserts = self.get_inserts()
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(inserts[0].count("(%s, %s, %s, %s, %s)"), 3000)
+        self.assertEqual([team.id for team in teams], list(range(1, 3001)))
+        self.assertEqual([team.rank for team in self.model.get()],
+                         list(range(3000)))
+
+    def test_upsert_many(self):
+        """
+        Tests that upsert_many() packs the rows into a single multi-row
+        INSERT ... ON DUPLICATE KEY UPDATE and assigns the ids of the rows to
+        the instances.
+        """
+        @MapperRegistry.register(
+            db_profile=self.profile,
+            db_fields={
+                "code": DatabaseStringField("code", max_length=8),
+                "rank": DatabaseIntField("rank")
+            },
+            db_indexes=[DatabaseIndex("code", unique=True)]
+        )
+        class Club(Model):
+            pass
+
+        Club.mapper.create_db_table()
+        Club.mapper.save_many([Club(code=str(i), rank=i) for i in range(3)])
+        self.driver.statements.clear()
+
+        clubs = [Club(code=str(i), rank=10 * i) for i in range(1, 5)]
+        Club.mapper.upsert_many(clubs, ["code"])
+        upserts = [statement for statement in self.driver.statements
+                   if statement.startswith("INSERT")]
+        self.assertEqual(upserts, [
+            "INSERT INTO `Club` (`code`, `rank`, `id`) VALUES "
+            + ", ".join(["(%s, %s, %s)"] * 4)
+            + " AS `new` ON DUPLICATE KEY UPDATE `rank` = `new`.`rank`"
+        ])
+        self.assertEqual(
+            [(club.code, club.rank) for club in Club.get()],
+            [("0", 0), ("1", 10), ("2", 20), ("3", 30), ("4", 40)]
+        )
+        self.assertEqual([club.id for club in clubs],
+                         [club.id for club in Club.get()][1:])
+        self.assertEqual([club.id for club in clubs][:2], [2, 3])
+
+        # Keep the existing rows as they are.
+        Club.mapper.upsert_many([Club(code="1", rank=1)], ["code"],
+                                update_fields=[])
+        self.assertEqual([club.rank for club in Club.get()],
+                         [0, 10, 20, 30, 40])
+
+    def test_insert_by_packet_size(self):
+        """
+        Tests that the rows are split by their estimated size, such that no
+        statement exceeds the packet size of the profile.
+        """
+        @MapperRegistry.register(
+            db_profile=self.profile,
+            db_fields={
+                "name": DatabaseStringField("name"),
+                "data": DatabaseBinaryField("data")
+            }
+        )
+        class File(Model):
+            pass
+
+        File.mapper.create_db_table()
+        self.profile.max_packet_size = "20000"
+        files = []
+        for i in range(100):
+            # Every tenth file is too large to share a statement.
+            data = bytes(15000) if i % 10 == 0 else b"'x'" * 10
+            files.append(File(name="f%d" % i, data=data))
+        File.mapper.save_many(files)
+
+        inserts = self.get_inserts()
+        self.assertGreater(len(inserts), 10)
+        self.assertLess(len(inserts), 30)
+        # The large files are inserted on their own.
+        single_inserts = [insert for insert in inserts
+                          if insert.endswith("VALUES (%s, %s, %s)")]
+        self.assertEqual(len(single_inserts), 10)
+        stored = list(File.get())
+        self.assertEqual([f.name for f in stored],
+                         ["f%d" % i for i in range(100)])
+        self.assertEqual([f.data for f in stored], [f.data for f in files])
+
+    def test_estimate_size(self):
+        """
+        Tests the function estimate_size().
+        """
+        self.assertEqual(estimate_size(None), 4)
+        self.assertEqual(estimate_size(12345), 5)
+        self.assertEqual(estimate_size("abc"), 5)
+        self.assertEqual(estimate_size("it's"), 7)
+        self.assertEqual(estimate_size("äö"), 6)
+        self.assertEqual(estimate_size(b"\0\0"), 13)
+
+    def test_concurrent_saves(self):
+        """
+        Tests that concurrent threads run separate transactions on separate
+        pooled connections.
+        """
+        self.model.mapper.create_db_table()
+        errors = []
+
+        def work(number):
+            try:
+                for i in range(10):
+                    self.model(name="%d-%d" % (number, i)).save()
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=work, args=(i,))
+                   for i in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        ids = [team.id for team in self.model.get()]
+        self.assertEqual(ids, list(range(1, 161)))
+        self.assertLessEqual(len(self.driver.connections), 4)
+
+    def test_discard_broken_connections(self):
+        """
+        Tests that connections are discarded after a connection error.
+        """
+        self.model.mapper.create_db_table()
+        pool = self.database.get_pool()
+        conn = pool.checkout()
+        conn.is_broken = True
+        pool.checkin(conn)
+
+        with self.assertRaises(OperationalError):
+            self.model(name="A").save()
+        self.assertTrue(conn.is_closed)
+        self.assertEqual(pool.get_stats()["discarded"], 1)
+
+        # The next write uses another connection.
+        self.model(name="A").save()
+        self.assertEqual([team.name for team in self.model.get()], ["A"])
+
+    def test_reset_after_fork(self):
+        """
+        Tests that the connection pool inherited from a parent process is
+        dropped without closing its connections, and that a new pool is
+        created on the next request.
+        """
+        self.model.mapper.create_db_table()
+        self.model(name="A").save()
+        inherited = list(self.driver.connections)
+        self.database.get_executor()
+
+        DatabaseRegistry.reset_after_fork()
+        self.assertIsNone(self.database.pool)
+        self.assertIsNone(self.database.executor)
+        self.assertEqual(self.database.active_connections, {})
+        self.assertFalse(any(conn.is_closed for conn in inherited))
+
+        self.assertEqual([team.name for team in self.model.get()], ["A"])
+        self.assertEqual(len(self.driver.connections), len(inherited) + 2)
+
+    def test_async_methods(self):
+        """
+        Tests the async methods, run on a driver thread per pooled connection,
+        and that cancelling a task kills its running statement. No connection
+        is established on the thread of the event loop.
+        """
+        self.model.mapper.create_db_table()
+        self.database.close()
+        num_connections = len(self.driver.connections)
+        statement = ("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 "
+                     "FROM c WHERE x < 1000000000) SELECT max(x) FROM c")
+
+        def query(statement):
+            return list(self.database.fetch(statement, [], 1))
+
+        async def main():
+            await asyncio.gather(*[
+                self.model(name=str(i)).asave() for i in range(8)
+            ])
+            task = asyncio.ensure_future(
+                self.database.run_async(query, statement)
+            )
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return await self.model.aget(), threading.get_ident()
+
+        teams, loop_thread = asyncio.run(main())
+        self.assertNotIn(loop_thread,
+                         self.driver.connect_threads[num_connections:])
+        self.assertEqual(sorted(team.name for team in teams),
+                         [str(i) for i in range(8)])
+        self.assertEqual(len(self.database.get_executor().threads), 4)
+        self.assertTrue(any(statement.startswith("KILL QUERY ")
+                            for statement in self.driver.statements))
+
+    def test_close(self):
+        """
+        Tests that close() closes the pooled connections.
+        """
+        self.database.get_pool()
+        self.database.close()
+        self.assertTrue(all(conn.is_closed
+                            for conn in self.driver.connections))
+
+    def test_close_with_connections_in_use(self):
+        """
+        Tests that connections in use while the database is closed are closed
+        on their release, without creating a new pool.
+        """
+        self.model.mapper.create_db_table()
+        self.model.mapper.save_many([self.model(name=str(i))
+                                     for i in range(10)])
+        teams = self.model.get(batch_size=2)
+        next(teams)
+        pool = self.database.pool
+        self.database.close()
+        self.assertEqual([team.name for team in teams],
+                         [str(i) for i in range(1, 10)])
+        self.assertIsNone(self.database.pool)
+        self.assertEqual(pool.get_stats()["in_use"], 0)
+
+        with self.database.transaction():
+            self.model(name="A").save()
+            pool = self.database.pool
+            self.database.close()
+        self.assertIsNone(self.database.pool)
+        self.assertEqual(pool.get_stats()["in_use"], 0)
+        self.assertEqual(self.database.connection_pools, {})
+        self.assertTrue(all(conn.is_closed
+                            for conn in self.driver.connections))
+        self.assertEqual(len(list(self.model.get())), 11)
@@ -0,0 +1,211 @@
+import threading
+import time
+import unittest
+
+from data_mapper.database.pool import ConnectionPool
+from data_mapper.database.pool import PoolClosedError
+from data_mapper.database.pool import PoolTimeoutError
+
+
+class FakeConnection:
+    """
+    A connection that only records whether it was closed.
+    """
+    def __init__(self, number):
+        self.number = number
+        self.is_closed = False
+
+    def close(self):
+        self.is_closed = True
+
+
+class TestConnectionPool(unittest.TestCase):
+    """
+    Tests for class ConnectionPool.
+    """
+
+    def setUp(self):
+        """
+        Defines actions to execute before each unittest method.
+        """
+        self.connections = []
+        self.now = 0.0
+
+    def connect(self):
+        """
+        Establishes a new fake connection.
+        """
+        conn = FakeConnection(len(self.connections))
+        self.connections.append(conn)
+        return conn
+
+    def clock(self):
+        """
+        Returns the time of the fake clock.
+        """
+        return self.now
+
+    # =========================================================================
+
+    def test_checkout_and_checkin(self):
+        """
+        Tests that connections are established on demand and reused.
+        """
+        pool = ConnectionPool(self.connect, max_size=2)
+        self.assertEqual(self.connections, [])
+
+        first = pool.checkout()
+        second = pool.checkout()
+        self.assertIsNot(first, second)
+        pool.checkin(first)
+        pool.checkin(second)
+        # The most recently returned connection is reused first.
+        self.assertIs(pool.checkout(), second)
+        self.assertEqual(len(self.connections), 2)
+
+        with self.assertRaises(ValueError):
+            pool.checkin(FakeConnection(-1))
+
+        stats = pool.get_stats()
+        self.assertEqual(stats["checkouts"], 3)
+        self.assertEqual(stats["checkins"], 2)
+        self.assertEqual(stats["created"], 2)
+        self.assertEqual(stats["open"], 2)
+        self.assertEqual(stats["idle"], 1)
+        self.assertEqual(stats["in_use"], 1)
+
+    def test_fill(self):
+        """
+        Tests that fill() establishes the minimal number of connections.
+        """
+        pool = ConnectionPool(self.connect, min_size=3, max_size=5)
+        pool.fill()
+        self.assertEqual(len(self.connections), 3)
+        self.assertEqual(pool.get_stats()["idle"], 3)
+        pool.fill()
+        self.assertEqual(len(self.connections), 3)
+
+        with self.assertRaises(ValueError):
+            ConnectionPool(self.connect, min_size=3, max_size=2)
+        with self.assertRaises(ValueError):
+            ConnectionPool(self.connect, max_size=0)
+
+    def test_timeout(self):
+        """
+        Tests that checkout() waits for a free connection and fails after the
+        timeout if the pool is exhausted.
+        """
+        pool = ConnectionPool(self.connect, max_size=1, timeout=0.05)
+        conn = pool.checkout()
+        with self.assertRaises(PoolTimeoutError):
+            pool.checkout()
+        self.assertEqual(pool.get_stats()["timeouts"], 1)
+
+        # A connection returned while waiting is handed over.
+        timer = threading.Timer(0.01, pool.checkin, [conn])
+        timer.start()
+        pool.timeout = 5
+        self.assertIs(pool.checkout(), conn)
+        timer.join()
+        self.assertGreater(pool.get_stats()["max_wait_time"], 0)
+
+    def test_recycling(self):
+        """
+        Tests that connections are recycled after their maximal lifetime and
+        after being idle for too long.
+        """
+        pool = ConnectionPool(self.connect, max_lifetime=100, max_idle=10,
+                              clock=self.clock)
+        conn = pool.checkout()
+        pool.checkin(conn)
+        self.now = 5
+        self.assertIs(pool.checkout(), conn)
+        pool.checkin(conn)
+
+        # Idle for too long.
+        self.now = 20
+        new_conn = pool.checkout()
+        self.assertIsNot(new_conn, conn)
+        self.assertTrue(conn.is_closed)
+
+        # Used for too long; the connection is closed on checkin.
+        self.now = 200
+        pool.checkin(new_conn)
+        self.assertTrue(new_conn.is_closed)
+        self.assertEqual(pool.get_stats()["recycled"], 2)
+        self.assertEqual(pool.get_stats()["open"], 0)
+
+    def test_discard(self):
+        """
+        Tests that discarded connections are closed and replaced.
+        """
+        pool = ConnectionPool(self.connect, max_size=1)
+        conn = pool.checkout()
+        pool.checkin(conn, discard=True)
+        self.assertTrue(conn.is_closed)
+        self.assertIsNot(pool.checkout(), conn)
+        self.assertEqual(pool.get_stats()["discarded"], 1)
+
+    def test_failing_connect(self):
+        """
+        Tests that a failing connection setup does not occupy the pool.
+        """
+        def connect():
+            raise OSError("Connection refused.")
+
+        pool = ConnectionPool(connect, max_size=1, timeout=0)
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                pool.checkout()
+        self.assertEqual(pool.get_stats()["open"], 0)
+
+    def test_close(self):
+        """
+        Tests that close() closes the idle connections and the connections in
+        use on their return.
+        """
+        pool = ConnectionPool(self.connect)
+        idle = pool.checkout()
+        in_use = pool.checkout()
+        pool.checkin(idle)
+        pool.close()
+        self.assertTrue(idle.is_closed)
+        self.assertFalse(in_use.is_closed)
+        pool.checkin(in_use)
+        self.assertTrue(in_use.is_closed)
+        with self.assertRaises(PoolClosedError):
+            pool.checkout()
+
+    def test_concurrency(self):
+        """
+        Tests that concurrent threads never open more than the maximal number
+        of connections and never share a connection.
+        """
+        pool = ConnectionPool(self.connect, max_size=4)
+        in_use = set()
+        errors = []
+        lock = threading.Lock()
+
+        def work():
+            for _ in range(50):
+                with pool.connection() as conn:
+                    with lock:
+                        if conn in in_use:
+                            errors.append(conn)
+                        in_use.add(conn)
+                    time.sleep(0.0001)
+                    with lock:
+                        in_use.remove(conn)
+
+        threads = [threading.Thread(target=work) for _ in range(64)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(self.connections), 4)
+        stats = pool.get_stats()
+        self.assertEqual(stats["checkouts"], 64 * 50)
+        self.assertEqual(stats["checkins"], 64 * 50)
+        self.assertEqual(stats["in_use"], 0)
@@ -1,6 +1,9 @@
 import unittest
 import os
 import os.path
+import tempfile
+import threading
+import time
 
 from data_mapper.database.base import Database
 from data_mapper.database.base import DatabaseSystem
@@ -742,6 +745,86 @@ class TestDatabaseRegistry(unittest.TestCase):
         self.assertEqual(database.system, DatabaseSystem.SQLITE)
         self.assertEqual(database.db_profile.name, "second-profile")
 
+    def test_get_database_shares_instances(self):
+        """
+        Tests that get_database() returns a single shared database instance
+        per profile, also on concurrent requests.
+        """
+        DatabaseRegistry.initialize(self.profiles_file_two_profiles)
+
+        database = DatabaseRegistry.get_database("second-profile")
+        self.assertIs(DatabaseRegistry.get_database("second-profile"),
+                      database)
+        self.assertIsNot(DatabaseRegistry.get_database("first-profile"),
+                         database)
+        # A profile with the same settings shares the instance.
+        profile = DatabaseRegistry.get_profile("second-profile")
+        copy = DatabaseProfile(
+            profile.name,
+            system=profile.system,
+            host=profile.host,
+            port=profile.port,
+            user=profile.user,
+            password=profile.password,
+            db=profile.db
+        )
+        self.assertIs(DatabaseRegistry.get_database(profile=copy), database)
+        copy.db = "other"
+        self.assertIsNot(DatabaseRegistry.get_database(profile=copy),
+                         database)
+
+        # Concurrent requests for a new profile create a single instance.
+        profile = DatabaseProfile("concurrent-profile", system="sqlite")
+        databases = []
+
+        def get_database():
+            databases.append(DatabaseRegistry.get_database(profile=profile))
+
+        threads = [threading.Thread(target=get_database) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(databases), 20)
+        self.assertEqual(len({id(database) for database in databases}), 1)
+
+    def test_get_database_after_clear(self):
+        """
+        Tests that clear() and initialize() close the shared database
+        instances, and that get_database() creates new instances afterwards.
+        """
+        DatabaseRegistry.initialize()
+        profile = DatabaseProfile("sqlite-profile", system="sqlite")
+        database = DatabaseRegistry.get_database(profile=profile)
+        database.get_connection()
+        self.assertEqual(len(database.connections), 1)
+
+        DatabaseRegistry.initialize()
+        self.assertEqual(database.connections, {})
+        new_database = DatabaseRegistry.get_database(profile=profile)
+        self.assertIsNot(new_database, database)
+
+        DatabaseRegistry.clear()
+        self.assertEqual(DatabaseRegistry.database_instances, {})
+
+    def test_snapshots_are_read_only(self):
+        """
+        Tests that the registry publishes read-only snapshots, that are
+        replaced on changes.
+        """
+        DatabaseRegistry.initialize(self.profiles_file_two_profiles)
+        profiles = DatabaseRegistry.registered_profiles
+        with self.assertRaises(TypeError):
+            profiles["other"] = DatabaseProfile("other", system="sqlite")
+
+        DatabaseRegistry.register_profile(
+            DatabaseProfile("other", system="sqlite")
+        )
+        # The snapshot taken before is unchanged.
+        self.assertEqual(list(profiles), ["first-profile", "second-profile"])
+        self.assertEqual(list(DatabaseRegistry.registered_profiles),
+                         ["first-profile", "second-profile", "other"])
+
     # =========================================================================
     # Tests for method get_profile()
 
@@ -1192,3 +1275,111 @@ class TestDatabaseRegistry(unittest.TestCase):
         self.assertEqual(second_profile.user, "Hans Dampf")
         self.assertEqual(second_profile.password, None)
         self.assertEqual(second_profile.db, "test")
+
+    def test_read_profiles_is_cached(self):
+        """
+        Tests that read_profiles_from_file() parses an unchanged file only
+        once.
+        """
+        path = self.profiles_file_two_profiles
+        DatabaseRegistry.parsed_files.pop(path, None)
+        original = DatabaseRegistry.__dict__["parse_profiles_file"]
+        parse = DatabaseRegistry.parse_profiles_file
+        parsed_paths = []
+
+        def parse_and_record(path):
+            parsed_paths.append(path)
+            return parse(path)
+
+        DatabaseRegistry.parse_profiles_file = parse_and_record
+        try:
+            first = DatabaseRegistry.read_profiles_from_file(path)
+            second = DatabaseRegistry.read_profiles_from_file(path)
+            DatabaseRegistry.initialize(path)
+        finally:
+            DatabaseRegistry.parse_profiles_file = original
+        self.assertEqual(parsed_paths, [path])
+        # The profiles are new objects on every read.
+        self.assertIsNot(first[0], second[0])
+        self.assertEqual([p.get_key() for p in first],
+                         [p.get_key() for p in second])
+
+    # =========================================================================
+    # Tests for the methods reload_profiles() and watch_profiles_file().
+
+    def write_profiles(self, path, dbs):
+        """
+        Writes a profile config file with a SQLite profile per given database
+        file name.
+        """
+        with open(path, "w") as profiles_file:
+            for i, db in enumerate(dbs):
+                profiles_file.write("[profile-%d]\nsystem = sqlite\n"
+                                    "db = %s\n\n" % (i, db))
+
+    def test_reload_profiles(self):
+        """
+        Tests that reload_profiles() replaces the changed profiles only and
+        keeps the database instances of the unchanged profiles.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "profiles.conf")
+            dbs = [os.path.join(tmp_dir, name)
+                   for name in ["a.db", "b.db", "changed.db", "c.db"]]
+            self.write_profiles(path, dbs[:2])
+            DatabaseRegistry.initialize(path)
+            other = DatabaseRegistry.get_database(
+                profile=DatabaseProfile("other", system="sqlite")
+            )
+            reference = DatabaseRegistry.get_reference("profile-1")
+            first = DatabaseRegistry.get_database("profile-0")
+            second = reference()
+            second.get_connection()
+
+            # Nothing changed.
+            self.assertFalse(DatabaseRegistry.reload_profiles(path))
+            self.assertIs(reference(), second)
+
+            # Change the second profile and add a third one.
+            self.write_profiles(path, [dbs[0], dbs[2], dbs[3]])
+            self.assertTrue(DatabaseRegistry.reload_profiles(path))
+            self.assertEqual(list(DatabaseRegistry.registered_profiles),
+                             ["profile-0", "profile-1", "profile-2"])
+            self.assertIs(DatabaseRegistry.get_database("profile-0"), first)
+            self.assertIs(DatabaseRegistry.get_database(
+                profile=DatabaseProfile("other", system="sqlite")
+            ), other)
+            # The instance of the changed profile is closed and replaced.
+            self.assertEqual(second.connections, {})
+            self.assertEqual(reference().db_profile.db, dbs[2])
+
+            # Remove the profiles.
+            self.write_profiles(path, dbs[:1])
+            self.assertTrue(DatabaseRegistry.reload_profiles(path))
+            self.assertEqual(list(DatabaseRegistry.registered_profiles),
+                             ["profile-0"])
+            with self.assertRaises(GetProfileError):
+                reference()
+
+    def test_watch_profiles_file(self):
+        """
+        Tests that a watcher reloads the profiles on changes of the file.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "profiles.conf")
+            self.write_profiles(path, ["a.db"])
+            DatabaseRegistry.initialize(path)
+            watcher = DatabaseRegistry.watch_profiles_file(path, 0.01)
+            try:
+                self.write_profiles(path, ["changed.db"])
+                deadline = time.monotonic() + 5
+                while time.monotonic() < deadline:
+                    profile = DatabaseRegistry.get_profile("profile-0")
+                    if profile.db == "changed.db":
+                        break
+                    time.sleep(0.01)
+                self.assertEqual(profile.db, "changed.db")
+                self.assertIsNone(watcher.error)
+            finally:
+                watcher.stop()
+            self.assertFalse(watcher.is_alive())
@@ -0,0 +1,53 @@
+import unittest
+
+from data_mapper.database.base import DatabaseProfile
+from data_mapper.database.schema import SchemaCache
+from data_mapper.database.sqlite import SQLiteDatabase
+
+
+class TestSchemaCache(unittest.TestCase):
+    """
+    Tests for class SchemaCache.
+    """
+
+    def setUp(self):
+        """
+        Defines actions to execute before each unittest method.
+        """
+        SchemaCache.invalidate()
+        self.first = SQLiteDatabase(DatabaseProfile("first", system="sqlite"))
+        self.second = SQLiteDatabase(DatabaseProfile("second",
+                                                     system="sqlite"))
+
+    def tearDown(self):
+        """
+        Defines actions to execute after each unittest method.
+        """
+        SchemaCache.invalidate()
+
+    def test_invalidate(self):
+        """
+        Tests the method invalidate() per database and per table.
+        """
+        keys = [
+            SchemaCache.get_key(self.first, "A", "1"),
+            SchemaCache.get_key(self.first, "B", "1"),
+            SchemaCache.get_key(self.second, "A", "1")
+        ]
+        for key in keys:
+            SchemaCache.mark_verified(key)
+            SchemaCache.mark_created(key)
+        self.assertTrue(all(SchemaCache.is_verified(key) for key in keys))
+        self.assertFalse(SchemaCache.is_verified(
+            SchemaCache.get_key(self.first, "A", "2")
+        ))
+
+        SchemaCache.invalidate(self.first, "A")
+        self.assertEqual([SchemaCache.is_verified(key) for key in keys],
+                         [False, True, True])
+        SchemaCache.invalidate(table_name="A")
+        self.assertEqual([SchemaCache.is_created(key) for key in keys],
+                         [False, True, False])
+        SchemaCache.invalidate(self.first)
+        self.assertEqual(SchemaCache.verified_schemas, set())
+        self.assertEqual(SchemaCache.created_tables, set())
@@ -1,8 +1,694 @@
+import asyncio
+import datetime
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
 import unittest
 
+from data_mapper.database.base import DatabaseProfile
+from data_mapper.database.fields import DatabaseStringField
+from data_mapper.database.fields import DatabaseIntField
+from data_mapper.database.fields import DatabaseListField
+from data_mapper.database.fields import DatabaseBooleanField
+from data_mapper.database.fields import DatabaseDateTimeField
+from data_mapper.database.fields import DatabaseBinaryField
+from data_mapper.database.fields import DatabaseIndex
+from data_mapper.database.registry import DatabaseRegistry
+from data_mapper.database.schema import SchemaCache
+from data_mapper.database.schema import SchemaError
+from data_mapper.database.sqlite import SQLiteDatabase
+
+from data_mapper.mapper.registry import MapperRegistry
+
+from data_mapper.model import Model
+from data_mapper.query import Field
+from data_mapper.session import Session
+
 
 class TestSQLiteDatabase(unittest.TestCase):
     """
     Tests for the class SQLiteDatabase.
     """
-    pass
+
+    def setUp(self):
+        """
+        Defines actions to execute before each unittest method.
+        """
+        DatabaseRegistry.initialize()
+        MapperRegistry.initialize()
+
+        # Create a temporary directory for the database file.
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "test.db")
+        self.profile = DatabaseProfile(
+            "sqlite-profile",
+            system="sqlite",
+            db=self.db_path
+        )
+
+        @MapperRegistry.register(
+            db_profile=self.profile,
+            db_fields={
+                "name": DatabaseStringField("name"),
+                "rank": DatabaseIntField("rank"),
+                "tags": DatabaseListField("tags")
+            }
+        )
+        class Team(Model):
+            pass
+
+        self.model = Team
+        self.database = Team.mapper.database
+
+    def tearDown(self):
+        """
+        Defines actions to execute after each unittest method.
+        """
+        self.database.close()
+        self.tmp_dir.cleanup()
+        MapperRegistry.clear()
+        DatabaseRegistry.clear()
+
+    def read_rows(self):
+        """
+        Reads all rows of the table of the test model, with a separate
+        connection.
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(
+                "SELECT id, name, rank, tags FROM Team ORDER BY id"
+            ).fetchall()
+        finally:
+            conn.close()
+
+    # =========================================================================
+    # Tests for the methods create_table() and exists_table().
+
+    def test_create_table(self):
+        """
+        Tests the methods create_table() and exists_table().
+        """
+        self.assertIsInstance(self.database, SQLiteDatabase)
+        self.assertFalse(self.database.exists_table(self.model))
+        self.model.mapper.create_db_table()
+        self.assertTrue(self.database.exists_table(self.model))
+        # Creating the table a second time must not fail.
+        self.model.mapper.create_db_table()
+        self.assertTrue(self.database.exists_table(self.model))
+
+    def test_create_table_with_indexes(self):
+        """
+        Tests that create_table() creates the indexes and issues the DDL only
+        once per table and fingerprint.
+        """
+        self.model.mapper.database_indexes = [
+            DatabaseIndex(["rank", "name"]),
+            DatabaseIndex("name", unique=True, name="unique_name")
+        ]
+        statements = []
+        self.database.get_connection().set_trace_callback(statements.append)
+        self.model.mapper.create_db_table()
+        self.assertIn(
+            'CREATE INDEX IF NOT EXISTS "idx_Team_rank_name" ON "Team" '
+            '("rank", "name")',
+            statements
+        )
+        cursor = self.database.get_connection().execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name"
+        )
+        self.assertEqual(cursor.fetchall(),
+                         [("idx_Team_rank_name",), ("unique_name",)])
+
+        # Creating the unchanged table again does not issue any statement.
+        statements.clear()
+        self.model.mapper.create_db_table()
+        self.assertEqual(statements, [])
+
+    # =========================================================================
+    # Tests for the methods save() and save_many().
+
+    def test_check_schema(self):
+        """
+        Tests that the schema of the table is checked once and that a missing
+        table is created on the first write.
+        """
+        statements = []
+        self.database.get_connection().set_trace_callback(statements.append)
+        self.model(name="A").save()
+        self.assertTrue(self.database.exists_table(self.model))
+        self.assertTrue(SchemaCache.is_verified(self.model.mapper.schema_key))
+
+        # Following writes do not check the schema again.
+        statements.clear()
+        self.model(name="B").save()
+        self.assertFalse(any("sqlite_master" in statement
+                             or "pragma" in statement
+                             for statement in statements))
+        self.assertEqual(len(self.read_rows()), 2)
+
+    def test_check_schema_with_missing_columns(self):
+        """
+        Tests that writing to a table with missing columns fails, until the
+        table was migrated and the cache was invalidated.
+        """
+        conn = self.database.get_connection()
+        conn.execute('CREATE TABLE "Team" ("id" INTEGER PRIMARY KEY, '
+                     '"name" TEXT, "rank" INTEGER)')
+        with self.assertRaises(SchemaError) as context:
+            self.model(name="A").save()
+        self.assertEqual(context.exception.code, 1)
+        self.assertIn("tags", str(context.exception))
+
+        # Migrate the table. The failed check was not cached.
+        conn.execute('ALTER TABLE "Team" ADD COLUMN "tags" TEXT')
+        self.model(name="A").save()
+
+        # A verified schema is not checked again until it is invalidated.
+        conn.execute('ALTER TABLE "Team" RENAME COLUMN "tags" TO "other"')
+        SchemaCache.invalidate(self.database, "Team")
+        with self.assertRaises(SchemaError):
+            self.model(name="B").save()
+
+    def test_save(self):
+        """
+        Tests the method save() on new and on stored instances.
+        """
+        self.model.mapper.create_db_table()
+
+        team = self.model(name="A", rank=1, tags=["x", "y"])
+        self.assertTrue(team.save())
+        self.assertEqual(team.id, 1)
+        self.assertEqual(self.read_rows(), [(1, "A", 1, '["x", "y"]')])
+
+        # Update the stored instance.
+        team.rank = 2
+        self.assertTrue(team.save())
+        self.assertEqual(team.id, 1)
+        self.assertEqual(self.read_rows(), [(1, "A", 2, '["x", "y"]')])
+
+    def test_save_many(self):
+        """
+        Tests the method save_many() on a mix of new and stored instances.
+        """
+        self.model.mapper.create_db_table()
+
+        stored = self.model(name="A", rank=1)
+        stored.save()
+        stored.rank = 5
+
+        teams = [stored] + [self.model(name=str(i), rank=i) for i in range(3)]
+        self.assertTrue(self.model.mapper.save_many(teams))
+        self.assertEqual([team.id for team in teams], [1, 2, 3, 4])
+        self.assertEqual(self.read_rows(), [
+            (1, "A", 5, None),
+            (2, "0", 0, None),
+            (3, "1", 1, None),
+            (4, "2", 2, None)
+        ])
+
+    def test_save_only_dirty_fields(self):
+        """
+        Tests that save() writes only the changed fields of stored instances
+        and skips the write if nothing was changed.
+        """
+        self.model.mapper.create_db_table()
+        statements = []
+        self.database.get_connection().set_trace_callback(statements.append)
+
+        team = self.model(name="A", rank=1)
+        team.save()
+        self.assertIsNone(team.dirty_fields)
+        self.assertEqual(len(statements), 4)
+
+        # Saving an unchanged instance must not touch the database.
+        statements.clear()
+        self.assertTrue(team.save())
+        self.assertEqual(statements, [])
+
+        # Saving a changed instance must write the changed field only.
+        team.rank = 2
+        team.save()
+        self.assertIn('UPDATE "Team" SET "rank" = 2 WHERE "id" = 1',
+                      statements)
+        self.assertEqual(self.read_rows(), [(1, "A", 2, None)])
+
+    def test_concurrent_saves(self):
+        """
+        Tests that concurrent threads write with their own connections, to a
+        database file and to an in-memory database.
+        """
+        memory_profile = DatabaseProfile("memory-profile", system="sqlite")
+
+        @MapperRegistry.register(
+            db_profile=memory_profile,
+            db_fields={"name": DatabaseStringField("name")}
+        )
+        class Event(Model):
+            pass
+
+        for model in [self.model, Event]:
+            model.mapper.create_db_table()
+            errors = []
+
+            def work(number):
+                try:
+                    for i in range(10):
+                        model(name="%d-%d" % (number, i)).save()
+                except Exception as error:
+                    errors.append(error)
+
+            threads = [threading.Thread(target=work, args=(i,))
+                       for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(errors, [])
+            ids = [instance.id for instance in model.get()]
+            self.assertEqual(ids, list(range(1, 81)))
+            # The connections of the finished threads are closed on the next
+            # connect.
+            self.assertLessEqual(len(model.mapper.database.connections), 9)
+        Event.mapper.database.close()
+
+    @unittest.skipUnless(hasattr(os, "fork"), "os.fork() is not available")
+    def test_fork(self):
+        """
+        Tests that a forked child drops the inherited connections and connects
+        again on first use, with the registries inherited from the parent.
+        """
+        memory_profile = DatabaseProfile("memory-profile", system="sqlite")
+
+        @MapperRegistry.register(
+            db_profile=memory_profile,
+            db_fields={"name": DatabaseStringField("name")}
+        )
+        class Event(Model):
+            pass
+
+        models = [self.model, Event]
+        for model in models:
+            model.mapper.create_db_table()
+            model(name="parent").save()
+        inherited = [model.mapper.database.get_connection()
+                     for model in models]
+        mappers = dict(MapperRegistry.registered_mappers)
+        databases = dict(DatabaseRegistry.database_instances)
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # The child can not fail the test, it reports its observations to
+            # the parent.
+            os.close(read_fd)
+            result = {}
+            try:
+                result["registries"] = (
+                    dict(MapperRegistry.registered_mappers) == mappers
+                    and dict(DatabaseRegistry.database_instances) == databases
+                )
+                result["connections"] = [len(model.mapper.database.connections)
+                                         for model in models]
+                for model in models:
+                    model(name="child").save()
+                result["names"] = [[instance.name for instance in model.get()]
+                                   for model in models]
+                result["reconnected"] = [
+                    model.mapper.database.get_connection() is not conn
+                    for model, conn in zip(models, inherited)
+                ]
+            except BaseException as error:
+                result["error"] = repr(error)
+            os.write(write_fd, json.dumps(result).encode("utf-8"))
+            os._exit(0)
+
+        os.close(write_fd)
+        with os.fdopen(read_fd, "rb") as pipe:
+            result = json.loads(pipe.read().decode("utf-8"))
+        os.waitpid(pid, 0)
+
+        self.assertEqual(result, {
+            "registries": True,
+            "connections": [0, 0],
+            # The child writes to the database file and to its own copy of
+            # the in-memory database.
+            "names": [["parent", "child"], ["parent", "child"]],
+            "reconnected": [True, True]
+        })
+        # The connections of the parent are still open.
+        for model, conn in zip(models, inherited):
+            self.assertIs(model.mapper.database.get_connection(), conn)
+        self.assertEqual([instance.name for instance in self.model.get()],
+                         ["parent", "child"])
+        self.assertEqual([instance.name for instance in Event.get()],
+                         ["parent"])
+        Event.mapper.database.close()
+
+    def test_save_many_is_atomic(self):
+        """
+        Tests that save_many() writes either all or none of the instances.
+        """
+        self.model.mapper.create_db_table()
+
+        # The set is not JSON serializable, so writing the last instance fails.
+        teams = [self.model(name="A"), self.model(name="B", tags={"x"})]
+        with self.assertRaises(TypeError):
+            self.model.mapper.save_many(teams)
+        self.assertEqual(self.read_rows(), [])
+        self.assertEqual([team.id for team in teams], [None, None])
+
+    def test_upsert_many(self):
+        """
+        Tests that upsert_many() inserts new rows and updates the rows with
+        the same values in the conflict fields, and assigns the ids of the
+        rows to the instances.
+        """
+        @MapperRegistry.register(
+            db_profile=self.profile,
+            db_fields={
+                "code": DatabaseStringField("code"),
+                "name": DatabaseStringField("name"),
+                "rank": DatabaseIntField("rank")
+            },
+            db_indexes=[DatabaseIndex("code", unique=True)]
+        )
+        class Club(Model):
+            pass
+
+        mapper = Club.mapper
+        mapper.create_db_table()
+        mapper.save_many([Club(code="a", name="A", rank=1),
+                          Club(code="b", name="B", rank=2)])
+
+        def read_clubs():
+            return [(club.id, club.code, club.name, club.rank)
+                    for club in Club.get()]
+
+        clubs = [Club(code="b", name="B2", rank=20),
+                 Club(code="c", name="C", rank=3)]
+        mapper.upsert_many(clubs, ["code"])
+        self.assertEqual(read_clubs(), [
+            (1, "a", "A", 1),
+            (2, "b", "B2", 20),
+            (4, "c", "C", 3)
+        ])
+        # The instances get the ids of their rows, such that they can be
+        # saved again.
+        self.assertEqual([club.id for club in clubs], [2, 4])
+        self.assertFalse(any(club.is_dirty() for club in clubs))
+        clubs[1].rank = 4
+        clubs[1].save()
+        self.assertEqual(read_clubs()[2], (4, "c", "C", 4))
+
+        # Update the given fields only, or none.
+        mapper.upsert_many([Club(code="a", name="A2", rank=10)], ["code"],
+                           update_fields=["rank"])
+        mapper.upsert_many([Club(code="c", name="C2", rank=30)], ["code"],
+                           update_fields=[])
+        self.assertEqual(read_clubs(), [
+            (1, "a", "A", 10),
+            (2, "b", "B2", 20),
+            (4, "c", "C", 4)
+        ])
+        self.assertEqual(
+            mapper.get_upsert_statement(["code"]).sql,
+            'INSERT INTO "Club" ("code", "name", "rank", "id") VALUES '
+            '(?, ?, ?, ?) ON CONFLICT ("code") DO UPDATE SET '
+            '"name" = excluded."name", "rank" = excluded."rank"'
+        )
+        self.assertIs(mapper.get_upsert_statement(["code"]),
+                      mapper.get_upsert_statement(("code",)))
+
+        with self.assertRaises(ValueError):
+            mapper.upsert_many([Club(code="d")], ["other"])
+        with self.assertRaises(ValueError):
+            mapper.upsert_many([Club(code="d")], [])
+
+        # Rows with NULL in a conflict field are always inserted.
+        clubs = [Club(name="X"), Club(name="Y")]
+        mapper.upsert_many(clubs, ["code"])
+        self.assertEqual([club.id for club in clubs], [5, 6])
+
+    # =========================================================================
+    # Tests for the method get().
+
+    def test_get(self):
+        """
+        Tests that get() reads the stored instances with their values.
+        """
+        self.model.mapper.create_db_table()
+        self.model.mapper.save_many([
+            self.model(name="A", rank=1, tags=["x"]),
+            self.model(name="B", rank=2),
+            self.model(name="C", rank=1)
+        ])
+
+        teams = self.model.get()
+        # The instances are read lazily.
+        self.assertNotIsInstance(teams, list)
+        teams = list(teams)
+        self.assertEqual([team.id for team in teams], [1, 2, 3])
+        self.assertEqual(teams[0].name, "A")
+        self.assertEqual(teams[0].tags, ["x"])
+        self.assertIsNone(teams[1].tags)
+        # Read instances are not dirty.
+        self.assertFalse(teams[0].is_dirty())
+
+        # Test the filters and max_num.
+        self.assertEqual([t.name for t in self.model.get(rank=1)], ["A", "C"])
+        self.assertEqual([t.name for t in self.model.get(tags=None)],
+                         ["B", "C"])
+        self.assertEqual([t.name for t in self.model.get(max_num=2)],
+                         ["A", "B"])
+        self.assertEqual(list(self.model.get(rank=3)), [])
+        with self.assertRaises(ValueError):
+            self.model.get(other=1)
+
+    def test_get_with_filter_expression(self):
+        """
+        Tests get() with filter expressions and the cache of their queries.
+        """
+        self.model.mapper.create_db_table()
+        self.model.mapper.save_many([
+            self.model(name="A", rank=1, tags=["x"]),
+            self.model(name="B", rank=2, tags=["y"]),
+            self.model(name="C", rank=3)
+        ])
+
+        def get_names(where, **kwargs):
+            return [t.name for t in self.model.get(where=where, **kwargs)]
+
+        self.assertEqual(
+            get_names((Field("name") == "A") | (Field("name") == "C")),
+            ["A", "C"]
+        )
+        self.assertEqual(get_names(Field("rank").between(2, 3)), ["B", "C"])
+        self.assertEqual(get_names(~Field("rank").in_([1, 3])), ["B"])
+        self.assertEqual(get_names(Field("rank") > 1, name="C"), ["C"])
+        # The values of list fields are converted, like on writing.
+        self.assertEqual(get_names(Field("tags") == ["y"]), ["B"])
+
+        # Queries of the same shape reuse the rendered SQL.
+        num_queries = len(self.model.mapper.queries)
+        self.assertEqual(
+            get_names((Field("name") == "B") | (Field("name") == "X")),
+            ["B"]
+        )
+        self.assertEqual(len(self.model.mapper.queries), num_queries)
+
+        with self.assertRaises(ValueError):
+            self.model.get(where=Field("other") == 1)
+
+    def test_get_page(self):
+        """
+        Tests the keyset pagination of get_page().
+        """
+        self.model.mapper.create_db_table()
+        self.model.mapper.save_many(
+            [self.model(name=str(i), rank=i % 3) for i in range(10)]
+            + [self.model(name="none")]
+        )
+
+        def read_all(**kwargs):
+            pages = [self.model.get_page(page_size=4, **kwargs)]
+            while pages[-1].token is not None:
+                pages.append(self.model.get_page(
+                    page_size=4,
+                    token=pages[-1].token,
+                    **kwargs
+                ))
+            return [[team.id for team in page] for page in pages]
+
+        self.assertEqual(read_all(), [
+            [1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11]
+        ])
+        # Sorted by rank and id; NULL values come first.
+        self.assertEqual(read_all(order_by="rank"), [
+            [11, 1, 4, 7], [10, 2, 5, 8], [3, 6, 9]
+        ])
+        self.assertEqual(read_all(order_by="rank", where=Field("rank") > 0),
+                         [[2, 5, 8, 3], [6, 9]])
+        # A page that ends exactly at the last row has no next page.
+        self.assertEqual(read_all(rank=1), [[2, 5, 8]])
+
+        # The next page is read with a range predicate instead of an offset.
+        statements = []
+        self.database.get_connection().set_trace_callback(statements.append)
+        page = self.model.get_page(page_size=4, order_by="rank")
+        self.model.get_page(page_size=4, order_by="rank", token=page.token)
+        self.assertNotIn("OFFSET", " ".join(statements))
+        self.assertIn('("rank" >= 0 AND ("rank" > 0 OR "id" > 7))',
+                      statements[-1])
+
+        with self.assertRaises(ValueError):
+            self.model.get_page(order_by="other")
+        with self.assertRaises(ValueError):
+            self.model.get_page(order_by="name", token=page.token)
+
+    def test_get_page_by_datetime(self):
+        """
+        Tests the keyset pagination by datetime and binary fields.
+        """
+        @MapperRegistry.register(
+            db_profile=self.profile,
+            db_fields={
+                "created": DatabaseDateTimeField("created"),
+                "data": DatabaseBinaryField("data")
+            }
+        )
+        class Event(Model):
+            pass
+
+        Event.mapper.create_db_table()
+        start = datetime.datetime(2020, 1, 1)
+        Event.mapper.save_many([Event(
+            created=start + datetime.timedelta(hours=i % 4),
+            data=bytes([i % 3, 255])
+        ) for i in range(10)])
+
+        for order_by, key in [("created", lambda event: event.created),
+                              ("data", lambda event: event.data)]:
+            pages = [Event.get_page(page_size=3, order_by=order_by)]
+            while pages[-1].token is not None:
+                pages.append(Event.get_page(
+                    page_size=3,
+                    order_by=order_by,
+                    token=pages[-1].token
+                ))
+            events = [event for page in pages for event in page]
+            self.assertEqual(len(pages), 4)
+            self.assertEqual(
+                [event.id for event in events],
+                [event.id for event in sorted(
+                    Event.get(),
+                    key=lambda event: (key(event), event.id)
+                )]
+            )
+
+    def test_get_in_batches(self):
+        """
+        Tests that get() fetches the rows in batches of the given size.
+        """
+        self.model.mapper.create_db_table()
+        self.model.mapper.save_many(
+            [self.model(name=str(i), rank=i) for i in range(250)]
+        )
+
+        fetched = []
+        fetch = self.database.fetch
+
+        def fetch_and_record(statement, params, batch_size):
+            for row in fetch(statement, params, batch_size):
+                fetched.append(batch_size)
+                yield row
+
+        self.database.fetch = fetch_and_record
+        teams = self.model.get(batch_size=100)
+        self.assertEqual(next(teams).rank, 0)
+        self.assertEqual([team.rank for team in teams], list(range(1, 250)))
+        self.assertEqual(set(fetched), {100})
+
+    def test_get_with_converted_values(self):
+        """
+        Tests that get() converts the values back to the values of the model.
+        """
+        @MapperRegistry.register(
+            db_profile=self.profile,
+            db_fields={
+                "active": DatabaseBooleanField("active"),
+                "created": DatabaseDateTimeField("created")
+            }
+        )
+        class Event(Model):
+            pass
+
+        Event.mapper.create_db_table()
+        created = datetime.datetime(2020, 1, 2, 3, 4, 5)
+        Event(active=True, created=created).save()
+        event = next(Event.get())
+        self.assertIs(event.active, True)
+        self.assertEqual(event.created, created)
+        Event.mapper.database.close()
+
+    # =========================================================================
+    # Tests for the async methods.
+
+    def test_async_methods(self):
+        """
+        Tests the async variants of save(), get(), get_page() and flush().
+        """
+        self.model.mapper.create_db_table()
+
+        async def main():
+            team = self.model(name="A", rank=1)
+            self.assertTrue(await team.asave())
+            self.assertEqual(team.id, 1)
+            await self.model.mapper.asave_many(
+                [self.model(name=str(i), rank=i) for i in range(2, 5)]
+            )
+            session = Session()
+            session.add(self.model(name="B", rank=5))
+            self.assertTrue(await session.aflush())
+            self.assertEqual(session.instances, {})
+
+            teams = await self.model.aget(where=Field("rank") > 2)
+            self.assertEqual([team.name for team in teams], ["3", "4", "B"])
+            page = await self.model.aget_page(page_size=2, order_by="rank")
+            self.assertEqual([team.name for team in page], ["A", "2"])
+            page = await self.model.aget_page(page_size=2, order_by="rank",
+                                              token=page.token)
+            self.assertEqual([team.name for team in page], ["3", "4"])
+
+        asyncio.run(main())
+        self.assertEqual(len(self.read_rows()), 5)
+
+    def test_async_cancel(self):
+        """
+        Tests that cancelling a task aborts its running statement.
+        """
+        # A query that runs for minutes, unless it is interrupted.
+        statement = ("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 "
+                     "FROM c WHERE x < 1000000000) SELECT max(x) FROM c")
+
+        def query(statement):
+            return list(self.database.fetch(statement, [], 1))
+
+        async def main():
+            task = asyncio.ensure_future(
+                self.database.run_async(query, statement)
+            )
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # The driver thread is free again.
+            return await self.database.run_async(query, "SELECT 1")
+
+        start = time.monotonic()
+        self.assertEqual(asyncio.run(main()), [(1,)])
+        self.assertLess(time.monotonic() - start, 10)
@@ -0,0 +1,99 @@
+import unittest
+
+from data_mapper.database.base import DatabaseProfile
+from data_mapper.database.fields import DatabaseStringField
+from data_mapper.database.fields import DatabaseIntField
+from data_mapper.database.fields import DatabaseListField
+from data_mapper.database.registry import DatabaseRegistry
+
+from data_mapper.mapper.registry import MapperRegistry
+
+from data_mapper.model import Model
+
+
+class TestMapper(unittest.TestCase):
+    """
+    Tests for class Mapper.
+    """
+
+    def setUp(self):
+        """
+        Defines actions to execute before each unittest method.
+        """
+        DatabaseRegistry.initialize()
+        MapperRegistry.initialize()
+
+        @MapperRegistry.register(
+            db_profile=DatabaseProfile("Profile", system="sqlite"),
+            db_fields={
+                "name": DatabaseStringField("name", default_value="X"),
+                "rank": DatabaseIntField("rank"),
+                "tags": DatabaseListField("tags")
+            }
+        )
+        class Team(Model):
+            pass
+
+        self.model = Team
+        self.mapper = Team.mapper
+
+    def tearDown(self):
+        """
+        Defines actions to execute after each unittest method.
+        """
+        self.mapper.database.close()
+        MapperRegistry.clear()
+        DatabaseRegistry.clear()
+
+    # =========================================================================
+    # Tests for the method get_statement().
+
+    def test_get_statement_is_cached(self):
+        """
+        Tests that get_statement() compiles each statement only once.
+        """
+        insert = self.mapper.get_statement("insert")
+        self.assertIs(self.mapper.get_statement("insert"), insert)
+
+        # The order of the given columns must not matter.
+        update = self.mapper.get_statement("update", ["rank", "name"])
+        self.assertIs(self.mapper.get_statement("update", ["name", "rank"]),
+                      update)
+        self.assertIsNot(self.mapper.get_statement("update"), update)
+        self.assertEqual(len(self.mapper.statements), 3)
+
+    def test_get_statement_with_unknown_operation(self):
+        """
+        Tests the method get_statement() with an unknown operation.
+        """
+        with self.assertRaises(ValueError):
+            self.mapper.get_statement("merge")
+
+    def test_get_insert_statement(self):
+        """
+        Tests the rendered SQL and the extractor of an INSERT statement.
+        """
+        statement = self.mapper.get_statement("insert")
+        self.assertEqual(statement.columns, ["name", "rank", "tags"])
+        self.assertEqual(
+            statement.sql,
+            'INSERT INTO "Team" ("name", "rank", "tags", "id") '
+            'VALUES (?, ?, ?, ?)'
+        )
+        # Missing values are replaced by the default values and the list is
+        # converted by the SQLite converter.
+        team = self.model(rank=3, tags=[1, 2])
+        self.assertEqual(statement.extract(team), ("X", 3, "[1, 2]"))
+
+    def test_get_update_statement(self):
+        """
+        Tests the rendered SQL and the extractor of an UPDATE statement.
+        """
+        statement = self.mapper.get_statement("update", {"rank", "name"})
+        self.assertEqual(statement.columns, ["name", "rank"])
+        self.assertEqual(
+            statement.sql,
+            'UPDATE "Team" SET "name" = ?, "rank" = ? WHERE "id" = ?'
+        )
+        team = self.model(name="A", rank=3)
+        self.assertEqual(statement.extract(team), ("A", 3))
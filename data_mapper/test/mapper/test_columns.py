@@ -0,0 +1,214 @@
+import unittest
+
+from data_mapper.database.base import DatabaseProfile
+from data_mapper.database.fields import DatabaseStringField
+from data_mapper.database.fields import DatabaseIntField
+from data_mapper.database.fields import DatabaseFloatField
+from data_mapper.database.registry import DatabaseRegistry
+
+from data_mapper.mapper import validation
+from data_mapper.mapper.columns import get_numpy
+from data_mapper.mapper.columns import normalize_columns
+from data_mapper.mapper.columns import validate_columns
+from data_mapper.mapper.columns import round_columns
+from data_mapper.mapper.registry import MapperRegistry
+
+from data_mapper.model import Model
+
+numpy = get_numpy()
+
+
+class TestColumns(unittest.TestCase):
+    """
+    Tests for the validation and the saving of column-oriented values.
+    """
+    db_fields = {
+        "name": DatabaseStringField("name", mandatory=True),
+        "rank": DatabaseIntField("rank", unsigned=True, max_value=10),
+        "score": DatabaseFloatField("score", choices=[0.5, 1.5, 2.25],
+                                    precision=1)
+    }
+
+    columns = {
+        "name": ["A", None, "C", "D"],
+        "rank": [1, -1, 11, 3],
+        "score": [0.5, 1.5, 2.25, 3.0]
+    }
+
+    expected_errors = [
+        (1, "name", validation.MANDATORY),
+        (1, "rank", validation.UNSIGNED),
+        (2, "rank", validation.MAX_VALUE),
+        (3, "score", validation.CHOICES)
+    ]
+
+    def tearDown(self):
+        """
+        Defines actions to execute after each unittest method.
+        """
+        MapperRegistry.clear()
+        DatabaseRegistry.clear()
+
+    # =========================================================================
+
+    def test_normalize_columns(self):
+        """
+        Tests the function normalize_columns().
+        """
+        num_rows, columns = normalize_columns(
+            self.db_fields,
+            {"score": [1.0, 2.0], "name": ["A", "B"]}
+        )
+        self.assertEqual(num_rows, 2)
+        self.assertEqual(columns, [["A", "B"], [None, None], [1.0, 2.0]])
+
+        with self.assertRaises(ValueError):
+            normalize_columns(self.db_fields, {"other": [1]})
+        with self.assertRaises(ValueError):
+            normalize_columns(self.db_fields, {"name": ["A"], "rank": []})
+
+    def test_validate_columns_without_numpy(self):
+        """
+        Tests the function validate_columns() with the pure Python path.
+        """
+        _, columns = normalize_columns(self.db_fields, self.columns)
+        report = validate_columns(self.db_fields, columns, use_numpy=False)
+        self.assertEqual(list(report), self.expected_errors)
+        self.assertEqual(
+            report.get_message(self.expected_errors[2]),
+            "Row 2: The value '11' of field 'rank' is larger than 10."
+        )
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed.")
+    def test_validate_columns_with_numpy(self):
+        """
+        Tests that the function validate_columns() reports the same errors
+        with NumPy arrays as with the pure Python path.
+        """
+        columns = dict(self.columns)
+        columns["rank"] = numpy.array(columns["rank"])
+        columns["score"] = numpy.array(columns["score"])
+        _, columns = normalize_columns(self.db_fields, columns)
+        report = validate_columns(self.db_fields, columns, use_numpy=True)
+        self.assertEqual(list(report), self.expected_errors)
+
+    def test_round_columns_without_numpy(self):
+        """
+        Tests the function round_columns() with the pure Python path.
+        """
+        _, columns = normalize_columns(self.db_fields, self.columns)
+        columns = round_columns(self.db_fields, columns, use_numpy=False)
+        self.assertEqual(columns[2], [0.5, 1.5, 2.2, 3.0])
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed.")
+    def test_round_columns_with_numpy(self):
+        """
+        Tests that the function round_columns() turns NumPy arrays into lists.
+        """
+        columns = [["A"], numpy.array([1]), numpy.array([2.25])]
+        columns = round_columns(self.db_fields, columns, use_numpy=True)
+        self.assertEqual(columns, [["A"], [1], [2.2]])
+        self.assertIs(type(columns[1][0]), int)
+
+    # =========================================================================
+    # Tests for the method Mapper.save_columns().
+
+    def test_save_columns(self):
+        """
+        Tests that save_columns() inserts the valid rows only, and that the
+        compiled validator is cached by the mapper.
+        """
+        DatabaseRegistry.initialize()
+
+        @MapperRegistry.register(
+            db_profile=DatabaseProfile("Profile", system="sqlite"),
+            db_fields=self.db_fields
+        )
+        class Team(Model):
+            pass
+
+        Team.mapper.create_db_table()
+        report = Team.mapper.save_columns(self.columns, use_numpy=False)
+        self.assertEqual(list(report), self.expected_errors)
+
+        cursor = Team.mapper.database.get_connection().execute(
+            'SELECT id, name, rank, score FROM "Team"'
+        )
+        self.assertEqual(cursor.fetchall(), [(1, "A", 1, 0.5)])
+
+        validators = dict(Team.mapper.column_validators)
+        self.assertEqual(list(validators), [("name", "rank", "score")])
+        Team.mapper.save_columns({"name": ["E"]}, use_numpy=False)
+        self.assertEqual(Team.mapper.column_validators, validators)
+        Team.mapper.database.close()
+
+    def test_save_columns_with_invalid_types(self):
+        """
+        Tests that save_columns() reports values of a wrong type and skips
+        their rows, instead of raising a TypeError.
+        """
+        DatabaseRegistry.initialize()
+
+        @MapperRegistry.register(
+            db_profile=DatabaseProfile("Profile", system="sqlite"),
+            db_fields=self.db_fields
+        )
+        class Team(Model):
+            pass
+
+        Team.mapper.create_db_table()
+        report = Team.mapper.save_columns({
+            "name": ["A", "B", "C"],
+            "rank": [1, 2, "3"],
+            "score": [0.5, 1.5, "x"]
+        }, use_numpy=False)
+        self.assertEqual(list(report), [
+            (2, "rank", validation.INVALID_TYPE),
+            (2, "score", validation.CHOICES)
+        ])
+
+        cursor = Team.mapper.database.get_connection().execute(
+            'SELECT id, name, rank, score FROM "Team"'
+        )
+        self.assertEqual(cursor.fetchall(), [
+            (1, "A", 1, 0.5),
+            (2, "B", 2, 1.5)
+        ])
+        Team.mapper.database.close()
+
+    def test_save_columns_with_invalid_precision_types(self):
+        """
+        Tests that save_columns() reports values of a wrong type in fields
+        with a precision only, which are rounded but have no other checks.
+        """
+        DatabaseRegistry.initialize()
+
+        @MapperRegistry.register(
+            db_profile=DatabaseProfile("Profile", system="sqlite"),
+            db_fields={
+                "x": DatabaseFloatField("x", precision=2),
+                "y": DatabaseFloatField("y", precision=1, min_value=0)
+            }
+        )
+        class Point(Model):
+            pass
+
+        Point.mapper.create_db_table()
+        report = Point.mapper.save_columns({
+            "x": [1.234, "abc", None, 2],
+            "y": [0.25, 1.0, "z", None]
+        }, use_numpy=False)
+        self.assertEqual(list(report), [
+            (1, "x", validation.INVALID_TYPE),
+            (2, "y", validation.INVALID_TYPE)
+        ])
+        self.assertEqual(
+            report.get_message((1, "x", validation.INVALID_TYPE)),
+            "Row 1: The value 'abc' of field 'x' has an invalid type."
+        )
+
+        cursor = Point.mapper.database.get_connection().execute(
+            'SELECT id, x, y FROM "Point"'
+        )
+        self.assertEqual(cursor.fetchall(), [(1, 1.23, 0.2), (2, 2, None)])
+        Point.mapper.database.close()
@@ -0,0 +1,238 @@
+import os
+import os.path
+import sqlite3
+import tempfile
+import unittest
+
+from data_mapper.database.base import DatabaseProfile
+from data_mapper.database.fields import DatabaseStringField
+from data_mapper.database.fields import DatabaseIntField
+from data_mapper.database.fields import DatabaseFloatField
+from data_mapper.database.fields import DatabaseListField
+from data_mapper.database.registry import DatabaseRegistry
+
+from data_mapper.mapper import validation
+from data_mapper.mapper.parallel import LOADS
+from data_mapper.mapper.parallel import iter_partitions
+from data_mapper.mapper.registry import MapperRegistry
+
+from data_mapper.model import Model
+
+from data_mapper.test.database.fake_dbapi import FakeDriver
+
+
+class TestParallelLoad(unittest.TestCase):
+    """
+    Tests for the method Mapper.parallel_load().
+    """
+    db_fields = {
+        "name": DatabaseStringField("name", mandatory=True),
+        "rank": DatabaseIntField("rank", unsigned=True),
+        "tags": DatabaseListField("tags")
+    }
+
+    def setUp(self):
+        """
+        Defines actions to execute before each unittest method.
+        """
+        DatabaseRegistry.initialize()
+        MapperRegistry.initialize()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "test.db")
+
+    def tearDown(self):
+        """
+        Defines actions to execute after each unittest method.
+        """
+        DatabaseRegistry.clear()
+        MapperRegistry.clear()
+        self.tmp_dir.cleanup()
+
+    def create_model(self, profile):
+        """
+        Creates a model with the database fields above, stored in the
+        database of the given profile.
+        """
+        @MapperRegistry.register(db_profile=profile, db_fields=self.db_fields)
+        class Team(Model):
+            pass
+
+        return Team
+
+    def create_rows(self, num_rows):
+        """
+        Creates the given number of rows. Every 7th row has a negative rank
+        and every 11th row has no name.
+        """
+        rows = []
+        for i in range(num_rows):
+            row = {"rank": -i if i % 7 == 3 else i, "tags": [str(i)]}
+            if i % 11 != 5:
+                row["name"] = "team-%d" % i
+            rows.append(row)
+        return rows
+
+    def read_rows(self, path):
+        """
+        Reads the names, ranks and tags of the rows in the given database
+        file, ordered by rank.
+        """
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute(
+                "SELECT name, rank, tags FROM Team ORDER BY rank"
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def check_result(self, result, rows, path):
+        """
+        Checks the result of loading the given rows and the rows inserted
+        into the given database file.
+        """
+        invalid = {i for i in range(len(rows)) if i % 7 == 3 or i % 11 == 5}
+        expected_errors = []
+        for i in sorted(invalid):
+            if i % 11 == 5:
+                expected_errors.append((i, "name", validation.MANDATORY))
+            if i % 7 == 3:
+                expected_errors.append((i, "rank", validation.UNSIGNED))
+
+        self.assertEqual(list(result.report), expected_errors)
+        self.assertEqual(result.report.get_invalid_rows(), invalid)
+        self.assertEqual(
+            result.report.get_message((3, "rank", validation.UNSIGNED)),
+            "Row 3: The value '-3' of field 'rank' is negative."
+        )
+        self.assertEqual(result.num_rows, len(rows))
+        self.assertEqual(result.num_inserted, len(rows) - len(invalid))
+        self.assertGreater(result.rows_per_second, 0)
+        self.assertEqual(self.read_rows(path), [
+            ("team-%d" % i, i, '["%d"]' % i)
+            for i in range(len(rows)) if i not in invalid
+        ])
+        self.assertEqual(LOADS, {})
+
+    # =========================================================================
+
+    def test_iter_partitions(self):
+        """
+        Tests the function iter_partitions().
+        """
+        self.assertEqual(list(iter_partitions(iter(range(7)), 3)), [
+            (0, [0, 1, 2]),
+            (3, [3, 4, 5]),
+            (6, [6])
+        ])
+        self.assertEqual(list(iter_partitions([], 3)), [])
+
+    def test_parallel_load_in_process(self):
+        """
+        Tests loading the rows in the calling process.
+        """
+        model = self.create_model(DatabaseProfile(
+            "sqlite-profile",
+            system="sqlite",
+            db=self.db_path
+        ))
+        model.mapper.create_db_table()
+        rows = self.create_rows(100)
+        result = model.mapper.parallel_load(rows, workers=1,
+                                            partition_size=30)
+        self.assertEqual(result.num_partitions, 4)
+        self.assertEqual(result.num_workers, 1)
+        self.check_result(result, rows, self.db_path)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "os.fork() is not available")
+    def test_parallel_load_with_single_writer(self):
+        """
+        Tests that the rows are validated by the workers and written by the
+        calling process, into a SQLite database.
+        """
+        model = self.create_model(DatabaseProfile(
+            "sqlite-profile",
+            system="sqlite",
+            db=self.db_path
+        ))
+        model.mapper.create_db_table()
+        rows = self.create_rows(1000)
+        result = model.mapper.parallel_load(iter(rows), workers=3,
+                                            partition_size=64)
+        self.assertEqual(result.num_partitions, 16)
+        self.assertEqual(result.num_workers, 3)
+        self.check_result(result, rows, self.db_path)
+        # The ids follow the order of the rows in the source.
+        names = [team.name for team in model.get()]
+        self.assertEqual(names, sorted(names, key=lambda n: int(n[5:])))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "os.fork() is not available")
+    def test_parallel_load_with_concurrent_writers(self):
+        """
+        Tests that the workers write the rows with their own connections,
+        into a MySQL database.
+        """
+        model = self.create_model(DatabaseProfile(
+            "mysql-profile",
+            system="mysql",
+            db="test"
+        ))
+        model.mapper.database.driver = FakeDriver(self.db_path)
+        model.mapper.create_db_table()
+
+        rows = self.create_rows(1000)
+        result = model.mapper.parallel_load(rows, workers=3,
+                                            partition_size=64)
+        self.assertEqual(result.num_workers, 3)
+        self.check_result(result, rows, self.db_path)
+
+    def test_parallel_load_with_unknown_fields(self):
+        """
+        Tests that rows with unknown fields are rejected.
+        """
+        model = self.create_model(DatabaseProfile(
+            "sqlite-profile",
+            system="sqlite",
+            db=self.db_path
+        ))
+        model.mapper.create_db_table()
+        with self.assertRaises(ValueError):
+            model.mapper.parallel_load([{"other": 1}], workers=1)
+        with self.assertRaises(ValueError):
+            model.mapper.parallel_load([], workers=0)
+        self.assertEqual(LOADS, {})
+
+    def test_parallel_load_with_invalid_types(self):
+        """
+        Tests that values of a wrong type are reported and their rows are
+        skipped, also in fields that declare a precision only.
+        """
+        @MapperRegistry.register(
+            db_profile=DatabaseProfile(
+                "sqlite-profile",
+                system="sqlite",
+                db=self.db_path
+            ),
+            db_fields={
+                "rank": DatabaseIntField("rank", unsigned=True),
+                "score": DatabaseFloatField("score", precision=2)
+            }
+        )
+        class Player(Model):
+            pass
+
+        Player.mapper.create_db_table()
+        result = Player.mapper.parallel_load([
+            {"rank": 1, "score": 1.234},
+            {"rank": "2", "score": 2.5},
+            {"rank": 3, "score": "abc"},
+            {"rank": 4}
+        ], workers=1)
+        self.assertEqual(list(result.report), [
+            (1, "rank", validation.INVALID_TYPE),
+            (2, "score", validation.INVALID_TYPE)
+        ])
+        self.assertEqual(result.num_inserted, 2)
+        self.assertEqual(
+            [(player.rank, player.score) for player in Player.get()],
+            [(1, 1.23), (4, None)]
+        )
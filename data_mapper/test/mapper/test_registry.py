@@ -12,6 +12,8 @@ from data_mapper.database.registry import DatabaseRegistry
 from data_mapper.database.registry import GetProfileError
 from data_mapper.database.registry import GetDatabaseError
 from data_mapper.database.fields import DatabaseStringField
+from data_mapper.database.fields import DatabaseIndex
+from data_mapper.database.ids import HiLoIdGenerator
 
 from data_mapper.model import Model
 from data_mapper.exceptions import DataMapperError
@@ -185,10 +187,13 @@ class TestMapperRegistry(unittest.TestCase):
         self.assertEqual(context.exception.code, 8)
 
         # Register model with valid database fields, but no given profiles.
+        @MapperRegistry.register(db_fields={"k": DatabaseStringField("k")})  # NOQA
+        class DummyModel(Model):
+            pass
+
+        # The database is requested on the first use of the mapper.
         with self.assertRaises(GetProfileError) as context:
-            @MapperRegistry.register(db_fields={"k": DatabaseStringField("k")})  # NOQA
-            class DummyModel(Model):
-                pass
+            DummyModel.mapper.database
         # We expect error code 3.
         self.assertEqual(context.exception.code, 3)
 
@@ -197,28 +202,34 @@ class TestMapperRegistry(unittest.TestCase):
         Tests the method register() with various profile names.
         """
         # Test empty profile name.
+        @MapperRegistry.register(  # NOQA
+            db_profile_name="",
+            db_fields={
+                "key": DatabaseStringField("key")
+            }
+        )
+        class DummyModel(Model):
+            pass
+
+        # The database is requested on the first use of the mapper.
         with self.assertRaises(GetProfileError) as context:
-            @MapperRegistry.register(  # NOQA
-                db_profile_name="",
-                db_fields={
-                    "key": DatabaseStringField("key")
-                }
-            )
-            class DummyModel(Model):
-                pass
+            DummyModel.mapper.database
         # We expect error code 1.
         self.assertEqual(context.exception.code, 1)
 
         # Test profile name with only white spaces.
+        @MapperRegistry.register(  # NOQA
+            db_profile_name="  ",
+            db_fields={
+                "key": DatabaseStringField("key")
+            }
+        )
+        class DummyModel(Model):
+            pass
+
+        # The database is requested on the first use of the mapper.
         with self.assertRaises(GetProfileError) as context:
-            @MapperRegistry.register(  # NOQA
-                db_profile_name="  ",
-                db_fields={
-                    "key": DatabaseStringField("key")
-                }
-            )
-            class DummyModel(Model):
-                pass
+            DummyModel.mapper.database
         # We expect error code 1.
         self.assertEqual(context.exception.code, 1)
 
@@ -234,9 +245,10 @@ class TestMapperRegistry(unittest.TestCase):
         class DummyModel(Model):
             pass
 
-        # Make sure that a mapper was registered.
-        self.assertTrue(len(MapperRegistry.registered_mappers) == 1)
-        mapper = list(MapperRegistry.registered_mappers.values())[0]
+        # Make sure that a mapper was registered. The models with invalid
+        # profiles above were registered, too.
+        self.assertTrue(len(MapperRegistry.registered_mappers) == 3)
+        mapper = MapperRegistry.get_mapper(DummyModel)
         self.assertIsNotNone(mapper)
         self.assertIsNotNone(mapper.database)
         self.assertIsNotNone(mapper.database_fields)
@@ -248,41 +260,50 @@ class TestMapperRegistry(unittest.TestCase):
         Tests the method register() with various profiles.
         """
         # Test profile that is not an instance of DatabaseProfile.
+        @MapperRegistry.register(  # NOQA
+            db_profile="",
+            db_fields={
+                "key": DatabaseStringField("key")
+            }
+        )
+        class DummyModel(Model):
+            pass
+
+        # The database is requested on the first use of the mapper.
         with self.assertRaises(GetDatabaseError) as context:
-            @MapperRegistry.register(  # NOQA
-                db_profile="",
-                db_fields={
-                    "key": DatabaseStringField("key")
-                }
-            )
-            class DummyModel(Model):
-                pass
+            DummyModel.mapper.database
         # We expect error code 2.
         self.assertEqual(context.exception.code, 2)
 
         # Test profile that has no name.
+        @MapperRegistry.register(  # NOQA
+            db_profile=DatabaseProfile(None),
+            db_fields={
+                "key": DatabaseStringField("key")
+            }
+        )
+        class DummyModel(Model):
+            pass
+
+        # The database is requested on the first use of the mapper.
         with self.assertRaises(GetDatabaseError) as context:
-            @MapperRegistry.register(  # NOQA
-                db_profile=DatabaseProfile(None),
-                db_fields={
-                    "key": DatabaseStringField("key")
-                }
-            )
-            class DummyModel(Model):
-                pass
+            DummyModel.mapper.database
         # We expect error code 3.
         self.assertEqual(context.exception.code, 3)
 
         # Test profile that has no system.
+        @MapperRegistry.register(  # NOQA
+            db_profile=DatabaseProfile("MyProfile"),
+            db_fields={
+                "key": DatabaseStringField("key")
+            }
+        )
+        class DummyModel(Model):
+            pass
+
+        # The database is requested on the first use of the mapper.
         with self.assertRaises(GetDatabaseError) as context:
-            @MapperRegistry.register(  # NOQA
-                db_profile=DatabaseProfile("MyProfile"),
-                db_fields={
-                    "key": DatabaseStringField("key")
-                }
-            )
-            class DummyModel(Model):
-                pass
+            DummyModel.mapper.database
         # We expect error code 4.
         self.assertEqual(context.exception.code, 4)
 
@@ -297,15 +318,159 @@ class TestMapperRegistry(unittest.TestCase):
         class DummyModel(Model):
             pass
 
-        # Make sure that a mapper was registered.
-        self.assertTrue(len(MapperRegistry.registered_mappers) == 1)
-        mapper = list(MapperRegistry.registered_mappers.values())[0]
+        # Make sure that a mapper was registered. The models with invalid
+        # profiles above were registered, too.
+        self.assertTrue(len(MapperRegistry.registered_mappers) == 4)
+        mapper = MapperRegistry.get_mapper(DummyModel)
         self.assertIsNotNone(mapper)
         self.assertIsNotNone(mapper.database)
         self.assertIsNotNone(mapper.database_fields)
         self.assertEqual(mapper.database.system, DatabaseSystem.SQLITE)
         self.assertDictEqual(mapper.database_fields, db_fields)
 
+    def test_register_is_lazy(self):
+        """
+        Tests that register() neither resolves the profile nor requests the
+        database, until the mapper is used.
+        """
+        DatabaseRegistry.clear()
+
+        # The profile is registered after the model.
+        @MapperRegistry.register(
+            db_profile_name="later",
+            db_fields={"key": DatabaseStringField("key")}
+        )
+        class DummyModel(Model):
+            pass
+
+        self.assertEqual(DatabaseRegistry.database_instances, {})
+        # Nothing is compiled on registration.
+        self.assertIsNone(DummyModel.mapper.check_values)
+
+        DatabaseRegistry.initialize()
+        DatabaseRegistry.register_profile(
+            DatabaseProfile("later", system="sqlite", db=":memory:")
+        )
+        database = DummyModel.mapper.database
+        self.assertEqual(database.system, DatabaseSystem.SQLITE)
+        self.assertIs(
+            database,
+            DatabaseRegistry.get_database(profile_name="later")
+        )
+        # The database is resolved only once.
+        self.assertIs(DummyModel.mapper.database, database)
+        DatabaseRegistry.clear()
+
+    def test_register_with_slots(self):
+        """
+        Tests the method register() with slots enabled.
+        """
+        DatabaseRegistry.initialize()
+        db_fields = {"key": DatabaseStringField("key")}
+
+        class DummyModel(Model):
+            pass
+
+        SlottedModel = MapperRegistry.register(
+            db_profile=DatabaseProfile("Profile", system="sqlite"),
+            db_fields=db_fields,
+            slots=True
+        )(DummyModel)
+
+        # Make sure that the mapper was registered for the slotted model.
+        self.assertIsNot(SlottedModel, DummyModel)
+        self.assertFalse(hasattr(SlottedModel(), "__dict__"))
+        mapper = MapperRegistry.get_mapper(SlottedModel)
+        self.assertIs(mapper.model, SlottedModel)
+        self.assertIs(SlottedModel.mapper, mapper)
+
+        # Make sure that class attributes named like a field are defaults.
+        class DefaultModel(Model):
+            key = "X"
+
+        SlottedModel = MapperRegistry.register(
+            db_profile=DatabaseProfile("Profile", system="sqlite"),
+            db_fields=db_fields,
+            slots=True
+        )(DefaultModel)
+        self.assertEqual(SlottedModel().key, "X")
+
+        # Make sure that an error is raised for methods named like a field.
+        class MethodModel(Model):
+            def key(self):
+                return "X"
+
+        with self.assertRaises(RegisterMapperError) as context:
+            MapperRegistry.register(
+                db_profile=DatabaseProfile("Profile", system="sqlite"),
+                db_fields=db_fields,
+                slots=True
+            )(MethodModel)
+        self.assertEqual(context.exception.code, 12)
+
+    def test_register_with_indexes(self):
+        """
+        Tests the method register() with database indexes.
+        """
+        DatabaseRegistry.initialize()
+        profile = DatabaseProfile("Profile", system="sqlite")
+        db_fields = {"key": DatabaseStringField("key")}
+
+        # Make sure that an error is raised for invalid indexes.
+        for db_indexes, code in [(["key"], 9), ([DatabaseIndex("x")], 10)]:
+            with self.assertRaises(RegisterMapperError) as context:
+                @MapperRegistry.register(
+                    db_profile=profile,
+                    db_fields=db_fields,
+                    db_indexes=db_indexes
+                )
+                class DummyModel(Model):
+                    pass
+            self.assertEqual(context.exception.code, code)
+
+        db_indexes = [DatabaseIndex(["key", "id"], unique=True)]
+
+        @MapperRegistry.register(
+            db_profile=profile,
+            db_fields=db_fields,
+            db_indexes=db_indexes
+        )
+        class DummyModel(Model):
+            pass
+
+        self.assertEqual(DummyModel.mapper.database_indexes, db_indexes)
+
+    def test_register_with_id_generator(self):
+        """
+        Tests the method register() with an id generator.
+        """
+        DatabaseRegistry.initialize()
+        profile = DatabaseProfile("Profile", system="sqlite")
+        db_fields = {"key": DatabaseStringField("key")}
+
+        # Make sure that an error is raised for an invalid generator.
+        with self.assertRaises(RegisterMapperError) as context:
+            @MapperRegistry.register(
+                db_profile=profile,
+                db_fields=db_fields,
+                id_generator="hilo"
+            )
+            class DummyModel(Model):
+                pass
+        self.assertEqual(context.exception.code, 11)
+
+        id_generator = HiLoIdGenerator()
+
+        @MapperRegistry.register(
+            db_profile=profile,
+            db_fields=db_fields,
+            id_generator=id_generator
+        )
+        class DummyModel(Model):
+            pass
+
+        self.assertIs(DummyModel.mapper.id_generator, id_generator)
+
     # =========================================================================
     # Tests for the method get_mapper()
 
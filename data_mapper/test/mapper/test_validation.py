@@ -0,0 +1,224 @@
+import unittest
+
+from data_mapper.database.base import DatabaseProfile
+from data_mapper.database.fields import DatabaseStringField
+from data_mapper.database.fields import DatabaseBooleanField
+from data_mapper.database.fields import DatabaseIntField
+from data_mapper.database.fields import DatabaseFloatField
+from data_mapper.database.fields import DatabaseListField
+from data_mapper.database.registry import DatabaseRegistry
+
+from data_mapper.mapper import validation
+from data_mapper.mapper.registry import MapperRegistry
+from data_mapper.mapper.validation import compile_validator
+from data_mapper.mapper.validation import ValidationError
+
+from data_mapper.model import Model
+
+
+class TestValidation(unittest.TestCase):
+    """
+    Tests for the compiled validators.
+    """
+
+    def test_compile_validator_without_constraints(self):
+        """
+        Tests a validator for fields without any constraints.
+        """
+        validate = compile_validator({
+            "name": DatabaseStringField("name"),
+            "flag": DatabaseBooleanField("flag"),
+            # The default choices of float fields are False, i.e. no choices.
+            "score": DatabaseFloatField("score")
+        })
+        self.assertIsNone(validate(("A", True, 1.5)))
+        self.assertIsNone(validate((None, None, None)))
+
+    def test_compile_validator_with_string_constraints(self):
+        """
+        Tests a validator for a string field with all constraints.
+        """
+        validate = compile_validator({
+            "name": DatabaseStringField(
+                "name",
+                mandatory=True,
+                choices=["a", "bb", "cccc"],
+                min_length=2,
+                max_length=3
+            )
+        })
+        self.assertIsNone(validate(("bb",)))
+        self.assertEqual(validate((None,)), [("name", validation.MANDATORY)])
+        self.assertEqual(validate(("x",)), [
+            ("name", validation.CHOICES),
+            ("name", validation.MIN_LENGTH)
+        ])
+        self.assertEqual(validate(("a",)), [("name", validation.MIN_LENGTH)])
+        self.assertEqual(validate(("cccc",)),
+                         [("name", validation.MAX_LENGTH)])
+
+    def test_compile_validator_with_numeric_constraints(self):
+        """
+        Tests a validator for a numeric field with all constraints.
+        """
+        validate = compile_validator({
+            "rank": DatabaseIntField(
+                "rank",
+                unsigned=True,
+                min_value=-5,
+                max_value=10
+            )
+        })
+        self.assertIsNone(validate((None,)))
+        self.assertIsNone(validate((0,)))
+        self.assertEqual(validate((-1,)), [("rank", validation.UNSIGNED)])
+        self.assertEqual(validate((-6,)), [
+            ("rank", validation.MIN_VALUE),
+            ("rank", validation.UNSIGNED)
+        ])
+        self.assertEqual(validate((11,)), [("rank", validation.MAX_VALUE)])
+
+    def test_compile_validator_with_list_constraints(self):
+        """
+        Tests a validator for a list field with all constraints.
+        """
+        validate = compile_validator({
+            "tags": DatabaseListField(
+                "tags",
+                choices=["x", "y", "z"],
+                min_elements=1,
+                max_elements=2
+            )
+        })
+        self.assertIsNone(validate((["x", "y"],)))
+        self.assertEqual(validate((["x", "w"],)),
+                         [("tags", validation.CHOICES)])
+        self.assertEqual(validate(([],)), [("tags", validation.MIN_ELEMENTS)])
+        self.assertEqual(validate((["x", "y", "z"],)),
+                         [("tags", validation.MAX_ELEMENTS)])
+
+    def test_compile_validator_with_invalid_types(self):
+        """
+        Tests that values of a wrong type are reported, instead of raising a
+        TypeError.
+        """
+        validate = compile_validator({
+            "name": DatabaseStringField("name", max_length=3),
+            "rank": DatabaseIntField("rank", min_value=0, max_value=10),
+            "tags": DatabaseListField("tags", choices=["x"], max_elements=1)
+        })
+        self.assertIsNone(validate(("A", 1, ["x"])))
+        self.assertEqual(validate((12, "1", 3)), [
+            ("name", validation.INVALID_TYPE),
+            ("rank", validation.INVALID_TYPE),
+            ("tags", validation.INVALID_TYPE)
+        ])
+        # Unhashable values are checked against the choices, too.
+        validate = compile_validator({
+            "name": DatabaseStringField("name", choices=["A", "B"])
+        })
+        self.assertEqual(validate((["A"],)),
+                         [("name", validation.INVALID_TYPE)])
+
+    # =========================================================================
+    # Tests for the method Mapper.validate().
+
+    def test_mapper_validate(self):
+        """
+        Tests the method validate() of the mapper and its use in save().
+        """
+        DatabaseRegistry.initialize()
+        try:
+            @MapperRegistry.register(
+                db_profile=DatabaseProfile("Profile", system="sqlite"),
+                db_fields={
+                    "name": DatabaseStringField("name", mandatory=True),
+                    "rank": DatabaseIntField("rank", max_value=10)
+                }
+            )
+            class Team(Model):
+                pass
+
+            team = Team(name="A", rank=1)
+            self.assertIs(Team.mapper.validate(team), team)
+
+            team.rank = 11
+            with self.assertRaises(ValidationError) as context:
+                Team.mapper.validate(team)
+            self.assertEqual(context.exception.code, validation.MAX_VALUE)
+            self.assertIn("'11'", str(context.exception))
+            self.assertIn("10", str(context.exception))
+
+            # A value of a wrong type raises a ValidationError, too.
+            team.rank = "1"
+            with self.assertRaises(ValidationError) as context:
+                Team.mapper.validate(team)
+            self.assertEqual(context.exception.code, validation.INVALID_TYPE)
+            self.assertIn("invalid type", str(context.exception))
+
+            with self.assertRaises(ValidationError) as context:
+                Team().save()
+            self.assertEqual(context.exception.code, validation.MANDATORY)
+        finally:
+            MapperRegistry.clear()
+            DatabaseRegistry.clear()
+
+    # =========================================================================
+    # Tests for the method Mapper.validate_many().
+
+    def test_mapper_validate_many(self):
+        """
+        Tests the method validate_many() of the mapper.
+        """
+        DatabaseRegistry.initialize()
+        try:
+            @MapperRegistry.register(
+                db_profile=DatabaseProfile("Profile", system="sqlite"),
+                db_fields={
+                    "name": DatabaseStringField("name", mandatory=True),
+                    "rank": DatabaseIntField("rank", max_value=10)
+                }
+            )
+            class Team(Model):
+                pass
+
+            teams = [
+                Team(name="A", rank=1),
+                Team(rank=11),
+                Team(name="C", rank=2),
+                Team(name="D", rank=12)
+            ]
+            report = Team.mapper.validate_many(teams)
+            self.assertEqual(len(report), 3)
+            self.assertEqual(list(report), [
+                (1, "name", validation.MANDATORY),
+                (1, "rank", validation.MAX_VALUE),
+                (3, "rank", validation.MAX_VALUE)
+            ])
+            self.assertEqual(report.get_invalid_rows(), {1, 3})
+            self.assertEqual(
+                report.get_message((3, "rank", validation.MAX_VALUE)),
+                "Row 3: The value '12' of field 'rank' is larger than 10."
+            )
+            self.assertEqual(len(report.get_messages()), 3)
+
+            # An empty report for valid instances.
+            report = Team.mapper.validate_many(teams[::2])
+            self.assertFalse(report)
+
+            # Values of a wrong type are reported, too.
+            report = Team.mapper.validate_many([
+                Team(name="A", rank="1"),
+                Team(name="B", rank=[1])
+            ])
+            self.assertEqual(list(report), [
+                (0, "rank", validation.INVALID_TYPE),
+                (1, "rank", validation.INVALID_TYPE)
+            ])
+            self.assertEqual(
+                report.get_message((0, "rank", validation.INVALID_TYPE)),
+                "Row 0: The value '1' of field 'rank' has an invalid type."
+            )
+        finally:
+            MapperRegistry.clear()
+            DatabaseRegistry.clear()
@@ -0,0 +1,48 @@
+import pickle
+import unittest
+
+from data_mapper.exceptions import DataMapperError
+
+
+class TestDataMapperError(unittest.TestCase):
+    """
+    Tests for class DataMapperError.
+    """
+
+    def test_message(self):
+        """
+        Tests the formatting of the message.
+        """
+        class PrefixedError(DataMapperError):
+            prefix = "Prefix: "
+
+        error = PrefixedError(code=2, msg="The value '%s' is bad.", args=3)
+        self.assertEqual(error.code, 2)
+        self.assertEqual(str(error), "Prefix: The value '3' is bad.")
+
+        error = DataMapperError()
+        self.assertEqual(str(error), "")
+
+    def test_message_is_formatted_lazily(self):
+        """
+        Tests that the message is not formatted before it is read.
+        """
+        # The arguments do not fit the message, but this must not fail until
+        # the message is read.
+        error = DataMapperError(code=1, msg="%s and %s", args=("a",))
+        self.assertEqual(error.code, 1)
+        with self.assertRaises(TypeError):
+            str(error)
+
+    def test_pickle(self):
+        """
+        Tests that errors keep their arguments and can be pickled.
+        """
+        error = DataMapperError(code=2, msg="The value '%s' is bad.", args=3)
+        self.assertEqual(error.args, (2, "The value '%s' is bad.", 3))
+        self.assertIn("The value '%s' is bad.", repr(error))
+
+        copy = pickle.loads(pickle.dumps(error))
+        self.assertIs(type(copy), DataMapperError)
+        self.assertEqual(copy.code, 2)
+        self.assertEqual(str(copy), "The value '3' is bad.")
@@ -0,0 +1,148 @@
+import tracemalloc
+import unittest
+
+from data_mapper.database.fields import DatabaseStringField
+from data_mapper.database.fields import DatabaseIntField
+from data_mapper.model import Model
+from data_mapper.model import create_slotted_model
+
+
+class TestModel(unittest.TestCase):
+    """
+    Tests for class Model.
+    """
+
+    def setUp(self):
+        """
+        Defines actions to execute before each unittest method.
+        """
+        class Team(Model):
+            tracked_fields = frozenset(["name", "rank"])
+
+        self.model = Team
+
+    # =========================================================================
+    # Tests for the dirty tracking.
+
+    def test_dirty_fields(self):
+        """
+        Tests that changes of tracked fields are recorded.
+        """
+        team = self.model(name="A")
+        self.assertEqual(team.dirty_fields, {"name"})
+
+        # Untracked attributes are not recorded.
+        team.other = 1
+        self.assertEqual(team.dirty_fields, {"name"})
+
+        team.rank = 1
+        self.assertEqual(team.dirty_fields, {"name", "rank"})
+
+        team.mark_clean()
+        self.assertIsNone(team.dirty_fields)
+        team.rank = 2
+        self.assertEqual(team.dirty_fields, {"rank"})
+
+    def test_is_dirty(self):
+        """
+        Tests the method is_dirty().
+        """
+        # Instances that are not stored yet are always dirty.
+        team = self.model()
+        self.assertTrue(team.is_dirty())
+
+        team.id = 1
+        self.assertFalse(team.is_dirty())
+        team.name = "A"
+        self.assertTrue(team.is_dirty())
+        team.mark_clean()
+        self.assertFalse(team.is_dirty())
+
+    # =========================================================================
+    # Tests for the function create_slotted_model().
+
+    def test_create_slotted_model(self):
+        """
+        Tests the function create_slotted_model().
+        """
+        class Team(Model):
+            tracked_fields = frozenset(["name", "rank"])
+
+            def __init__(self, **kwargs):
+                super().__init__(**kwargs)
+
+            def describe(self):
+                return "%s (%s)" % (self.name, self.rank)
+
+        db_fields = {
+            "name": DatabaseStringField("name"),
+            "rank": DatabaseIntField("rank", default_value=0)
+        }
+        SlottedTeam = create_slotted_model(Team, db_fields)
+        self.assertEqual(SlottedTeam.__name__, "Team")
+        self.assertTrue(issubclass(SlottedTeam, Model))
+
+        team = SlottedTeam(name="A")
+        self.assertFalse(hasattr(team, "__dict__"))
+        # Unset fields fall back to their default values.
+        self.assertEqual(team.describe(), "A (0)")
+        self.assertIsNone(team.id)
+        # The dirty tracking still works.
+        self.assertEqual(team.dirty_fields, {"name"})
+        # Attributes besides the database fields can not be set.
+        with self.assertRaises(AttributeError):
+            team.other = 1
+
+    def test_create_slotted_model_with_class_attributes(self):
+        """
+        Tests that class attributes named like a database field become the
+        default values of the field.
+        """
+        class Team(Model):
+            name = "X"
+
+            def rank(self):
+                return 1
+
+        db_fields = {"name": DatabaseStringField("name")}
+        SlottedTeam = create_slotted_model(Team, db_fields)
+        self.assertEqual(SlottedTeam().name, "X")
+        self.assertEqual(SlottedTeam(name="A").name, "A")
+
+        # Methods named like a database field are rejected.
+        db_fields["rank"] = DatabaseIntField("rank")
+        with self.assertRaises(ValueError):
+            create_slotted_model(Team, db_fields)
+
+    def test_create_slotted_model_memory(self):
+        """
+        Tests that instances of slotted models need less memory than
+        instances of the original models.
+        """
+        class Team(Model):
+            pass
+
+        db_fields = {
+            "name": DatabaseStringField("name"),
+            "rank": DatabaseIntField("rank")
+        }
+        SlottedTeam = create_slotted_model(Team, db_fields)
+
+        def measure(model):
+            tracemalloc.start()
+            try:
+                # Mark the instances clean, like instances loaded from the
+                # database.
+                instances = [model(name="A", rank=i) for i in range(1000)]
+                for instance in instances:
+                    instance.mark_clean()
+                size = tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+            self.assertEqual(len(instances), 1000)
+            return size
+
+        # Measure each model twice, to exclude one-time allocations.
+        measure(Team)
+        measure(SlottedTeam)
+        self.assertLess(measure(SlottedTeam), measure(Team) * 0.9)
@@ -0,0 +1,157 @@
+import datetime
+import decimal
+import unittest
+
+from data_mapper.database.base import DatabaseProfile
+from data_mapper.database.sqlite import SQLiteDatabase
+
+from data_mapper.query import After
+from data_mapper.query import Field
+from data_mapper.query import combine
+from data_mapper.query import encode_token
+from data_mapper.query import decode_token
+
+
+class TestQuery(unittest.TestCase):
+    """
+    Tests for the filter expressions.
+    """
+    database = SQLiteDatabase(DatabaseProfile("Profile", system="sqlite"))
+
+    def compile(self, expression):
+        """
+        Returns the rendered SQL and the parameters of the given expression.
+        """
+        params = []
+        expression.add_params(params, lambda name, value: value)
+        return expression.render(self.database), params
+
+    # =========================================================================
+
+    def test_comparisons(self):
+        """
+        Tests the rendering of comparisons.
+        """
+        self.assertEqual(self.compile(Field("a") == 1), ('"a" = ?', [1]))
+        self.assertEqual(self.compile(Field("a") != 1), ('"a" <> ?', [1]))
+        self.assertEqual(self.compile(Field("a") < 1), ('"a" < ?', [1]))
+        self.assertEqual(self.compile(Field("a") <= 1), ('"a" <= ?', [1]))
+        self.assertEqual(self.compile(Field("a") > 1), ('"a" > ?', [1]))
+        self.assertEqual(self.compile(Field("a") >= 1), ('"a" >= ?', [1]))
+        self.assertEqual(self.compile(Field("a") == None),  # NOQA
+                         ('"a" IS NULL', []))
+        self.assertEqual(self.compile(Field("a") != None),  # NOQA
+                         ('NOT ("a" IS NULL)', []))
+
+    def test_in_and_between(self):
+        """
+        Tests the rendering of IN and BETWEEN expressions.
+        """
+        self.assertEqual(self.compile(Field("a").in_([1, 2])),
+                         ('"a" IN (?, ?)', [1, 2]))
+        self.assertEqual(self.compile(Field("a").in_([])), ("1 = 0", []))
+        self.assertEqual(self.compile(Field("a").between(1, 5)),
+                         ('"a" BETWEEN ? AND ?', [1, 5]))
+
+    def test_junctions(self):
+        """
+        Tests the rendering of AND, OR and NOT.
+        """
+        expression = ((Field("a") == "X") | (Field("a") == "Y")) \
+            & ~(Field("b") > 2)
+        self.assertEqual(self.compile(expression), (
+            '(("a" = ? OR "a" = ?) AND NOT ("b" > ?))',
+            ["X", "Y", 2]
+        ))
+        self.assertEqual(expression.get_field_names(), {"a", "b"})
+
+    def test_shapes(self):
+        """
+        Tests that expressions have equal shapes if and only if they render
+        the same SQL.
+        """
+        def build(a, b):
+            return (Field("a") == a) | Field("b").in_(b)
+
+        self.assertEqual(build(1, [1, 2]).get_shape(),
+                         build(2, [3, 4]).get_shape())
+        self.assertNotEqual(build(1, [1, 2]).get_shape(),
+                            build(1, [1, 2, 3]).get_shape())
+        self.assertNotEqual((Field("a") == 1).get_shape(),
+                            (Field("a") > 1).get_shape())
+
+    def test_combine(self):
+        """
+        Tests the function combine().
+        """
+        self.assertIsNone(combine([]))
+        expression = Field("a") == 1
+        self.assertIs(combine([expression]), expression)
+        self.assertEqual(
+            self.compile(combine([expression, Field("b") == 2])),
+            ('("a" = ? AND "b" = ?)', [1, 2])
+        )
+
+    def test_after(self):
+        """
+        Tests the rendering of the keyset predicates.
+        """
+        self.assertEqual(self.compile(After(None, None, 5)),
+                         ('"id" > ?', [5]))
+        self.assertEqual(self.compile(After("a", 3, 5)), (
+            '("a" >= ? AND ("a" > ? OR "id" > ?))',
+            [3, 3, 5]
+        ))
+        self.assertEqual(self.compile(After("a", None, 5)), (
+            '(("a" IS NULL AND "id" > ?) OR "a" IS NOT NULL)',
+            [5]
+        ))
+        self.assertNotEqual(After("a", 3, 5).get_shape(),
+                            After("a", None, 5).get_shape())
+
+    # =========================================================================
+    # Tests for the page tokens.
+
+    def test_tokens(self):
+        """
+        Tests the functions encode_token() and decode_token().
+        """
+        token = encode_token("name", "X", 4)
+        self.assertIsInstance(token, str)
+        self.assertEqual(decode_token(token, "name"), ("X", 4))
+        self.assertEqual(decode_token(encode_token(None, None, 4), None),
+                         (None, 4))
+
+        # Tokens of another order are rejected.
+        with self.assertRaises(ValueError):
+            decode_token(token, "rank")
+        for invalid in ["", "abc", encode_token("name", "X", "4")]:
+            with self.assertRaises(ValueError):
+                decode_token(invalid, "name")
+
+    def test_tokens_with_other_types(self):
+        """
+        Tests that stored values of types JSON does not support are encoded
+        into the tokens and decoded back.
+        """
+        for value in [
+            datetime.datetime(2020, 1, 2, 3, 4, 5, 6),
+            datetime.date(2020, 1, 2),
+            datetime.time(3, 4, 5),
+            datetime.timedelta(days=-1, seconds=5, microseconds=6),
+            b"\x00\xff",
+            decimal.Decimal("1.50")
+        ]:
+            token = encode_token("value", value, 4)
+            self.assertEqual(decode_token(token, "value"), (value, 4))
+            self.assertIs(type(decode_token(token, "value")[0]), type(value))
+        self.assertEqual(
+            decode_token(encode_token("value", bytearray(b"ab"), 4), "value"),
+            (b"ab", 4)
+        )
+
+        # Unknown or malformed encodings are rejected.
+        for value in [{"other": "x"}, {"date": 1}, {"decimal": "x"},
+                      {"bytes": "$"}, {"date": "x", "time": "y"}]:
+            with self.assertRaises(ValueError):
+                decode_token(encode_token("value", value, 4), "value")
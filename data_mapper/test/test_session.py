@@ -0,0 +1,189 @@
+import asyncio
+import os.path
+import tempfile
+import unittest
+
+from data_mapper.database.base import DatabaseProfile
+from data_mapper.database.fields import DatabaseStringField
+from data_mapper.database.fields import DatabaseIntField
+from data_mapper.database.registry import DatabaseRegistry
+
+from data_mapper.mapper.registry import MapperRegistry
+
+from data_mapper.model import Model
+from data_mapper.session import Session
+
+
+class TestSession(unittest.TestCase):
+    """
+    Tests for class Session.
+    """
+
+    def setUp(self):
+        """
+        Defines actions to execute before each unittest method.
+        """
+        DatabaseRegistry.initialize()
+        MapperRegistry.initialize()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        profile = DatabaseProfile(
+            "sqlite-profile",
+            system="sqlite",
+            db=os.path.join(self.tmp_dir.name, "test.db")
+        )
+
+        @MapperRegistry.register(
+            db_profile=profile,
+            db_fields={"name": DatabaseStringField("name")}
+        )
+        class Team(Model):
+            pass
+
+        @MapperRegistry.register(
+            db_profile=profile,
+            db_fields={
+                "name": DatabaseStringField("name"),
+                "age": DatabaseIntField("age")
+            }
+        )
+        class Player(Model):
+            pass
+
+        Team.mapper.create_db_table()
+        Player.mapper.create_db_table()
+
+        self.team_model = Team
+        self.player_model = Player
+        self.database = Team.mapper.database
+
+        # Record all statements executed on the database.
+        self.statements = []
+        self.database.get_connection().set_trace_callback(
+            self.statements.append
+        )
+
+    def tearDown(self):
+        """
+        Defines actions to execute after each unittest method.
+        """
+        self.database.close()
+        self.tmp_dir.cleanup()
+        MapperRegistry.clear()
+        DatabaseRegistry.clear()
+
+    def count_rows(self, model):
+        """
+        Returns the number of rows in the table of the given model.
+        """
+        cursor = self.database.get_connection().execute(
+            'SELECT COUNT(*) FROM "%s"' % model.__name__
+        )
+        return cursor.fetchone()[0]
+
+    # =========================================================================
+
+    def test_flush_on_exit(self):
+        """
+        Tests that saves within a session are written in a single transaction
+        on leaving the session.
+        """
+        with Session() as session:
+            teams = [self.team_model(name=str(i)) for i in range(100)]
+            players = [self.player_model(name=str(i), age=i)
+                       for i in range(100)]
+            for team, player in zip(teams, players):
+                self.assertTrue(team.save())
+                self.assertTrue(player.save())
+            # Nothing is written until the session is left.
+            self.assertEqual(len(session.instances), 200)
+            self.assertEqual(self.statements, [])
+
+        self.assertEqual(self.count_rows(self.team_model), 100)
+        self.assertEqual(self.count_rows(self.player_model), 100)
+        self.assertEqual([team.id for team in teams], list(range(1, 101)))
+        self.assertEqual([p.id for p in players], list(range(1, 101)))
+        # Expect a single transaction with a single batch per table.
+        self.assertEqual(self.statements.count("BEGIN IMMEDIATE"), 1)
+        self.assertEqual(self.statements.count("COMMIT"), 1)
+
+    def test_save_same_instance_twice(self):
+        """
+        Tests that an instance saved twice within a session is written once.
+        """
+        team = self.team_model(name="A")
+        with Session():
+            team.save()
+            team.name = "B"
+            team.save()
+        self.assertEqual(self.count_rows(self.team_model), 1)
+        self.assertEqual(team.id, 1)
+
+    def test_discard_on_error(self):
+        """
+        Tests that nothing is written if an error occurs within a session.
+        """
+        with self.assertRaises(KeyError):
+            with Session():
+                self.team_model(name="A").save()
+                raise KeyError()
+        self.assertEqual(self.count_rows(self.team_model), 0)
+        self.assertIsNone(Session.get_active())
+
+    def test_rollback_on_failing_flush(self):
+        """
+        Tests that a failing flush neither writes any instance nor assigns ids.
+        """
+        team = self.team_model(name="A")
+        # The dict can not be bound as a parameter, so the flush fails.
+        player = self.player_model(name={})
+        with self.assertRaises(Exception):
+            with Session():
+                team.save()
+                player.save()
+        self.assertEqual(self.count_rows(self.team_model), 0)
+        self.assertIsNone(team.id)
+
+    def test_async_session(self):
+        """
+        Tests that an async session flushes on exit and records the saves of
+        its own task only.
+        """
+        async def run():
+            started = asyncio.Event()
+            saved = asyncio.Event()
+            team = self.team_model(name="A")
+            other = self.team_model(name="B")
+
+            async def in_session():
+                async with Session() as session:
+                    await team.asave()
+                    started.set()
+                    await saved.wait()
+                    self.assertEqual(list(session.instances.values()), [team])
+                    raise KeyError()
+
+            async def outside_session():
+                await started.wait()
+                # The session of the other task is not active in this task.
+                self.assertIsNone(Session.get_active())
+                self.assertTrue(await other.asave())
+                saved.set()
+
+            results = await asyncio.wait_for(asyncio.gather(
+                in_session(),
+                outside_session(),
+                return_exceptions=True
+            ), timeout=10)
+            self.assertIsInstance(results[0], KeyError)
+            self.assertIsNone(team.id)
+            self.assertEqual(other.id, 1)
+
+            async with Session():
+                await team.asave()
+                self.assertIsNone(team.id)
+            self.assertEqual(team.id, 2)
+            self.assertIsNone(Session.get_active())
+
+        asyncio.run(run())
+        self.assertEqual(self.count_rows(self.team_model), 2)
@@ -0,0 +1,106 @@
+import json
+import os.path
+import subprocess
+import sys
+import time
+import unittest
+
+# The modules to import in the startup benchmark.
+MODULES = [
+    "data_mapper.database.fields",
+    "data_mapper.database.registry",
+    "data_mapper.mapper.registry",
+    "data_mapper.model",
+    "data_mapper.session"
+]
+
+# The expensive modules that must only be imported on first use, i.e. on the
+# first use of a profile, on the first async call or on the first parallel
+# load.
+LAZY_MODULES = ["sqlite3", "pymysql", "configparser", "asyncio",
+                "multiprocessing", "concurrent.futures", "socket", "ssl"]
+
+# The number of runs of the benchmark, the fastest run is reported and
+# compared to the maximal import time.
+NUM_RUNS = 5
+
+# The maximal time to start an interpreter and import the modules above,
+# relative to the time to start an interpreter and import the bare package.
+# Relative, to keep the test stable on slow machines: importing the modules
+# takes about 2.5 times as long as the baseline, importing the drivers and
+# asyncio eagerly about 5 times.
+MAX_IMPORT_FACTOR = 4
+
+# The script to run in a fresh interpreter. Prints the names of the imported
+# modules, as JSON.
+SCRIPT = """
+import json, sys
+%s
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+class TestStartup(unittest.TestCase):
+    """
+    Benchmarks the import of the data_mapper modules, in fresh interpreters.
+    """
+
+    def run_script(self, modules):
+        """
+        Imports the given modules in a fresh interpreter.
+
+        Args:
+            modules (list of str): The names of the modules to import.
+        Returns:
+            A tuple of the wall time of the interpreter, in seconds, and the
+            set of the names of all imported modules.
+        """
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.realpath(__file__)
+        )))
+        imports = "\n".join("import %s" % module for module in modules)
+        start = time.perf_counter()
+        output = subprocess.check_output(
+            [sys.executable, "-c", SCRIPT % imports],
+            cwd=root
+        )
+        elapsed = time.perf_counter() - start
+        return elapsed, set(json.loads(output.decode("utf-8")))
+
+    def benchmark(self, modules):
+        """
+        Imports the given modules in <NUM_RUNS> fresh interpreters.
+
+        Returns:
+            The wall time of the fastest run, in seconds.
+        """
+        return min(self.run_script(modules)[0] for _ in range(NUM_RUNS))
+
+    def test_lazy_imports(self):
+        """
+        Tests that importing the data_mapper modules does not import any
+        database driver or another expensive module.
+        """
+        _, modules = self.run_script(MODULES)
+        for module in MODULES:
+            self.assertIn(module, modules)
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_import_time(self):
+        """
+        Tests that importing the data_mapper modules in a fresh interpreter
+        takes at most <MAX_IMPORT_FACTOR> times as long as importing the bare
+        package.
+        """
+        # Compile the modules first, such that no run pays for it.
+        self.run_script(MODULES)
+        baseline = self.benchmark(["data_mapper"])
+        import_time = self.benchmark(MODULES)
+        report = "Import time: %.1f ms, baseline: %.1f ms (best of %d)." % (
+            import_time * 1000,
+            baseline * 1000,
+            NUM_RUNS
+        )
+        sys.stderr.write("\n%s\n" % report)
+        self.assertLess(import_time, MAX_IMPORT_FACTOR * baseline, report)